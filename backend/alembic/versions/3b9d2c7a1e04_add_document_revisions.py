@@ -0,0 +1,33 @@
+"""add_document_revisions
+
+Revision ID: 3b9d2c7a1e04
+Revises: 510fe3f120f2
+Create Date: 2026-10-19 10:12:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2c7a1e04'
+down_revision: Union[str, None] = '510fe3f120f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('parent_document_id', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('revision_number', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'documents_parent_document_id_fkey', 'documents', 'documents',
+        ['parent_document_id'], ['id'], ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('documents_parent_document_id_fkey', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'revision_number')
+    op.drop_column('documents', 'parent_document_id')
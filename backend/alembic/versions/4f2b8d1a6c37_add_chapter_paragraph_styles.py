@@ -0,0 +1,26 @@
+"""add_chapter_paragraph_styles
+
+Revision ID: 4f2b8d1a6c37
+Revises: c5a7e2d94f13
+Create Date: 2026-10-19 13:15:52.117604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2b8d1a6c37'
+down_revision: Union[str, None] = 'c5a7e2d94f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chapters', sa.Column('paragraph_styles', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chapters', 'paragraph_styles')
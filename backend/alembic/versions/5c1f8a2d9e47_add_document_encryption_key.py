@@ -0,0 +1,26 @@
+"""add_document_encryption_key
+
+Revision ID: 5c1f8a2d9e47
+Revises: e94a0c3f7b21
+Create Date: 2026-10-19 20:25:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f8a2d9e47'
+down_revision: Union[str, None] = 'e94a0c3f7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('encryption_key', sa.String(length=128), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'encryption_key')
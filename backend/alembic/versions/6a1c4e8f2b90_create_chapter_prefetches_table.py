@@ -0,0 +1,48 @@
+"""create_chapter_prefetches_table
+
+Revision ID: 6a1c4e8f2b90
+Revises: 9d3e71b5a2f8
+Create Date: 2026-10-19 18:04:37.215903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1c4e8f2b90'
+down_revision: Union[str, None] = '9d3e71b5a2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chapter_prefetches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('target_language', sa.String(length=20), nullable=False),
+    sa.Column('options_key', sa.String(length=40), nullable=False),
+    sa.Column('characters', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('outcome', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('consumed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chapter_prefetches_id'), 'chapter_prefetches', ['id'], unique=False)
+    op.create_index('ix_chapter_prefetches_lookup', 'chapter_prefetches', ['chapter_id', 'target_language', 'status'], unique=False)
+    op.create_index('ix_chapter_prefetches_document', 'chapter_prefetches', ['document_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chapter_prefetches_document', table_name='chapter_prefetches')
+    op.drop_index('ix_chapter_prefetches_lookup', table_name='chapter_prefetches')
+    op.drop_index(op.f('ix_chapter_prefetches_id'), table_name='chapter_prefetches')
+    op.drop_table('chapter_prefetches')
@@ -0,0 +1,26 @@
+"""add_chapter_target_progress
+
+Revision ID: 7d4a9e2b6f15
+Revises: 5c1f8a2d9e47
+Create Date: 2026-10-19 22:10:37.604518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4a9e2b6f15'
+down_revision: Union[str, None] = '5c1f8a2d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chapters', sa.Column('target_progress', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chapters', 'target_progress')
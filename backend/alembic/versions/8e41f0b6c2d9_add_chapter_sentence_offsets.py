@@ -0,0 +1,26 @@
+"""add_chapter_sentence_offsets
+
+Revision ID: 8e41f0b6c2d9
+Revises: 3b9d2c7a1e04
+Create Date: 2026-10-19 11:02:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41f0b6c2d9'
+down_revision: Union[str, None] = '3b9d2c7a1e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chapters', sa.Column('sentence_offsets', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chapters', 'sentence_offsets')
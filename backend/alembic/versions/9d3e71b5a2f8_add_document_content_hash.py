@@ -0,0 +1,29 @@
+"""add_document_content_hash
+
+Revision ID: 9d3e71b5a2f8
+Revises: 4f2b8d1a6c37
+Create Date: 2026-10-19 17:52:08.436019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e71b5a2f8'
+down_revision: Union[str, None] = '4f2b8d1a6c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Documentos antigos ficam com content_hash nulo e continuam usando file_path
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_content_hash'), 'documents', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_content_hash'), table_name='documents')
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,52 @@
+"""cascade_document_deletes
+
+Revision ID: a3f6c8e1d254
+Revises: 7d4a9e2b6f15
+Create Date: 2026-10-19 22:48:12.930461
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c8e1d254'
+down_revision: Union[str, None] = '7d4a9e2b6f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna, tabela referenciada): nomes padrão do PostgreSQL
+FOREIGN_KEYS = (
+    ('chapters', 'document_id', 'documents'),
+    ('translations', 'document_id', 'documents'),
+    ('translations', 'chapter_id', 'chapters'),
+    ('translation_revisions', 'translation_id', 'translations'),
+)
+
+
+def _recreate(ondelete) -> None:
+    for table, column, referred in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recreate('CASCADE')
+    # Filhos apagados pelo banco: índices nas chaves evitam varrer as tabelas
+    op.create_index('ix_chapters_document_id', 'chapters', ['document_id'])
+    op.create_index('ix_translations_document_id', 'translations', ['document_id'])
+    op.create_index('ix_translations_chapter_id', 'translations', ['chapter_id'])
+    op.add_column('documents', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_documents_archived_at'), 'documents', ['archived_at'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_archived_at'), table_name='documents')
+    op.drop_column('documents', 'archived_at')
+    op.drop_index('ix_translations_chapter_id', table_name='translations')
+    op.drop_index('ix_translations_document_id', table_name='translations')
+    op.drop_index('ix_chapters_document_id', table_name='chapters')
+    _recreate(None)
@@ -0,0 +1,27 @@
+"""add_translation_style
+
+Revision ID: a7c2e9d4f316
+Revises: d6a3f1c8b295
+Create Date: 2026-10-20 02:37:41.205918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9d4f316'
+down_revision: Union[str, None] = 'd6a3f1c8b295'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Estilo da tradução: a memória de tradução só reaproveita o mesmo estilo
+    op.add_column('translations', sa.Column('style', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('translations', 'style')
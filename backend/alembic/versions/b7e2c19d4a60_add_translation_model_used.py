@@ -0,0 +1,27 @@
+"""add_translation_model_used
+
+Revision ID: b7e2c19d4a60
+Revises: d28f5b7c9e13
+Create Date: 2026-10-19 19:12:40.218563
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c19d4a60'
+down_revision: Union[str, None] = 'd28f5b7c9e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Traduções anteriores ao roteamento ficam sem modelo registrado
+    op.add_column('translations', sa.Column('model_used', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('translations', 'model_used')
@@ -0,0 +1,51 @@
+"""add_api_keys_and_fair_queueing
+
+Revision ID: b8e2f4a6c103
+Revises: f1b7d3c9a862
+Create Date: 2026-10-19 23:58:44.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f4a6c103'
+down_revision: Union[str, None] = 'f1b7d3c9a862'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('api_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('translator_profile_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('key_prefix', sa.String(length=12), nullable=False),
+    sa.Column('key_hash', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['translator_profile_id'], ['translator_profiles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_api_keys_id'), 'api_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_api_keys_key_hash'), 'api_keys', ['key_hash'], unique=True)
+    op.add_column('translator_profiles', sa.Column('tokens_per_minute', sa.Integer(), nullable=True))
+    op.add_column('translator_profiles', sa.Column('scheduling_weight', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('tenant', sa.String(length=64), nullable=True))
+    op.add_column('jobs', sa.Column('fair_order', sa.Float(), nullable=False, server_default='0'))
+    op.create_index('ix_jobs_tenant', 'jobs', ['tenant', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_tenant', table_name='jobs')
+    op.drop_column('jobs', 'fair_order')
+    op.drop_column('jobs', 'tenant')
+    op.drop_column('translator_profiles', 'scheduling_weight')
+    op.drop_column('translator_profiles', 'tokens_per_minute')
+    op.drop_index(op.f('ix_api_keys_key_hash'), table_name='api_keys')
+    op.drop_index(op.f('ix_api_keys_id'), table_name='api_keys')
+    op.drop_table('api_keys')
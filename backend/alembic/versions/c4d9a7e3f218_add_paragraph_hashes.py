@@ -0,0 +1,43 @@
+"""add_paragraph_hashes
+
+Revision ID: c4d9a7e3f218
+Revises: b8e2f4a6c103
+Create Date: 2026-10-20 00:37:19.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9a7e3f218'
+down_revision: Union[str, None] = 'b8e2f4a6c103'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Capítulos já existentes são indexados no primeiro job de tradução de cada um
+    op.create_table('paragraph_hashes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=40), nullable=False),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_paragraph_hashes_chapter_id'), 'paragraph_hashes', ['chapter_id'], unique=False)
+    op.create_index('ix_paragraph_hashes_document_hash', 'paragraph_hashes', ['document_id', 'content_hash'],
+                    unique=False)
+    op.create_index('ix_paragraph_hashes_content_hash', 'paragraph_hashes', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_paragraph_hashes_content_hash', table_name='paragraph_hashes')
+    op.drop_index('ix_paragraph_hashes_document_hash', table_name='paragraph_hashes')
+    op.drop_index(op.f('ix_paragraph_hashes_chapter_id'), table_name='paragraph_hashes')
+    op.drop_table('paragraph_hashes')
@@ -0,0 +1,40 @@
+"""create_job_events_table
+
+Revision ID: d28f5b7c9e13
+Revises: 6a1c4e8f2b90
+Create Date: 2026-10-19 18:31:52.604178
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd28f5b7c9e13'
+down_revision: Union[str, None] = '6a1c4e8f2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=True),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('event_type', sa.String(length=20), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_events_document', 'job_events', ['document_id', 'id'], unique=False)
+    op.create_index('ix_job_events_job', 'job_events', ['job_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_events_job', table_name='job_events')
+    op.drop_index('ix_job_events_document', table_name='job_events')
+    op.drop_table('job_events')
@@ -0,0 +1,38 @@
+"""add_tenant_usage
+
+Revision ID: d6a3f1c8b295
+Revises: c4d9a7e3f218
+Create Date: 2026-10-20 01:12:06.418273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a3f1c8b295'
+down_revision: Union[str, None] = 'c4d9a7e3f218'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Consumo de tokens por cliente e minuto, compartilhado entre API e workers
+    op.create_table('tenant_usage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant', sa.String(length=64), nullable=False),
+    sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('tokens', sa.Integer(), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tenant_usage_tenant_window', 'tenant_usage', ['tenant', 'window_start'], unique=True)
+    op.create_index('ix_tenant_usage_window_start', 'tenant_usage', ['window_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tenant_usage_window_start', table_name='tenant_usage')
+    op.drop_index('ix_tenant_usage_tenant_window', table_name='tenant_usage')
+    op.drop_table('tenant_usage')
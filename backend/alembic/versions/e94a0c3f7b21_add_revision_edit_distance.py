@@ -0,0 +1,34 @@
+"""add_revision_edit_distance
+
+Revision ID: e94a0c3f7b21
+Revises: b7e2c19d4a60
+Create Date: 2026-10-19 19:40:17.905214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e94a0c3f7b21'
+down_revision: Union[str, None] = 'b7e2c19d4a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('translation_revisions', sa.Column('edit_distance', sa.Integer(), nullable=True))
+    op.add_column('translation_revisions', sa.Column('word_edit_distance', sa.Integer(), nullable=True))
+    op.add_column('translation_revisions', sa.Column('revised_chars', sa.Integer(), nullable=True))
+    op.add_column('translation_revisions', sa.Column('revised_words', sa.Integer(), nullable=True))
+    op.create_index('ix_translation_revisions_translation', 'translation_revisions', ['translation_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_translation_revisions_translation', table_name='translation_revisions')
+    op.drop_column('translation_revisions', 'revised_words')
+    op.drop_column('translation_revisions', 'revised_chars')
+    op.drop_column('translation_revisions', 'word_edit_distance')
+    op.drop_column('translation_revisions', 'edit_distance')
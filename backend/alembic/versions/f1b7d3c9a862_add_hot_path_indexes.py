@@ -0,0 +1,45 @@
+"""add_hot_path_indexes
+
+Revision ID: f1b7d3c9a862
+Revises: a3f6c8e1d254
+Create Date: 2026-10-19 23:20:05.117394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d3c9a862'
+down_revision: Union[str, None] = 'a3f6c8e1d254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Os índices compostos começam pela mesma coluna e os substituem
+    op.drop_index('ix_chapters_document_id', table_name='chapters')
+    op.drop_index('ix_translations_document_id', table_name='translations')
+    op.create_index('ix_chapters_document_order', 'chapters', ['document_id', 'order'])
+    op.create_index('ix_translations_created_at', 'translations', ['created_at'])
+    op.create_index('ix_translations_document_chapter', 'translations', ['document_id', 'chapter_id'])
+    op.create_index(
+        'ix_translations_language_pair', 'translations',
+        ['source_language', 'target_language', 'translator_profile_id']
+    )
+    op.create_index(
+        'ix_translations_original_text', 'translations', ['original_text'], postgresql_using='hash'
+    )
+    op.create_index('ix_translation_revisions_created_at', 'translation_revisions', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_translation_revisions_created_at', table_name='translation_revisions')
+    op.drop_index('ix_translations_original_text', table_name='translations')
+    op.drop_index('ix_translations_language_pair', table_name='translations')
+    op.drop_index('ix_translations_document_chapter', table_name='translations')
+    op.drop_index('ix_translations_created_at', table_name='translations')
+    op.drop_index('ix_chapters_document_order', table_name='chapters')
+    op.create_index('ix_translations_document_id', 'translations', ['document_id'])
+    op.create_index('ix_chapters_document_id', 'chapters', ['document_id'])
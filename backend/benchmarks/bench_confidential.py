@@ -0,0 +1,98 @@
+"""
+Compara a vazão do caminho normal (upload gravado em disco e lido de lá)
+com a do confidencial (processado em memória, capítulos e traduções
+cifrados) para um TXT gerado: parsing, montagem dos capítulos, leitura
+dos parágrafos para traduzir e gravação das traduções.
+
+Uso:
+    python benchmarks/bench_confidential.py [--paragraphs 5000] [--repeat 5]
+"""
+import argparse
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Chave mestra descartável, só para o benchmark
+os.environ.setdefault("CONFIDENTIAL_MASTER_KEY", base64.urlsafe_b64encode(os.urandom(32)).decode())
+
+from document_processor import DocumentProcessor
+from models import Document
+from services.chapter_service import build_chapters
+from services.confidential import PLAINTEXT, DocumentCipher, new_document_key
+
+WORDS = (
+    "o contrato estabelece as condições de fornecimento entre as partes "
+    "cláusula prazo pagamento confidencialidade rescisão multa foro"
+).split()
+
+# Custo aceitável do modo confidencial em relação ao normal
+MAX_SLOWDOWN = 2.0
+
+
+def build_text(rng: random.Random, paragraphs: int) -> bytes:
+    return "\n\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))) for _ in range(paragraphs)
+    ).encode("utf-8")
+
+
+def normal_path(data: bytes, directory: str) -> int:
+    path = os.path.join(directory, "upload.txt")
+    with open(path, "wb") as file:
+        file.write(data)
+    return process(DocumentProcessor().process_document(path, "text/plain"), PLAINTEXT)
+
+
+def confidential_path(data: bytes) -> int:
+    key, _ = new_document_key()
+    return process(DocumentProcessor().process_bytes(data, "text/plain"), DocumentCipher(key))
+
+
+def process(processed_data, cipher) -> int:
+    chapters = build_chapters(Document(), processed_data, cipher)
+    translated = 0
+    for chapter in chapters:
+        # O worker decifra os parágrafos e grava as traduções cifradas
+        paragraphs = cipher.decrypt_list(chapter.content)
+        chapter.translated_content = {"en": cipher.encrypt_list(paragraphs)}
+        translated += len(paragraphs)
+    return translated
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = build_text(random.Random(11), args.paragraphs)
+    megabytes = len(data) / (1024 * 1024)
+    with tempfile.TemporaryDirectory() as directory:
+        normal = timed(lambda: normal_path(data, directory), args.repeat)
+    confidential = timed(lambda: confidential_path(data), args.repeat)
+
+    slowdown = confidential / normal
+    print(f"Documento: {args.paragraphs} parágrafos, {megabytes:.1f} MB")
+    print(f"  normal:       {normal * 1000:8.1f} ms  {megabytes / normal:6.1f} MB/s  "
+          f"{args.paragraphs / normal:8.0f} parágrafos/s")
+    print(f"  confidencial: {confidential * 1000:8.1f} ms  {megabytes / confidential:6.1f} MB/s  "
+          f"{args.paragraphs / confidential:8.0f} parágrafos/s")
+    print(f"Custo do modo confidencial: {slowdown:.2f}x (limite {MAX_SLOWDOWN}x) "
+          f"{'ok' if slowdown <= MAX_SLOWDOWN else 'ACIMA DO LIMITE'}")
+
+
+if __name__ == "__main__":
+    main()
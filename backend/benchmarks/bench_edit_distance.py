@@ -0,0 +1,147 @@
+"""
+Mede o cálculo de esforço de post-edição (distância de caracteres e de
+palavras) num capítulo gerado, com uma fração dos parágrafos editada,
+no mesmo capítulo com parágrafos inseridos e removidos entre os
+editados e num único parágrafo muito longo revisado, e compara o
+algoritmo bit-paralelo com a programação dinâmica clássica num parágrafo.
+
+Uso:
+    python benchmarks/bench_edit_distance.py [--paragraphs 120] [--edited 0.3] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit_distance import edit_stats, levenshtein
+
+WORDS = (
+    "o tradutor deve preservar o sentido original do texto mantendo o tom "
+    "e o estilo da obra adaptando expressões idiomáticas capítulo seção "
+    "parágrafo documento revisão qualidade leitor editora prazo"
+).split()
+
+# Orçamento para um capítulo, para servir de métrica ao vivo no editor
+MAX_CHAPTER_MS = 50
+
+
+def paragraph(rng: random.Random) -> list:
+    return [rng.choice(WORDS) for _ in range(rng.randint(40, 80))]
+
+
+def edit(rng: random.Random, words: list) -> list:
+    words = list(words)
+    for _ in range(rng.randint(1, 5)):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return words
+
+
+def build_chapter(rng: random.Random, paragraphs: int, edited: float, restructured: float = 0.0):
+    """
+    Capítulo original e revisado. Com `restructured`, essa fração dos
+    parágrafos é removida ou ganha um parágrafo novo logo depois, e os
+    vizinhos são editados (não há parágrafo idêntico por perto para servir de âncora).
+    """
+    original, revised = [], []
+    neighbor = False
+    for _ in range(paragraphs):
+        words = paragraph(rng)
+        original.append(" ".join(words))
+        if rng.random() < restructured:
+            # Remove o parágrafo ou insere um novo depois dele; o anterior também é editado
+            if revised:
+                revised[-1] = " ".join(edit(rng, revised[-1].split()))
+            if rng.random() < 0.5:
+                revised.append(" ".join(edit(rng, words)))
+                revised.append(" ".join(paragraph(rng)))
+            neighbor = True
+            continue
+        if rng.random() < edited or neighbor:
+            words = edit(rng, words)
+        neighbor = False
+        revised.append(" ".join(words))
+    return "\n".join(original), "\n".join(revised)
+
+
+def build_long_paragraph(rng: random.Random, sentences: int):
+    """Um parágrafo de milhares de frases, com edições espalhadas, frases removidas e inseridas."""
+    original, revised = [], []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        sentence = " ".join(words).capitalize() + "."
+        original.append(sentence)
+        roll = rng.random()
+        if roll < 0.02:
+            continue
+        if roll < 0.04:
+            revised.append(sentence)
+            revised.append(" ".join(rng.choice(WORDS) for _ in range(10)).capitalize() + ".")
+        elif roll < 0.3:
+            revised.append(" ".join(edit(rng, words)).capitalize() + ".")
+        else:
+            revised.append(sentence)
+    return " ".join(original), " ".join(revised)
+
+
+def report(label: str, original: str, revised: str, repeat: int) -> None:
+    stats = edit_stats(original, revised)
+    elapsed = timed(lambda: edit_stats(original, revised), repeat)
+    print(f"{label}: {len(original)} caracteres")
+    print(f"  distância: {stats.char_distance} caracteres ({stats.char_rate:.2%}), "
+          f"{stats.word_distance} palavras ({stats.word_rate:.2%})")
+    print(f"  edit_stats: {elapsed:8.2f} ms (limite {MAX_CHAPTER_MS} ms) "
+          f"{'ok' if elapsed <= MAX_CHAPTER_MS else 'ACIMA DO LIMITE'}")
+
+
+def dynamic_programming(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=120)
+    parser.add_argument("--edited", type=float, default=0.3)
+    parser.add_argument("--restructured", type=float, default=0.05,
+                        help="fração de parágrafos removidos ou seguidos de um inserido")
+    parser.add_argument("--long-sentences", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    original, revised = build_chapter(rng, args.paragraphs, args.edited)
+    report(f"Capítulo com {args.paragraphs} parágrafos, {args.edited:.0%} editados", original, revised, args.repeat)
+    restructured = build_chapter(rng, args.paragraphs, args.edited, args.restructured)
+    report(f"Capítulo com {args.restructured:.0%} dos parágrafos inseridos/removidos entre editados",
+           *restructured, args.repeat)
+    report(f"Parágrafo único de {args.long_sentences} frases", *build_long_paragraph(rng, args.long_sentences),
+           max(1, args.repeat // 4))
+
+    paragraph_a = original.split("\n")[0]
+    paragraph_b = " ".join(reversed(paragraph_a.split()))
+    assert levenshtein(paragraph_a, paragraph_b) == dynamic_programming(paragraph_a, paragraph_b)
+    bitparallel_ms = timed(lambda: levenshtein(paragraph_a, paragraph_b), args.repeat)
+    dp_ms = timed(lambda: dynamic_programming(paragraph_a, paragraph_b), max(1, args.repeat // 10))
+
+    print(f"Parágrafo de {len(paragraph_a)} caracteres reescrito:")
+    print(f"  bit-paralelo:           {bitparallel_ms:8.2f} ms")
+    print(f"  programação dinâmica:   {dp_ms:8.2f} ms ({dp_ms / bitparallel_ms:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Mede a latência da busca de exemplos few-shot num índice com N
+post-edições sintéticas de um mesmo perfil e par de idiomas.
+
+Uso:
+    python benchmarks/bench_example_retrieval.py [--examples 100000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.example_retrieval import FEW_SHOT_EXAMPLES, FEW_SHOT_MIN_SCORE, ExampleIndex
+
+# Orçamento por segmento para não pesar na tradução
+MAX_P95_MS = 5.0
+
+
+def vocabulary(rng: random.Random, size: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def sentence(rng: random.Random, words, common):
+    # Distribuição com cauda longa: poucas palavras muito frequentes, muitas raras
+    return " ".join(
+        rng.choice(common) if rng.random() < 0.4 else words[int(rng.paretovariate(1.1)) % len(words)]
+        for _ in range(rng.randint(8, 30))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    words = vocabulary(rng, 30_000)
+    common = vocabulary(rng, 60)
+    rng.shuffle(words)
+
+    index = ExampleIndex()
+    sources = []
+    start = time.perf_counter()
+    for i in range(args.examples):
+        source = sentence(rng, words, common)
+        sources.append(source)
+        index.add(i + 1, i + 1, source, source.upper())
+    build = time.perf_counter() - start
+
+    # Metade das consultas são variações de exemplos existentes, metade textos novos
+    queries = []
+    for i in range(args.queries):
+        if i % 2:
+            tokens = rng.choice(sources).split()
+            tokens[rng.randrange(len(tokens))] = rng.choice(words)
+            queries.append(" ".join(tokens))
+        else:
+            queries.append(sentence(rng, words, common))
+
+    latencies, found = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query, FEW_SHOT_EXAMPLES, FEW_SHOT_MIN_SCORE)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += bool(results)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+
+    print(f"Índice: {index.live} exemplos, {len(index.postings)} características, construído em {build:.1f} s")
+    print(f"Consultas: {len(queries)}, com exemplo encontrado: {found}")
+    print(f"Latência p50: {p50:6.2f} ms  p95: {p95:6.2f} ms  máx: {latencies[-1]:6.2f} ms "
+          f"(limite p95 {MAX_P95_MS} ms) {'ok' if p95 <= MAX_P95_MS else 'ACIMA DO LIMITE'}")
+
+
+if __name__ == "__main__":
+    main()
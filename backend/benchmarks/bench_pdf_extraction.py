@@ -0,0 +1,70 @@
+"""
+Compara a vazão da extração de PDF simples com a extração por layout
+num documento gerado com o corpus de regressão (duas colunas, cabeçalhos,
+rodapés e hifenização) ou num PDF informado.
+
+Uso:
+    python benchmarks/bench_pdf_extraction.py [--pages 200] [--repeat 3] [--file livro.pdf]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from document_processor import DocumentProcessor
+from pdf_corpus import build_pdf, make_chapters, typeset
+
+# Limite aceito para a extração por layout em relação à simples
+MAX_SLOWDOWN = 1.5
+
+
+def build_document(pages: int, path: str) -> None:
+    # Cada capítulo de 40 parágrafos ocupa cerca de 4 páginas em duas colunas
+    chapters = make_chapters(seed=11, num_chapters=pages // 4 + 1, paragraphs_per_chapter=40)
+    layout = typeset(chapters, columns=2, style="indent", header="Capítulo — {page}", footer="{page}")
+    build_pdf(layout[:pages], path)
+
+
+def measure(path: str, repeat: int) -> dict:
+    """Alterna os modos a cada rodada e fica com o melhor tempo de cada um."""
+    samples = {"simple": [], "layout": []}
+    for _ in range(repeat):
+        for mode in samples:
+            start = time.perf_counter()
+            DocumentProcessor(pdf_mode=mode).process_document(path, "application/pdf")
+            samples[mode].append(time.perf_counter() - start)
+    return {mode: min(times) for mode, times in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    path = args.file
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"bench_pdf_{args.pages}.pdf")
+        build_document(args.pages, path)
+
+    import PyPDF2
+    num_pages = len(PyPDF2.PdfReader(path).pages)
+
+    timings = measure(path, args.repeat)
+    simple, layout = timings["simple"], timings["layout"]
+    print(f"PDF: {path} ({num_pages} páginas)")
+    print(f"simple: {simple:7.2f} s  {num_pages / simple:7.1f} páginas/s")
+    print(f"layout: {layout:7.2f} s  {num_pages / layout:7.1f} páginas/s")
+    ratio = layout / simple
+    print(f"layout/simple: {ratio:.2f}x (limite {MAX_SLOWDOWN}x) {'ok' if ratio <= MAX_SLOWDOWN else 'ACIMA DO LIMITE'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Mede bytes trafegados e tempo de serialização do payload de um documento
+com 1000 parágrafos (formato de GET /api/documents/{id}).
+
+Uso:
+    python benchmarks/bench_responses.py [--paragraphs 1000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from compression import available_encodings, make_compressor
+
+WORDS = (
+    "o tradutor deve preservar o sentido original do texto mantendo o tom "
+    "e o estilo the translator must keep the meaning of the source while "
+    "adapting idioms chapter section paragraph document revision quality"
+).split()
+
+
+def build_payload(num_paragraphs: int, paragraphs_per_chapter: int = 50) -> dict:
+    rng = random.Random(42)
+    chapters = []
+    for start in range(0, num_paragraphs, paragraphs_per_chapter):
+        count = min(paragraphs_per_chapter, num_paragraphs - start)
+        chapters.append({
+            "title": f"Chapter {len(chapters) + 1}",
+            "paragraphs": [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+                for _ in range(count)
+            ],
+        })
+    return {
+        "id": 1,
+        "filename": "livro.pdf",
+        "mime_type": "application/pdf",
+        "size": 1_234_567,
+        "created_at": datetime.now(timezone.utc),
+        "chapters": chapters,
+        "metadata": {"num_pages": 300, "author": "Autor", "title": "Livro"},
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    compressor = make_compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = build_payload(args.paragraphs)
+
+    # Caminho antigo: jsonable_encoder + json.dumps da stdlib
+    default_ms = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    # Caminho novo: orjson direto sobre o dicionário
+    fast_ms = timed(lambda: ORJSONResponse(payload).body, args.repeat)
+
+    body = ORJSONResponse(payload).body
+    print(f"Documento com {args.paragraphs} parágrafos")
+    print(f"Serialização JSONResponse + jsonable_encoder: {default_ms:8.2f} ms")
+    print(f"Serialização ORJSONResponse direto:           {fast_ms:8.2f} ms ({default_ms / fast_ms:.1f}x)")
+    print()
+    print(f"{'codificação':<12}{'bytes':>12}{'razão':>10}{'tempo (ms)':>14}")
+    print(f"{'identity':<12}{len(body):>12}{1.0:>10.2f}{0.0:>14.2f}")
+    for encoding in available_encodings():
+        compressed = compress(body, encoding)
+        elapsed = timed(lambda: compress(body, encoding), max(1, args.repeat // 5))
+        ratio = len(body) / len(compressed)
+        print(f"{encoding:<12}{len(compressed):>12}{ratio:>10.2f}{elapsed:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
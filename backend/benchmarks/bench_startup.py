@@ -0,0 +1,110 @@
+"""
+Mede o tempo de inicialização da API:
+  1. tempo de importação de `main` (processo novo a cada rodada);
+  2. tempo até o primeiro 200 em GET / com o uvicorn.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10]
+
+Sem DATABASE_URL definido, usa um SQLite temporário.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_startup.db')}"
+    return env
+
+
+def measure_import(repeat: int) -> list:
+    """Tempo de `import main` descontado o custo de subir o interpretador."""
+    code = "import time; s = time.perf_counter(); import main; print(time.perf_counter() - s)"
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=_env(), stderr=subprocess.DEVNULL
+        )
+        samples.append(float(output.decode().strip().splitlines()[-1]) * 1000)
+    return samples
+
+
+def slowest_imports(top: int) -> list:
+    """Módulos com maior tempo cumulativo segundo `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(repeat: int, timeout: float = 30.0) -> list:
+    """Tempo entre iniciar o uvicorn e receber o primeiro 200 em GET /."""
+    samples = []
+    for _ in range(repeat):
+        port = _free_port()
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                        if response.status == 200:
+                            samples.append((time.perf_counter() - start) * 1000)
+                            break
+                except OSError:
+                    time.sleep(0.01)
+            else:
+                raise RuntimeError("Servidor não respondeu dentro do tempo limite")
+        finally:
+            process.terminate()
+            process.wait()
+    return samples
+
+
+def _summary(samples: list) -> str:
+    return f"mediana {statistics.median(samples):8.1f} ms  (min {min(samples):.1f}, max {max(samples):.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Importação de main:      {_summary(measure_import(args.repeat))}")
+    print(f"Primeiro 200 em GET /:   {_summary(measure_first_response(args.repeat))}")
+    print()
+    print(f"Importações mais lentas (cumulativo):")
+    for cumulative_us, module in slowest_imports(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Mede pico de memória e vazão da ingestão de TXT grandes:
+  - baseline: `read()` do arquivo inteiro + `split('\\n\\n')` (implementação antiga);
+  - reader:   `text_reader.iter_paragraphs` (mmap, parágrafos sob demanda);
+  - process:  `DocumentProcessor._process_txt` (reader + lista de parágrafos).
+
+Cada modo roda num processo novo para que o pico de RSS seja isolado.
+
+Uso:
+    python benchmarks/bench_txt_ingest.py [--size-mb 1024] [--encoding latin-1] [--modes reader,baseline]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+WORDS = (
+    "tradução capítulo coração informação não então ação também além "
+    "o texto deve manter o sentido original the translator keeps the meaning "
+    "of the source document while adapting idioms"
+).split()
+
+
+def generate_file(path: str, size_mb: int, encoding: str) -> None:
+    """Gera um texto com parágrafos de 40 a 120 palavras até o tamanho pedido."""
+    rng = random.Random(42)
+    # Um bloco de parágrafos reaproveitado evita que a geração domine o tempo
+    block = "\n\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+        for _ in range(500)
+    ).encode(encoding) + b"\n\n"
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as file:
+        written = 0
+        while written < target:
+            file.write(block)
+            written += len(block)
+
+
+def _run_mode(mode: str, path: str, encoding: str) -> None:
+    import resource
+
+    start = time.perf_counter()
+    if mode == "baseline":
+        with open(path, "r", encoding=encoding) as file:
+            content = file.read()
+        count = len([p.strip() for p in content.split("\n\n") if p.strip()])
+    elif mode == "reader":
+        from text_reader import iter_paragraphs
+        count = sum(1 for _ in iter_paragraphs(path))
+    elif mode == "process":
+        from document_processor import DocumentProcessor
+        count = len(DocumentProcessor()._process_txt(path)["chapters"][0]["paragraphs"])
+    else:
+        raise ValueError(f"Modo desconhecido: {mode}")
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss vem em KB no Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{count} {elapsed} {peak_mb}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--modes", default="baseline,reader,process")
+    parser.add_argument("--file", help="Usa um arquivo existente em vez de gerar um")
+    parser.add_argument("--_run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._run:
+        _run_mode(args._run, args.file, args.encoding)
+        return
+
+    path = args.file
+    cleanup = False
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"bench_txt_{args.size_mb}mb_{args.encoding}.txt")
+        if not os.path.exists(path):
+            print(f"Gerando {args.size_mb} MB em {path}...")
+            generate_file(path, args.size_mb, args.encoding)
+            cleanup = True
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"Arquivo: {size_mb:.0f} MB ({args.encoding})")
+    print(f"{'modo':<10} {'parágrafos':>12} {'tempo (s)':>10} {'MB/s':>8} {'pico RSS (MB)':>14}")
+    try:
+        for mode in args.modes.split(","):
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), "--_run", mode,
+                 "--file", path, "--encoding", args.encoding],
+                cwd=BACKEND_DIR
+            )
+            count, elapsed, peak_mb = output.decode().split()
+            elapsed = float(elapsed)
+            print(f"{mode:<10} {int(count):>12} {elapsed:>10.2f} {size_mb / elapsed:>8.1f} {float(peak_mb):>14.1f}")
+    finally:
+        if cleanup:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Corpus de regressão da extração de PDF por layout.
+
+Cada caso gera um PDF a partir de capítulos conhecidos (uma ou duas
+colunas, hifenização de fim de linha, cabeçalhos e rodapés repetidos,
+números de página, parágrafos que atravessam colunas e páginas) e
+confere se `DocumentProcessor` devolve exatamente os mesmos capítulos.
+
+Uso:
+    python benchmarks/pdf_corpus.py [--mode layout] [--out /tmp/pdf_corpus]
+
+Sai com código 1 se algum caso divergir.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "the translator keeps meaning tone and rhythm of every sentence while "
+    "adapting idioms for readers o tradutor mantém o sentido original e o "
+    "ritmo de cada frase adaptando expressões para leitores "
+    "international documentation responsibility particularly understanding "
+    "informação comunicação desenvolvimento característica significativamente "
+    "interpretation consistency terminology"
+).split()
+
+Chapter = Tuple[str, List[str]]
+TextItem = Tuple[float, float, float, str]
+
+
+def make_chapters(seed: int, num_chapters: int, paragraphs_per_chapter: int) -> List[Chapter]:
+    rng = random.Random(seed)
+    chapters = []
+    for number in range(num_chapters):
+        paragraphs = []
+        for _ in range(paragraphs_per_chapter):
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            paragraphs.append(" ".join(sentences))
+        chapters.append((f"CHAPTER {'ONE TWO THREE FOUR FIVE SIX'.split()[number % 6]}", paragraphs))
+    return chapters
+
+
+def _wrap(text: str, chars: int, hyphenate: bool) -> List[str]:
+    """Quebra em linhas de até `chars` caracteres, hifenizando palavras longas."""
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) <= chars:
+            current = candidate
+            continue
+        room = chars - len(current) - (1 if current else 0) - 1
+        if hyphenate and word.isalpha() and len(word) >= 8 and room >= 3 and len(word) - room >= 3:
+            lines.append(f"{current} {word[:room]}-" if current else f"{word[:room]}-")
+            current = word[room:]
+        else:
+            lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def typeset(
+    chapters: List[Chapter],
+    columns: int = 1,
+    style: str = "gap",
+    header: Optional[str] = None,
+    footer: str = "{page}",
+    size: float = 10,
+    width: float = 612,
+    height: float = 792,
+    margin: float = 72,
+    gutter: float = 24,
+    hyphenate: bool = True,
+) -> List[List[TextItem]]:
+    """Distribui os capítulos em páginas; `header`/`footer` aceitam {page}."""
+    leading = size * 1.2
+    column_width = (width - 2 * margin - gutter * (columns - 1)) / columns
+    chars = int(column_width / (size * 0.5))
+    top, bottom = height - margin, margin
+
+    pages: List[List[TextItem]] = []
+    state = {"column": columns, "y": bottom}
+
+    def new_column():
+        state["column"] += 1
+        if state["column"] >= columns:
+            state["column"] = 0
+            page_number = len(pages) + 1
+            items: List[TextItem] = []
+            if header:
+                items.append((margin, height - 36, size - 1, header.format(page=page_number)))
+            if footer:
+                items.append((width / 2 - 10, 30, size - 1, footer.format(page=page_number)))
+            pages.append(items)
+        state["y"] = top
+
+    def place(text: str, x_offset: float, line_size: float, space_before: float):
+        if state["y"] != top:
+            state["y"] -= space_before
+        if state["y"] - line_size * 1.2 < bottom:
+            new_column()
+        x = margin + state["column"] * (column_width + gutter) + x_offset
+        pages[-1].append((x, state["y"], line_size, text))
+        state["y"] -= line_size * 1.2
+
+    for title, paragraphs in chapters:
+        place(title, 0, size + 4, leading * 2)
+        for paragraph in paragraphs:
+            lines = _wrap(paragraph, chars - (3 if style == "indent" else 0), hyphenate)
+            for index, line in enumerate(lines):
+                first = index == 0
+                indent = 15 if style == "indent" and first else 0
+                place(line, indent, size, leading * 0.8 if first and style == "gap" else 0)
+    return pages
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("cp1252")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def build_pdf(pages: List[List[TextItem]], path: str, width: float = 612, height: float = 792) -> None:
+    """PDF mínimo com Helvetica, um Tj por linha na posição indicada."""
+    objects: List[Optional[bytes]] = [
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        None,  # /Pages, preenchido no fim
+    ]
+    kids = []
+    for items in pages:
+        stream = b"\n".join(
+            b"BT /F1 %.1f Tf %.2f %.2f Td (%s) Tj ET" % (size, x, y, _pdf_string(text))
+            for x, y, size, text in items
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 1 0 R >> >> >>" % (width, height, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, len(objects), xref
+    )
+    with open(path, "wb") as file:
+        file.write(output)
+
+
+CASES: Dict[str, dict] = {
+    "single_column_hyphenation": dict(
+        chapters=make_chapters(1, 2, 8), columns=1, style="gap",
+        header="The Translator's Handbook", footer="{page}",
+    ),
+    "two_columns_indented": dict(
+        chapters=make_chapters(2, 2, 12), columns=2, style="indent",
+        header="Capítulo 1 — Página {page}", footer="- {page} -",
+    ),
+    "two_columns_gap_page_of": dict(
+        chapters=make_chapters(3, 3, 10), columns=2, style="gap",
+        header=None, footer="Página {page} de 9",
+    ),
+    "three_columns_no_hyphenation": dict(
+        chapters=make_chapters(4, 1, 14), columns=3, style="indent",
+        header="Relatório anual", footer="p. {page}", hyphenate=False,
+    ),
+    # PDF gerado pela própria exportação da API
+    "exported_document": dict(chapters=make_chapters(5, 3, 15), exporter=True),
+}
+
+
+def build_case(name: str, directory: str) -> Tuple[str, List[Chapter]]:
+    options = dict(CASES[name])
+    chapters = options.pop("chapters")
+    path = os.path.join(directory, f"{name}.pdf")
+    if options.pop("exporter", False):
+        from document_exporter import ExportChapter, stream_pdf
+        with open(path, "wb") as file:
+            for chunk in stream_pdf(ExportChapter(title, paragraphs, None) for title, paragraphs in chapters):
+                file.write(chunk)
+    else:
+        build_pdf(typeset(chapters, **options), path)
+    return path, chapters
+
+
+def check_case(name: str, directory: str, mode: str) -> Tuple[int, int]:
+    """Retorna (parágrafos esperados encontrados, total esperado)."""
+    from document_processor import DocumentProcessor
+
+    path, expected = build_case(name, directory)
+    result = DocumentProcessor(pdf_mode=mode).process_document(path, "application/pdf")
+    extracted = set()
+    for chapter in result["chapters"]:
+        extracted.add(chapter["title"])
+        extracted.update(chapter["paragraphs"])
+    wanted = [text for title, paragraphs in expected for text in [title] + paragraphs]
+    found = sum(1 for text in wanted if text in extracted)
+    if found != len(wanted) or len(extracted) != len(set(wanted)):
+        for text in wanted:
+            if text not in extracted:
+                print(f"    faltando: {text[:90]}...")
+                break
+        for text in sorted(extracted - set(wanted)):
+            print(f"    inesperado: {text[:90]}...")
+            break
+    return found, len(wanted)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", default="layout", choices=["layout", "simple"])
+    parser.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "pdf_corpus"))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    failures = 0
+    for name in CASES:
+        found, total = check_case(name, args.out, args.mode)
+        status = "ok" if found == total else "FALHOU"
+        failures += found != total
+        print(f"{name:<32} {found:>4}/{total:<4} {status}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
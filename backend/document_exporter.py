@@ -0,0 +1,401 @@
+import logging
+import os
+import zipfile
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+from sqlalchemy.orm import Session
+
+from models import Chapter
+from services.confidential import PLAINTEXT, PlainCipher
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+EXPORT_FORMATS = {
+    'txt': 'text/plain',
+    'docx': DOCX_MIME_TYPE,
+    'pdf': 'application/pdf',
+}
+
+
+class ExportChapter(NamedTuple):
+    title: str
+    paragraphs: List[str]
+    styles: List[Optional[str]]
+
+
+def iter_export_chapters(db: Session, document_id: int, language: str,
+                         fallback_to_original: bool = True,
+                         cipher: PlainCipher = PLAINTEXT) -> Iterator[ExportChapter]:
+    """
+    Percorre os capítulos traduzidos de um documento, um por vez.
+
+    Cada capítulo é carregado e descartado da sessão em seguida, então o
+    uso de memória depende do maior capítulo, não do livro inteiro.
+    Parágrafos sem tradução saem no original (ou são omitidos). Textos de
+    documentos confidenciais são decifrados aqui, capítulo a capítulo.
+    """
+    chapter_ids = [
+        chapter_id for (chapter_id,) in
+        db.query(Chapter.id).filter(Chapter.document_id == document_id).order_by(Chapter.order)
+    ]
+    for chapter_id in chapter_ids:
+        chapter = db.get(Chapter, chapter_id)
+        if chapter is None:
+            continue
+        originals = cipher.decrypt_list(chapter.content or [])
+        translations = cipher.decrypt_list((chapter.translated_content or {}).get(language) or [])
+        styles = chapter.paragraph_styles or []
+
+        paragraphs, paragraph_styles = [], []
+        for index, original in enumerate(originals):
+            text = translations[index] if index < len(translations) else None
+            if text is None:
+                if not fallback_to_original:
+                    continue
+                text = original
+            paragraphs.append(text)
+            paragraph_styles.append(styles[index] if index < len(styles) else None)
+
+        db.expunge(chapter)
+        yield ExportChapter(cipher.decrypt(chapter.title), paragraphs, paragraph_styles)
+
+
+# ---------------------------------------------------------------------------
+# TXT
+# ---------------------------------------------------------------------------
+
+def stream_txt(chapters: Iterable[ExportChapter]) -> Iterator[bytes]:
+    """Texto simples: título do capítulo e parágrafos separados por linha em branco."""
+    first = True
+    for chapter in chapters:
+        parts = [] if first else ['\n']
+        first = False
+        parts.append(f"{chapter.title}\n\n")
+        parts.extend(f"{paragraph}\n\n" for paragraph in chapter.paragraphs)
+        yield ''.join(parts).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# DOCX
+# ---------------------------------------------------------------------------
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Estilos mínimos usados quando o original não é um DOCX
+_DEFAULT_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="160"/></w:pPr><w:rPr><w:sz w:val="22"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:body>'
+)
+
+_DOCUMENT_END = (
+    '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+
+class _ChunkBuffer:
+    """
+    Destino de escrita não posicionável para o zipfile: acumula os bytes
+    gerados até serem drenados para a resposta HTTP.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _docx_paragraph(text: str, style: Optional[str]) -> str:
+    style_xml = f'<w:pPr><w:pStyle w:val="{escape(style, {chr(34): "&quot;"})}"/></w:pPr>' if style else ''
+    # Quebras de linha internas viram <w:br/>
+    runs = '<w:br/>'.join(
+        f'<w:t xml:space="preserve">{escape(line)}</w:t>' for line in text.split('\n')
+    )
+    return f'<w:p>{style_xml}<w:r>{runs}</w:r></w:p>'
+
+
+def _original_styles(source_path: Optional[str]) -> Optional[bytes]:
+    """styles.xml do DOCX original, para que os estilos dos parágrafos continuem válidos."""
+    if not source_path or not os.path.exists(source_path):
+        return None
+    try:
+        with zipfile.ZipFile(source_path) as source:
+            return source.read('word/styles.xml')
+    except (KeyError, zipfile.BadZipFile):
+        return None
+
+
+def stream_docx(chapters: Iterable[ExportChapter], source_path: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Gera um DOCX em streaming. O ZIP é escrito com descritores de dados
+    (sem voltar no arquivo), e o document.xml é comprimido capítulo a
+    capítulo, sem montar o documento inteiro em memória.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        package.writestr('_rels/.rels', _ROOT_RELS)
+        package.writestr('word/_rels/document.xml.rels', _DOCUMENT_RELS)
+        package.writestr('word/styles.xml', _original_styles(source_path) or _DEFAULT_STYLES)
+        yield buffer.drain()
+
+        with package.open('word/document.xml', mode='w') as document:
+            document.write(_DOCUMENT_START.encode('utf-8'))
+            for chapter in chapters:
+                parts = [_docx_paragraph(chapter.title, 'Heading1')]
+                parts.extend(
+                    _docx_paragraph(paragraph, style)
+                    for paragraph, style in zip(chapter.paragraphs, chapter.styles)
+                )
+                document.write(''.join(parts).encode('utf-8'))
+                yield buffer.drain()
+            document.write(_DOCUMENT_END.encode('utf-8'))
+    yield buffer.drain()
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+# Larguras da Helvetica (1/1000 em) para ASCII 32-126
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 em pontos
+MARGIN = 56
+BODY_SIZE, TITLE_SIZE = 11, 16
+LEADING = 15
+# Codificação das fontes padrão (WinAnsiEncoding)
+PDF_ENCODING = 'cp1252'
+
+
+def _text_width(text: str, size: float) -> float:
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += _HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+    return total * size / 1000
+
+
+def _wrap(text: str, size: float, max_width: float) -> List[str]:
+    """Quebra o texto em linhas, acumulando a largura palavra a palavra."""
+    space = _text_width(' ', size)
+    lines = []
+    for raw_line in text.split('\n'):
+        current, width = [], 0.0
+        for word in raw_line.split():
+            word_width = _text_width(word, size)
+            if current and width + space + word_width > max_width:
+                lines.append(' '.join(current))
+                current, width = [word], word_width
+            else:
+                width += word_width + (space if current else 0)
+                current.append(word)
+        lines.append(' '.join(current))
+    return lines
+
+
+def pdf_unsupported_characters(chapters: Iterable[ExportChapter], limit: int = 10) -> List[str]:
+    """
+    Caracteres dos capítulos fora da codificação das fontes do PDF
+    (Helvetica com WinAnsiEncoding, isto é, cp1252), até `limit`. O PDF
+    só é gerado sem eles: trocá-los por '?' corromperia o texto.
+    """
+    found: List[str] = []
+    for chapter in chapters:
+        for text in (chapter.title, *chapter.paragraphs):
+            try:
+                text.encode(PDF_ENCODING)
+            except UnicodeEncodeError:
+                for char in text:
+                    if char not in found and not _pdf_encodable(char):
+                        found.append(char)
+                        if len(found) >= limit:
+                            return found
+    return found
+
+
+def _pdf_encodable(char: str) -> bool:
+    try:
+        char.encode(PDF_ENCODING)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode(PDF_ENCODING)
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class _PdfWriter:
+    """Escritor mínimo de PDF que emite os objetos à medida que são criados."""
+
+    # Objetos fixos: 1 catálogo, 2 árvore de páginas, 3 e 4 fontes
+    CATALOG, PAGES, FONT_REGULAR, FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self):
+        self.offsets = {}
+        self.position = 0
+        self.next_id = 5
+        self.page_ids = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def obj(self, object_id: int, body: bytes) -> bytes:
+        self.offsets[object_id] = self.position
+        return self._emit(b'%d 0 obj\n' % object_id + body + b'\nendobj\n')
+
+    def fonts(self) -> bytes:
+        return (
+            self.obj(self.FONT_REGULAR, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                        b'/Encoding /WinAnsiEncoding >>')
+            + self.obj(self.FONT_BOLD, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                                       b'/Encoding /WinAnsiEncoding >>')
+        )
+
+    def page(self, content: bytes) -> bytes:
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        stream = self.obj(content_id, b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        page = self.obj(page_id, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>'
+            % (self.PAGES, PAGE_WIDTH, PAGE_HEIGHT, self.FONT_REGULAR, self.FONT_BOLD, content_id)
+        ))
+        return stream + page
+
+    def trailer(self) -> bytes:
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        data = self.obj(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+        data += self.obj(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES)
+
+        xref_position = self.position
+        size = self.next_id
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for object_id in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets.get(object_id, 0))
+        xref.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (size, self.CATALOG, xref_position))
+        return data + self._emit(b''.join(xref))
+
+
+def stream_pdf(chapters: Iterable[ExportChapter]) -> Iterator[bytes]:
+    """
+    Gera um PDF simples (Helvetica, A4) página a página. Só os offsets
+    dos objetos ficam em memória até o xref final.
+    """
+    writer = _PdfWriter()
+    yield writer.header() + writer.fonts()
+
+    max_width = PAGE_WIDTH - 2 * MARGIN
+    top, bottom = PAGE_HEIGHT - MARGIN, MARGIN
+    commands: List[bytes] = []
+    y = top
+
+    def flush_page() -> bytes:
+        nonlocal commands, y
+        content = b'\n'.join(commands)
+        commands, y = [], top
+        return writer.page(content)
+
+    def line(text: str, font: bytes, size: int) -> Optional[bytes]:
+        nonlocal y
+        page = None
+        if y - size < bottom:
+            page = flush_page()
+        y -= LEADING if size == BODY_SIZE else size + 6
+        commands.append(b'BT /%s %d Tf %d %.2f Td %s Tj ET' % (font, size, MARGIN, y, _pdf_string(text)))
+        return page
+
+    for chapter in chapters:
+        # Cada capítulo começa em uma página nova
+        if commands:
+            yield flush_page()
+        for title_line in _wrap(chapter.title, TITLE_SIZE, max_width):
+            page = line(title_line, b'F2', TITLE_SIZE)
+            if page:
+                yield page
+        y -= LEADING
+        for paragraph in chapter.paragraphs:
+            for text_line in _wrap(paragraph, BODY_SIZE, max_width):
+                page = line(text_line, b'F1', BODY_SIZE)
+                if page:
+                    yield page
+            y -= LEADING / 2
+
+    if commands or not writer.page_ids:
+        yield flush_page()
+    yield writer.trailer()
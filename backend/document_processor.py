@@ -1,16 +1,33 @@
+import io
 import os
-import PyPDF2
-from docx import Document as DocxDocument
 import logging
 import json
-from typing import Dict, List, Optional
+from contextlib import nullcontext
+from typing import BinaryIO, Dict, List, Optional, Union
 import traceback
 import re
+import hashlib
+import unicodedata
+
+from services.confidential import redact
+from text_reader import ENCODING_SAMPLE_SIZE, detect_encoding, iter_buffer_paragraphs, iter_paragraphs, sniff_encoding
 
 logger = logging.getLogger(__name__)
 
+def normalize_paragraph(text: str) -> str:
+    """Normaliza Unicode (NFC) e espaços para comparar parágrafos."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+def paragraph_hash(text: str) -> str:
+    """Hash de conteúdo de um parágrafo normalizado."""
+    return hashlib.sha1(normalize_paragraph(text).encode('utf-8')).hexdigest()
+
+# Extração de PDF: 'layout' (posição do texto) ou 'simple' (texto corrido por página)
+PDF_EXTRACTION_MODE = os.getenv("PDF_EXTRACTION_MODE", "layout")
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, pdf_mode: Optional[str] = None):
+        self.pdf_mode = pdf_mode or PDF_EXTRACTION_MODE
         self.supported_types = {
             'application/pdf': self._process_pdf,
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': self._process_docx,
@@ -21,15 +38,25 @@ class DocumentProcessor:
         """
         Processa um documento e retorna seus metadados e conteúdo estruturado.
         """
+        return self._process(file_path, mime_type, file_path)
+
+    def process_bytes(self, data: bytes, mime_type: str) -> Dict:
+        """
+        Processa um documento a partir do conteúdo em memória, sem gravar
+        nada em disco (documentos confidenciais).
+        """
+        return self._process(io.BytesIO(data), mime_type, f"buffer em memória ({len(data)} bytes)")
+
+    def _process(self, source: Union[str, BinaryIO], mime_type: str, description: str) -> Dict:
         try:
             if mime_type not in self.supported_types:
                 raise ValueError(f"Tipo de arquivo não suportado: {mime_type}")
 
-            logger.info(f"Processando documento: {file_path}")
+            logger.info(f"Processando documento: {description}")
             logger.info(f"Tipo MIME: {mime_type}")
 
             processor = self.supported_types[mime_type]
-            result = processor(file_path)
+            result = processor(source)
 
             logger.info(f"Documento processado com sucesso: {len(result['chapters'])} capítulos encontrados")
             return result
@@ -39,92 +66,75 @@ class DocumentProcessor:
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _process_pdf(self, file_path: str) -> Dict:
+    def _process_pdf(self, source: Union[str, BinaryIO]) -> Dict:
         """
         Processa um arquivo PDF e extrai seu conteúdo estruturado.
         """
+        # Importado sob demanda: PyPDF2 só é carregado no primeiro PDF
+        import PyPDF2
+
         try:
             chapters = []
             metadata = {}
 
-            with open(file_path, 'rb') as file:
+            with open(source, 'rb') if isinstance(source, str) else nullcontext(source) as file:
                 try:
                     reader = PyPDF2.PdfReader(file)
                     logger.info(f"PDF aberto com sucesso: {len(reader.pages)} páginas")
                     
-                    # Extrair metadados
+                    # Extrair metadados (PDFs sem dicionário /Info retornam None)
+                    info = reader.metadata or {}
                     metadata = {
                         'num_pages': len(reader.pages),
-                        'author': reader.metadata.get('/Author', ''),
-                        'creator': reader.metadata.get('/Creator', ''),
-                        'producer': reader.metadata.get('/Producer', ''),
-                        'subject': reader.metadata.get('/Subject', ''),
-                        'title': reader.metadata.get('/Title', ''),
+                        'author': info.get('/Author', ''),
+                        'creator': info.get('/Creator', ''),
+                        'producer': info.get('/Producer', ''),
+                        'subject': info.get('/Subject', ''),
+                        'title': info.get('/Title', ''),
                     }
-                    logger.info(f"Metadados extraídos: {metadata}")
+                    logger.info(f"Metadados extraídos: {redact(str(metadata))}")
 
                     current_chapter = {
                         'title': 'Chapter 1',
                         'paragraphs': []
                     }
 
-                    # Processar cada página
-                    for page_num in range(len(reader.pages)):
+                    metadata['extraction_mode'] = self.pdf_mode
+                    pages_paragraphs = None
+                    if self.pdf_mode == 'layout':
                         try:
-                            page = reader.pages[page_num]
-                            text = page.extract_text()
-                            
-                            if not text or not text.strip():
-                                logger.warning(f"Página {page_num + 1} está vazia")
-                                continue
-
-                            # Dividir o texto em parágrafos
-                            paragraphs = []
-                            current_paragraph = []
-                            
-                            for line in text.split('\n'):
-                                line = line.strip()
-                                if not line:
-                                    if current_paragraph:
-                                        paragraphs.append(' '.join(current_paragraph))
-                                        current_paragraph = []
-                                else:
-                                    current_paragraph.append(line)
-                            
-                            if current_paragraph:
-                                paragraphs.append(' '.join(current_paragraph))
-
-                            # Filtrar parágrafos vazios
-                            paragraphs = [p for p in paragraphs if p.strip()]
-                            
-                            # Detectar possíveis títulos de capítulo
-                            for p in paragraphs:
-                                # Padrões para títulos de capítulo
-                                chapter_patterns = [
-                                    r'^chapter\s+\d+',
-                                    r'^capítulo\s+\d+',
-                                    r'^\d+\.\s+',
-                                    r'^part\s+\d+',
-                                    r'^section\s+\d+',
-                                ]
-                                
-                                is_chapter = any(re.match(pattern, p.lower()) for pattern in chapter_patterns)
-                                
-                                if is_chapter or (len(p) < 100 and p.isupper()):
-                                    # Se encontrarmos um novo capítulo, salvamos o atual e começamos um novo
-                                    if current_chapter['paragraphs']:
-                                        chapters.append(current_chapter)
-                                    current_chapter = {
-                                        'title': p,
-                                        'paragraphs': []
-                                    }
-                                else:
-                                    current_chapter['paragraphs'].append(p)
-
+                            from pdf_layout import extract_layout_paragraphs
+                            pages_paragraphs = extract_layout_paragraphs(reader)
                         except Exception as e:
-                            logger.error(f"Erro ao processar página {page_num + 1}: {str(e)}")
-                            logger.error(traceback.format_exc())
-                            continue
+                            logger.warning(f"Extração por layout falhou, usando extração simples: {str(e)}")
+                            metadata['extraction_mode'] = 'simple'
+                    if pages_paragraphs is None:
+                        pages_paragraphs = self._simple_pdf_paragraphs(reader)
+
+                    for paragraphs in pages_paragraphs:
+                        # Detectar possíveis títulos de capítulo
+                        for p in paragraphs:
+                            # Padrões para títulos de capítulo
+                            chapter_patterns = [
+                                r'^chapter\s+\d+',
+                                r'^capítulo\s+\d+',
+                                r'^\d+\.\s+',
+                                r'^part\s+\d+',
+                                r'^section\s+\d+',
+                            ]
+
+                            is_chapter = any(re.match(pattern, p.lower()) for pattern in chapter_patterns)
+
+                            if is_chapter or (len(p) < 100 and p.isupper()):
+                                # Se encontrarmos um novo capítulo, salvamos o atual e começamos um novo
+                                if current_chapter['paragraphs']:
+                                    chapters.append(current_chapter)
+                                current_chapter = {
+                                    'title': p,
+                                    'paragraphs': []
+                                }
+                            else:
+                                current_chapter['paragraphs'].append(p)
 
                     # Adicionar o último capítulo
                     if current_chapter['paragraphs']:
@@ -155,16 +165,60 @@ class DocumentProcessor:
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _process_docx(self, file_path: str) -> Dict:
+    def _simple_pdf_paragraphs(self, reader) -> List[List[str]]:
+        """
+        Extração simples: texto de cada página com linhas unidas por espaço
+        e parágrafos separados por linhas vazias.
+        """
+        pages_paragraphs = []
+        for page_num in range(len(reader.pages)):
+            try:
+                page = reader.pages[page_num]
+                text = page.extract_text()
+
+                if not text or not text.strip():
+                    logger.warning(f"Página {page_num + 1} está vazia")
+                    continue
+
+                # Dividir o texto em parágrafos
+                paragraphs = []
+                current_paragraph = []
+
+                for line in text.split('\n'):
+                    line = line.strip()
+                    if not line:
+                        if current_paragraph:
+                            paragraphs.append(' '.join(current_paragraph))
+                            current_paragraph = []
+                    else:
+                        current_paragraph.append(line)
+
+                if current_paragraph:
+                    paragraphs.append(' '.join(current_paragraph))
+
+                # Filtrar parágrafos vazios
+                pages_paragraphs.append([p for p in paragraphs if p.strip()])
+
+            except Exception as e:
+                logger.error(f"Erro ao processar página {page_num + 1}: {str(e)}")
+                logger.error(traceback.format_exc())
+                continue
+        return pages_paragraphs
+
+    def _process_docx(self, source: Union[str, BinaryIO]) -> Dict:
         """
         Processa um arquivo DOCX e extrai seu conteúdo estruturado.
         """
+        # Importado sob demanda: python-docx só é carregado no primeiro DOCX
+        from docx import Document as DocxDocument
+
         try:
-            doc = DocxDocument(file_path)
+            doc = DocxDocument(source)
             chapters = []
             current_chapter = {
                 'title': 'Chapter 1',
-                'paragraphs': []
+                'paragraphs': [],
+                'styles': []
             }
 
             for paragraph in doc.paragraphs:
@@ -178,10 +232,13 @@ class DocumentProcessor:
                         chapters.append(current_chapter)
                     current_chapter = {
                         'title': text,
-                        'paragraphs': []
+                        'paragraphs': [],
+                        'styles': []
                     }
                 else:
                     current_chapter['paragraphs'].append(text)
+                    # Estilo original do parágrafo (usado na exportação)
+                    current_chapter['styles'].append(paragraph.style.style_id if paragraph.style is not None else None)
 
             # Adicionar o último capítulo
             if current_chapter['paragraphs']:
@@ -205,16 +262,18 @@ class DocumentProcessor:
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _process_txt(self, file_path: str) -> Dict:
+    def _process_txt(self, source: Union[str, BinaryIO]) -> Dict:
         """
         Processa um arquivo TXT e extrai seu conteúdo estruturado.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            if not isinstance(source, str):
+                return self._process_txt_buffer(source.getvalue())
 
-            # Dividir em parágrafos
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
+            file_path = source
+            # Leitura mapeada em memória, parágrafo a parágrafo
+            encoding = sniff_encoding(file_path)
+            paragraphs = list(iter_paragraphs(file_path, encoding))
 
             # Criar um único capítulo com todos os parágrafos
             chapters = [{
@@ -227,6 +286,7 @@ class DocumentProcessor:
                 'size': os.path.getsize(file_path),
                 'modified': str(os.path.getmtime(file_path)),
                 'created': str(os.path.getctime(file_path)),
+                'encoding': encoding,
             }
 
             return {
@@ -238,3 +298,13 @@ class DocumentProcessor:
             logger.error(f"Erro ao processar TXT: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
+
+    def _process_txt_buffer(self, data: bytes) -> Dict:
+        encoding = detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+        return {
+            'metadata': {'size': len(data), 'encoding': encoding},
+            'chapters': [{
+                'title': 'Text Content',
+                'paragraphs': list(iter_buffer_paragraphs(data, encoding))
+            }]
+        }
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import re
+import zipfile
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_T = f'{{{W_NS}}}t'
+W_RPR = f'{{{W_NS}}}rPr'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Partes do pacote com texto traduzível (corpo, tabelas, cabeçalhos, rodapés, notas)
+TRANSLATABLE_PARTS = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+# Diretório dos DOCX traduzidos
+EXPORT_DIR = os.getenv(
+    "EXPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+)
+
+_TAG = re.compile(r'<g(\d+)>(.*?)</g\1>', re.DOTALL)
+
+
+class RunGroup(NamedTuple):
+    """Runs consecutivos com a mesma formatação, tratados como uma unidade."""
+    texts: list  # elementos <w:t>
+    text: str
+
+
+class DocxSegment(NamedTuple):
+    """Parágrafo traduzível com referências aos seus elementos de texto."""
+    part: str
+    groups: List[RunGroup]
+
+    @property
+    def source(self) -> str:
+        """Texto enviado ao tradutor; com várias formatações, cada grupo vira <gN>...</gN>."""
+        if len(self.groups) == 1:
+            return self.groups[0].text
+        return ''.join(f'<g{i}>{group.text}</g{i}>' for i, group in enumerate(self.groups, 1))
+
+
+def _owner_paragraph(element):
+    parent = element.getparent()
+    while parent is not None and parent.tag != W_P:
+        parent = parent.getparent()
+    return parent
+
+
+def _paragraph_groups(paragraph) -> List[RunGroup]:
+    groups: List[Tuple[bytes, list, list]] = []
+    for run in paragraph.iter(W_R):
+        # Parágrafos aninhados (caixas de texto) são segmentos próprios
+        if _owner_paragraph(run) is not paragraph:
+            continue
+        texts = run.findall(W_T)
+        if not texts:
+            continue
+        properties = run.find(W_RPR)
+        key = b'' if properties is None else _serialize(properties)
+        if groups and groups[-1][0] == key:
+            groups[-1][1].extend(texts)
+            groups[-1][2].extend(t.text or '' for t in texts)
+        else:
+            groups.append((key, list(texts), [t.text or '' for t in texts]))
+    return [RunGroup(texts, ''.join(parts)) for _, texts, parts in groups]
+
+
+def _serialize(element) -> bytes:
+    from lxml import etree
+    return etree.tostring(element)
+
+
+def extract_segments(package: zipfile.ZipFile) -> Tuple[Dict[str, object], List[DocxSegment]]:
+    """Lê as partes traduzíveis e retorna as árvores XML e os segmentos."""
+    from lxml import etree
+
+    trees, segments = {}, []
+    for name in package.namelist():
+        if not TRANSLATABLE_PARTS.match(name):
+            continue
+        root = etree.fromstring(package.read(name))
+        trees[name] = root
+        for paragraph in root.iter(W_P):
+            groups = _paragraph_groups(paragraph)
+            text = ''.join(group.text for group in groups)
+            # Só vale a pena traduzir se houver alguma letra
+            if groups and any(char.isalpha() for char in text):
+                segments.append(DocxSegment(name, groups))
+    return trees, segments
+
+
+def _set_text(element, text: str) -> None:
+    element.text = text
+    if text != text.strip():
+        element.set(XML_SPACE, 'preserve')
+
+
+def apply_translation(segment: DocxSegment, translated: str) -> bool:
+    """
+    Grava a tradução nos <w:t> do segmento. Retorna False quando as marcas
+    de formatação se perderam e o texto inteiro foi para o primeiro grupo.
+    """
+    groups = segment.groups
+    contents = None
+    if len(groups) == 1:
+        contents = [translated]
+    else:
+        matches = _TAG.findall(translated)
+        if sorted(int(index) for index, _ in matches) == list(range(1, len(groups) + 1)):
+            by_index = {int(index): text for index, text in matches}
+            contents = [by_index[i] for i in range(1, len(groups) + 1)]
+
+    preserved = contents is not None
+    if contents is None:
+        contents = [_TAG.sub(r'\2', translated)] + [''] * (len(groups) - 1)
+
+    for group, text in zip(groups, contents):
+        _set_text(group.texts[0], text)
+        for element in group.texts[1:]:
+            element.text = ''
+    return preserved
+
+
+async def translate_docx(
+    source_path: str,
+    output_path: str,
+    translate: Callable[[str], Awaitable[str]],
+    batch_size: int = 8
+) -> Dict:
+    """
+    Traduz um DOCX mantendo o layout: só os textos dos runs são trocados.
+    Partes sem texto traduzido (estilos, imagens, numeração, cabeçalhos
+    que ficaram iguais...) são copiadas byte a byte, sem reserializar o XML.
+    """
+    from lxml import etree
+
+    with zipfile.ZipFile(source_path) as package:
+        trees, segments = extract_segments(package)
+
+        # Textos repetidos (cabeçalhos, rótulos de tabela) são traduzidos uma vez
+        unique_sources = list(dict.fromkeys(segment.source for segment in segments))
+        translations: Dict[str, str] = {}
+        for start in range(0, len(unique_sources), batch_size):
+            batch = unique_sources[start:start + batch_size]
+            results = await asyncio.gather(*(translate(source) for source in batch))
+            translations.update(zip(batch, results))
+
+        # Só as partes com algum texto de fato trocado são reescritas; as
+        # demais (e as com tradução idêntica ao original) saem byte a byte
+        fallbacks, touched = 0, set()
+        for segment in segments:
+            translated = translations[segment.source]
+            if translated == segment.source:
+                continue
+            touched.add(segment.part)
+            if not apply_translation(segment, translated):
+                fallbacks += 1
+        trees = {name: tree for name, tree in trees.items() if name in touched}
+
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with zipfile.ZipFile(output_path, 'w') as output:
+            for info in package.infolist():
+                if info.filename in trees:
+                    data = etree.tostring(
+                        trees[info.filename], xml_declaration=True, encoding='UTF-8', standalone=True
+                    )
+                else:
+                    data = package.read(info.filename)
+                output.writestr(info, data, compress_type=info.compress_type)
+
+    logger.info(
+        f"DOCX traduzido: {len(segments)} segmentos ({len(unique_sources)} únicos), "
+        f"{fallbacks} sem preservação de formatação"
+    )
+    return {
+        "output_path": output_path,
+        "segments": len(segments),
+        "unique_segments": len(unique_sources),
+        "parts": sorted(trees),
+        "formatting_fallbacks": fallbacks,
+    }
@@ -0,0 +1,219 @@
+import re
+from difflib import SequenceMatcher
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# Palavras e pontuação são tokens; espaços não contam como edição
+_TOKEN = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+# Largura da faixa (em parágrafos) do alinhamento, além da diferença de tamanho dos trechos
+ALIGN_BAND = 8
+# Parágrafos maiores que isso são comparados frase a frase
+SENTENCE_SPLIT_CHARS = 2000
+
+
+def _common_affixes(a: Sequence, b: Sequence) -> Tuple[int, int]:
+    """Tamanho do prefixo e do sufixo comuns (post-edições costumam mudar só um trecho)."""
+    limit = min(len(a), len(b))
+    start = 0
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < limit - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    return start, end
+
+
+def levenshtein(a: Sequence[Hashable], b: Sequence[Hashable]) -> int:
+    """
+    Distância de edição (inserção, remoção e substituição) entre duas
+    sequências de caracteres ou de tokens, pelo algoritmo bit-paralelo de
+    Myers/Hyyrö: cada coluna da matriz vira um inteiro e o custo é
+    O(len(a) * len(b) / tamanho da palavra) em vez de O(len(a) * len(b)).
+    """
+    if a == b:
+        return 0
+    start, end = _common_affixes(a, b)
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    # A sequência menor vira o vetor de bits; o laço percorre a maior
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if not m:
+        return len(a)
+
+    peq: Dict[Hashable, int] = {}
+    for i, symbol in enumerate(b):
+        peq[symbol] = peq.get(symbol, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for symbol in a:
+        eq = peq.get(symbol, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+class EditStats(NamedTuple):
+    char_distance: int
+    word_distance: int
+    chars: int  # tamanho do texto revisado
+    words: int
+
+    @property
+    def char_rate(self) -> float:
+        """Edições de caractere por caractere do texto revisado (0 = sem mudança)."""
+        return self.char_distance / self.chars if self.chars else float(self.char_distance > 0)
+
+    @property
+    def word_rate(self) -> float:
+        """Edições de palavra por palavra do texto revisado (equivalente ao HTER sem deslocamentos)."""
+        return self.word_distance / self.words if self.words else float(self.word_distance > 0)
+
+    def as_dict(self) -> Dict:
+        return {
+            "char_distance": self.char_distance,
+            "word_distance": self.word_distance,
+            "chars": self.chars,
+            "words": self.words,
+            "char_rate": round(self.char_rate, 4),
+            "word_rate": round(self.word_rate, 4),
+        }
+
+
+def _sentences(text: str) -> List[str]:
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence]
+
+
+def _align(original: List[str], revised: List[str], tokens_a: List[List[str]],
+           tokens_b: List[List[str]]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    Alinha um a um os parágrafos de um trecho alterado (parágrafos inseridos,
+    removidos e editados lado a lado), por programação dinâmica numa faixa
+    em torno da diagonal. O custo de um par é estimado pelas palavras que
+    não têm em comum, sem calcular a distância de edição.
+    Retorna pares (índice original, índice revisado), com None nas pontas
+    sem par.
+    """
+    n, m = len(original), len(revised)
+    words_a = [frozenset(tokens) for tokens in tokens_a]
+    words_b = [frozenset(tokens) for tokens in tokens_b]
+    band = abs(n - m) + ALIGN_BAND
+    cost: Dict[Tuple[int, int], float] = {(0, 0): 0}
+    back: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    for i in range(n + 1):
+        center = i * m // n if n else 0
+        for j in range(max(0, center - band), min(m, center + band) + 1):
+            if not i and not j:
+                continue
+            options = []
+            if i and (i - 1, j) in cost:
+                options.append((cost[i - 1, j] + len(original[i - 1]) + 1, (i - 1, j)))
+            if j and (i, j - 1) in cost:
+                options.append((cost[i, j - 1] + len(revised[j - 1]) + 1, (i, j - 1)))
+            if i and j and (i - 1, j - 1) in cost:
+                a, b = words_a[i - 1], words_b[j - 1]
+                different = 1 - len(a & b) / (len(a | b) or 1)
+                size = max(len(original[i - 1]), len(revised[j - 1]))
+                options.append((cost[i - 1, j - 1] + size * different, (i - 1, j - 1)))
+            if options:
+                cost[i, j], back[i, j] = min(options)
+
+    pairs: List[Tuple[Optional[int], Optional[int]]] = []
+    i, j = n, m
+    while i or j:
+        previous_i, previous_j = back[i, j]
+        pairs.append((
+            previous_i if previous_i != i else None,
+            previous_j if previous_j != j else None,
+        ))
+        i, j = previous_i, previous_j
+    pairs.reverse()
+    return pairs
+
+
+def _pair_distance(before: str, after: str,
+                   tokens: Optional[Tuple[List[str], List[str]]] = None) -> Tuple[int, int]:
+    """Distâncias (caracteres, palavras) entre um parágrafo e sua revisão (tokens, se já calculados)."""
+    if before == after:
+        return 0, 0
+    if max(len(before), len(after)) > SENTENCE_SPLIT_CHARS:
+        # Parágrafo muito longo: frases alinhadas como os parágrafos de um capítulo
+        original, revised = _sentences(before), _sentences(after)
+        if len(original) > 1 or len(revised) > 1:
+            return _aligned_distance(original, revised)
+    tokens_before, tokens_after = tokens or (tokenize(before), tokenize(after))
+    return levenshtein(before, after), levenshtein(tokens_before, tokens_after)
+
+
+def _aligned_distance(original: List[str], revised: List[str]) -> Tuple[int, int]:
+    """
+    Soma das distâncias entre unidades (parágrafos ou frases): as idênticas
+    servem de âncora, as demais são alinhadas uma a uma e comparadas em
+    pares. Uma unidade sem par custa seu tamanho mais o separador.
+    """
+    char_distance = word_distance = 0
+    matcher = SequenceMatcher(None, original, revised, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        before, after = original[i1:i2], revised[j1:j2]
+        if len(before) == len(after) == 1:
+            # Um contra um: o par sempre sai mais barato que remover e inserir
+            chars, words = _pair_distance(before[0], after[0])
+            char_distance += chars
+            word_distance += words
+            continue
+        tokens_a = [tokenize(unit) for unit in before]
+        tokens_b = [tokenize(unit) for unit in after]
+        for i, j in _align(before, after, tokens_a, tokens_b):
+            if i is None:
+                char_distance += len(after[j]) + 1
+                word_distance += len(tokens_b[j])
+            elif j is None:
+                char_distance += len(before[i]) + 1
+                word_distance += len(tokens_a[i])
+            else:
+                chars, words = _pair_distance(before[i], after[j], (tokens_a[i], tokens_b[j]))
+                char_distance += chars
+                word_distance += words
+    return char_distance, word_distance
+
+
+def edit_stats(original: Union[str, List[str]], revised: Union[str, List[str]]) -> EditStats:
+    """
+    Esforço de post-edição entre a tradução da máquina e a revisada, em
+    caracteres e em palavras. Textos longos são divididos em parágrafos,
+    os parágrafos alterados são alinhados um a um (mesmo com inserções e
+    remoções por perto) e só os pares que mudaram são comparados, o que
+    mantém um capítulo inteiro na casa dos milissegundos. O resultado é a
+    soma das distâncias dos pares: um limite superior da distância do texto
+    inteiro, igual a ela quando as edições não cruzam parágrafos.
+    """
+    if isinstance(original, str):
+        original = original.split("\n")
+    if isinstance(revised, str):
+        revised = revised.split("\n")
+
+    char_distance, word_distance = _aligned_distance(original, revised)
+
+    # Quebras de linha entre parágrafos também contam no tamanho
+    chars = sum(len(paragraph) for paragraph in revised) + max(0, len(revised) - 1)
+    words = sum(len(tokenize(paragraph)) for paragraph in revised)
+    return EditStats(char_distance, word_distance, chars, words)
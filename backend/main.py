@@ -3,11 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 
-from database import engine, Base
-from routers import document_router, translation_router
-
-# Criar as tabelas do banco de dados
-Base.metadata.create_all(bind=engine)
+from database import check_schema
+from compression import CompressionMiddleware
+from routers import document_router, translation_router, job_router, profile_router
+from services.confidential import install_log_filter
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -30,9 +29,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respostas grandes (zstd/brotli/gzip, conforme o cliente)
+app.add_middleware(CompressionMiddleware)
+
+# Logs de documentos confidenciais sem registros de depuração (corpo das requisições)
+install_log_filter()
+
 # Adicionar routers
 app.include_router(document_router.router, prefix="/api/documents", tags=["documents"])
 app.include_router(translation_router.router, prefix="/api/translations", tags=["translations"])
+app.include_router(job_router.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(profile_router.router, prefix="/api/profiles", tags=["profiles"])
+
+# Verificar o schema na inicialização, e não na importação do módulo
+@app.on_event("startup")
+def startup_schema_check():
+    check_schema()
 
 @app.get("/")
 async def root():
@@ -1,36 +0,0 @@
-"""initial migration
-
-Revision ID: 7720c1106250
-Revises: 
-Create Date: 2024-12-29 14:20:15.027942
-
-"""
-from alembic import op
-import sqlalchemy as sa
-
-
-# revision identifiers, used by Alembic.
-revision = '7720c1106250'
-down_revision = None
-branch_labels = None
-depends_on = None
-
-
-def upgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('translation',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('source_text', sa.Text(), nullable=False),
-    sa.Column('translated_text', sa.Text(), nullable=False),
-    sa.Column('source_language', sa.String(length=10), nullable=False),
-    sa.Column('target_language', sa.String(length=10), nullable=False),
-    sa.Column('created_at', sa.DateTime(), nullable=True),
-    sa.PrimaryKeyConstraint('id')
-    )
-    # ### end Alembic commands ###
-
-
-def downgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_table('translation')
-    # ### end Alembic commands ###
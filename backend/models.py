@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
 from database import Base
@@ -10,12 +10,53 @@ class TranslatorProfile(Base):
     name = Column(String(100), nullable=False)
     preferred_style = Column(JSON, nullable=True)  # Configurações detalhadas de estilo
     language_pairs = Column(JSON, nullable=True)   # Pares de idiomas suportados
+    # Cliente (tenant) da API: cota de tokens por minuto e peso no escalonamento
+    # justo (nulos usam os padrões de services/tenant_scheduler.py)
+    tokens_per_minute = Column(Integer, nullable=True)
+    scheduling_weight = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relacionamentos
     documents = relationship("Document", back_populates="translator_profile")
     translations = relationship("Translation", back_populates="translator_profile")
+    api_keys = relationship("ApiKey", back_populates="translator_profile", cascade="all, delete-orphan",
+                            passive_deletes=True)
+
+class ApiKey(Base):
+    """Chave de API de um cliente, ligada a um perfil de tradutor. Só o hash é guardado."""
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    translator_profile_id = Column(Integer, ForeignKey("translator_profiles.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(100), nullable=True)
+    key_prefix = Column(String(12), nullable=False)  # início da chave, para identificá-la na listagem
+    key_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 da chave
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+    translator_profile = relationship("TranslatorProfile", back_populates="api_keys")
+
+class TenantUsage(Base):
+    """
+    Tokens consumidos por cliente a cada minuto, somados por todos os
+    processos (API e workers): base da cota por minuto e de /api/profiles/usage.
+    """
+    __tablename__ = "tenant_usage"
+
+    id = Column(Integer, primary_key=True)
+    tenant = Column(String(64), nullable=False)  # profile:<id> ou anonymous
+    window_start = Column(DateTime(timezone=True), nullable=False)  # início do minuto (UTC)
+    tokens = Column(Integer, nullable=False, default=0)
+    requests = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Uma linha por cliente e minuto (upsert) e leitura da janela atual
+        Index("ix_tenant_usage_tenant_window", "tenant", "window_start", unique=True),
+        # Consumo de todos os clientes num período e limpeza das janelas antigas
+        Index("ix_tenant_usage_window_start", "window_start"),
+    )
 
 class Document(Base):
     __tablename__ = "documents"
@@ -24,17 +65,30 @@ class Document(Base):
     filename = Column(String, nullable=False)
     mime_type = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 do blob no armazenamento
     size = Column(Integer)
     num_chapters = Column(Integer, default=0)
     total_paragraphs = Column(Integer, default=0)
     document_metadata = Column(JSON, nullable=True)
     is_confidential = Column(Boolean, default=False)
+    # Chave do documento confidencial, cifrada pela chave mestra (services/confidential.py)
+    encryption_key = Column(String(128), nullable=True)
+    # Revisões: cada nova versão do manuscrito aponta para a anterior
+    parent_document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    revision_number = Column(Integer, default=1)
+    # Arquivado: fora da listagem padrão, mas com capítulos e traduções preservados
+    archived_at = Column(DateTime(timezone=True), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relacionamentos
-    chapters = relationship("Chapter", back_populates="document", cascade="all, delete-orphan")
-    translations = relationship("Translation", back_populates="document", cascade="all, delete-orphan")
+    parent_document = relationship("Document", remote_side=[id])
+    # passive_deletes: a remoção em cascata fica com o banco (ON DELETE CASCADE),
+    # sem carregar os filhos na sessão
+    chapters = relationship("Chapter", back_populates="document", cascade="all, delete-orphan",
+                            passive_deletes=True)
+    translations = relationship("Translation", back_populates="document", cascade="all, delete-orphan",
+                                passive_deletes=True)
     translator_profile = relationship("TranslatorProfile", back_populates="documents")
     translator_profile_id = Column(Integer, ForeignKey("translator_profiles.id"), nullable=True)
 
@@ -42,19 +96,53 @@ class Chapter(Base):
     __tablename__ = "chapters"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     order = Column(Integer, nullable=False)
     content = Column(JSON)  # Armazena parágrafos
+    sentence_offsets = Column(JSON, nullable=True)  # Offsets [início, fim] das frases de cada parágrafo
+    paragraph_styles = Column(JSON, nullable=True)  # Estilos originais dos parágrafos (DOCX)
     translated_content = Column(JSON, nullable=True)  # Armazena traduções
     translation_status = Column(String, default="pending")  # pending, in_progress, completed
     progress_percentage = Column(Float, default=0.0)
+    target_progress = Column(JSON, nullable=True)  # Porcentagem traduzida por idioma de destino
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relacionamentos
     document = relationship("Document", back_populates="chapters")
-    translations = relationship("Translation", back_populates="chapter", cascade="all, delete-orphan")
+    translations = relationship("Translation", back_populates="chapter", cascade="all, delete-orphan",
+                                passive_deletes=True)
+    paragraph_hashes = relationship("ParagraphHash", cascade="all, delete-orphan", passive_deletes=True,
+                                    order_by="ParagraphHash.position")
+
+    __table_args__ = (
+        # Sumário (ordenado) e leitura de um capítulo pela posição; serve também à cascata
+        Index("ix_chapters_document_order", "document_id", "order"),
+    )
+
+class ParagraphHash(Base):
+    """
+    Hash do conteúdo normalizado de cada parágrafo, gravado no parsing:
+    acha as repetições do parágrafo no documento e no acervo. Documentos
+    confidenciais não entram (o hash revelaria parágrafos iguais).
+    """
+    __tablename__ = "paragraph_hashes"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # índice do parágrafo em chapters.content
+    content_hash = Column(String(40), nullable=False)  # paragraph_hash (sha1 do texto normalizado)
+
+    document = relationship("Document")
+
+    __table_args__ = (
+        # Repetições dentro do documento (e cascata pelo documento)
+        Index("ix_paragraph_hashes_document_hash", "document_id", "content_hash"),
+        # Repetições no acervo
+        Index("ix_paragraph_hashes_content_hash", "content_hash"),
+    )
 
 class Translation(Base):
     __tablename__ = "translations"
@@ -65,6 +153,7 @@ class Translation(Base):
     source_language = Column(String, nullable=False)
     target_language = Column(String, nullable=False)
     formality_level = Column(String)
+    style = Column(String(50), nullable=True)  # estilo pedido (general, literary...): parte da memória de tradução
     tone = Column(String)
     domain_specific = Column(Boolean, default=False)
     preserve_formatting = Column(Boolean, default=True)
@@ -76,6 +165,7 @@ class Translation(Base):
     translator_feedback = Column(Text)
     improvement_suggestions = Column(JSON)
     learning_flags = Column(JSON)
+    model_used = Column(String(100))  # modelo que produziu a maior parte do texto
     project_id = Column(Integer)
     security_level = Column(String, default="normal")
     is_confidential = Column(Boolean, default=False)
@@ -84,27 +174,120 @@ class Translation(Base):
 
     # Chaves estrangeiras
     translator_profile_id = Column(Integer, ForeignKey("translator_profiles.id"), nullable=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
-    chapter_id = Column(Integer, ForeignKey("chapters.id"), nullable=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=True)
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=True, index=True)
 
     # Relacionamentos
     translator_profile = relationship("TranslatorProfile", back_populates="translations")
     document = relationship("Document", back_populates="translations")
     chapter = relationship("Chapter", back_populates="translations")
-    revisions = relationship("TranslationRevision", back_populates="translation", cascade="all, delete-orphan")
+    revisions = relationship("TranslationRevision", back_populates="translation", cascade="all, delete-orphan",
+                             passive_deletes=True)
+
+    __table_args__ = (
+        # Histórico (mais recentes primeiro) e filtros por período
+        Index("ix_translations_created_at", "created_at"),
+        # Traduções de um documento/capítulo (estatísticas por documento, cascata)
+        Index("ix_translations_document_chapter", "document_id", "chapter_id"),
+        # Memória de tradução e exemplos few-shot: par de idiomas e perfil
+        Index("ix_translations_language_pair", "source_language", "target_language", "translator_profile_id"),
+        # Segmento idêntico na memória de tradução; hash no PostgreSQL porque
+        # parágrafos longos passam do limite de tamanho de uma chave btree
+        Index("ix_translations_original_text", "original_text", postgresql_using="hash"),
+    )
 
 class TranslationRevision(Base):
     __tablename__ = "translation_revisions"
 
     id = Column(Integer, primary_key=True, index=True)
-    translation_id = Column(Integer, ForeignKey("translations.id"), nullable=False)
+    translation_id = Column(Integer, ForeignKey("translations.id", ondelete="CASCADE"), nullable=False)
     revised_text = Column(Text, nullable=False)
     revision_type = Column(String)  # manual, automatic, peer
     revision_comments = Column(Text)
     time_spent = Column(Integer)  # segundos
     quality_improvement = Column(Float)
     accepted_changes = Column(Boolean, default=False)
+    # Esforço de post-edição em relação à tradução da máquina
+    edit_distance = Column(Integer)  # caracteres
+    word_edit_distance = Column(Integer)
+    revised_chars = Column(Integer)
+    revised_words = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
     translation = relationship("Translation", back_populates="revisions")
+
+    __table_args__ = (
+        # Última revisão de cada tradução (agregados de esforço)
+        Index("ix_translation_revisions_translation", "translation_id", "id"),
+        # Estatísticas de esforço por período
+        Index("ix_translation_revisions_created_at", "created_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)  # parse_document, translate_chapter, translate_chapter_multi, translate_docx
+    payload = Column(JSON, nullable=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, completed, dead, cancelled
+    priority = Column(Integer, nullable=False, default=100)  # menor valor = maior prioridade
+    tenant = Column(String(64), nullable=True)  # cliente que enfileirou (profile:<id>; nulo = anônimo)
+    # Tag de término do escalonamento justo: dentro da mesma prioridade, os
+    # jobs saem em ordem de fair_order e não de chegada
+    fair_order = Column(Float, nullable=False, default=0.0)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime(timezone=True), nullable=False)  # não executar antes (backoff)
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # timeout de visibilidade
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Chaves estrangeiras
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "priority", "available_at"),
+        Index("ix_jobs_tenant", "tenant", "status"),
+    )
+
+class ChapterPrefetch(Base):
+    """Tradução antecipada de um capítulo (modo prefetch) e se o leitor chegou a usá-la."""
+    __tablename__ = "chapter_prefetches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True)  # nulo nos misses
+    target_language = Column(String(20), nullable=False)
+    options_key = Column(String(40), nullable=False)  # formalidade, estilo, perfil etc. do pedido
+    characters = Column(Integer, nullable=False, default=0)  # custo estimado, conta no orçamento
+    status = Column(String(20), nullable=False, default="active")  # active, consumed, cancelled, expired
+    outcome = Column(String(20), nullable=True)  # hit, late, miss (ao ser consumido)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    consumed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_chapter_prefetches_lookup", "chapter_id", "target_language", "status"),
+        Index("ix_chapter_prefetches_document", "document_id", "status"),
+    )
+
+class JobEvent(Base):
+    """Evento de progresso publicado pelos workers; o id é o número de sequência do stream."""
+    __tablename__ = "job_events"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True)
+    event_type = Column(String(20), nullable=False)  # job, paragraph, progress
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_job_events_document", "document_id", "id"),
+        Index("ix_job_events_job", "job_id", "id"),
+    )
@@ -0,0 +1,276 @@
+import logging
+import re
+from collections import Counter
+from statistics import median
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Faixa do topo e da base da página onde ficam cabeçalhos, rodapés e números
+MARGIN_ZONE = 0.08
+
+# Linha que contém apenas um número de página ("12", "- 12 -", "Página 3 de 10", "xiv")
+PAGE_NUMBER = re.compile(
+    r'^[\W_]*(?:(?:page|p[áa]gina|p[áa]g\.?|p\.)\s*)?(?:\d+|[ivxlcdm]+)(?:\s*(?:of|de|/)\s*\d+)?[\W_]*$',
+    re.IGNORECASE
+)
+
+# Pontuação que encerra um parágrafo (inclui aspas e parênteses de fechamento)
+TERMINAL = re.compile(r'[.!?:;…]["\'”»)\]]*$')
+
+
+class Fragment(NamedTuple):
+    x: float
+    y: float
+    size: float
+    text: str
+
+
+class Line(NamedTuple):
+    x: float
+    y: float
+    size: float
+    text: str
+
+
+def _page_fragments(page) -> List[Fragment]:
+    """Trechos de texto com posição na página, via visitor do PyPDF2."""
+    fragments: List[Fragment] = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if not text or not text.strip():
+            return
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        size = (font_size or 10) * (abs(tm[3]) or 1) * (abs(cm[3]) or 1)
+        # Alguns PDFs trazem várias linhas num só trecho
+        for offset, part in enumerate(text.split('\n')):
+            if part.strip():
+                fragments.append(Fragment(x, y - offset * size * 1.2, size, part))
+
+    page.extract_text(visitor_text=visitor)
+    return fragments
+
+
+def _column_starts(fragments: List[Fragment], page_width: float) -> List[float]:
+    """
+    Posições x onde começam as colunas: valores de x que se repetem em
+    muitas linhas (texto alinhado à esquerda). Recuos de primeira linha
+    ficam próximos do início da coluna e são agrupados com ele.
+    """
+    rows = len({round(fragment.y) for fragment in fragments}) or 1
+    counts = Counter(round(fragment.x) for fragment in fragments)
+    threshold = max(3, rows * 0.15)
+    candidates = sorted(x for x, count in counts.items() if count >= threshold)
+    if not candidates:
+        return [min(fragment.x for fragment in fragments)]
+
+    starts = [candidates[0]]
+    for x in candidates[1:]:
+        # Colunas de verdade ficam separadas por uma fração da largura da página
+        if x - starts[-1] > page_width * 0.2:
+            starts.append(x)
+    starts[0] = min(starts[0], min(fragment.x for fragment in fragments))
+    return starts
+
+
+def _group_lines(fragments: List[Fragment]) -> List[Line]:
+    """Agrupa trechos na mesma altura em linhas, de cima para baixo."""
+    lines: List[Line] = []
+    current: List[Fragment] = []
+    for fragment in sorted(fragments, key=lambda f: (-f.y, f.x)):
+        if current and abs(current[0].y - fragment.y) > current[0].size * 0.4:
+            lines.append(_make_line(current))
+            current = []
+        current.append(fragment)
+    if current:
+        lines.append(_make_line(current))
+    return lines
+
+
+def _make_line(fragments: List[Fragment]) -> Line:
+    fragments = sorted(fragments, key=lambda f: f.x)
+    text = fragments[0].text
+    for fragment in fragments[1:]:
+        if text[-1:].isspace() or fragment.text[:1].isspace():
+            text += fragment.text
+        else:
+            text += ' ' + fragment.text
+    size = max(fragment.size for fragment in fragments)
+    return Line(fragments[0].x, fragments[0].y, size, ' '.join(text.split()))
+
+
+def _page_blocks(fragments: List[Fragment], page_width: float) -> List[List[Line]]:
+    """
+    Divide a página em blocos na ordem de leitura: cada coluna, de cima
+    para baixo, da esquerda para a direita. Linhas que atravessam as
+    colunas (títulos no meio da página) separam faixas lidas em sequência.
+    """
+    starts = _column_starts(fragments, page_width)
+    if len(starts) == 1:
+        return [_group_lines(fragments)]
+
+    def column_of(x: float) -> int:
+        index = 0
+        for i, start in enumerate(starts):
+            if x >= start - 2:
+                index = i
+        return index
+
+    by_row: Dict[int, List[Fragment]] = {}
+    for fragment in fragments:
+        by_row.setdefault(round(fragment.y), []).append(fragment)
+
+    blocks: List[List[Line]] = []
+    band: List[List[Fragment]] = [[] for _ in starts]
+    for y in sorted(by_row, reverse=True):
+        row = by_row[y]
+        columns = {column_of(fragment.x) for fragment in row}
+        # Texto que começa antes da segunda coluna e não tem nada nela,
+        # mas é bem mais longo do que cabe numa coluna, ocupa a página toda
+        # (largura estimada com meia em por caractere)
+        estimated_width = sum(len(f.text) for f in row) * row[0].size * 0.5
+        spanning = columns == {0} and estimated_width > (starts[1] - starts[0]) * 1.3
+        if spanning:
+            blocks.extend(_group_lines(column) for column in band if column)
+            band = [[] for _ in starts]
+            blocks.append(_group_lines(row))
+            continue
+        for fragment in row:
+            band[column_of(fragment.x)].append(fragment)
+    blocks.extend(_group_lines(column) for column in band if column)
+    return blocks
+
+
+def _normalize_margin_text(text: str) -> str:
+    return re.sub(r'\d+', '#', text.lower()).strip()
+
+
+def _strip_margins(pages: List[List[List[Line]]], page_heights: List[float]) -> int:
+    """
+    Remove cabeçalhos e rodapés repetidos (comparados com dígitos
+    normalizados, para pegar "Capítulo 1 — 12") e números de página
+    soltos nas margens. Retorna quantas linhas foram removidas.
+    """
+    def in_margin(line: Line, height: float) -> bool:
+        return line.y > height * (1 - MARGIN_ZONE) or line.y < height * MARGIN_ZONE
+
+    repeated = Counter()
+    for blocks, height in zip(pages, page_heights):
+        seen = {
+            _normalize_margin_text(line.text)
+            for block in blocks for line in block if in_margin(line, height)
+        }
+        repeated.update(seen)
+    min_pages = max(2, len(pages) // 2)
+
+    removed = 0
+    for page_index, (blocks, height) in enumerate(zip(pages, page_heights)):
+        for block_index, block in enumerate(blocks):
+            kept = [
+                line for line in block
+                if not in_margin(line, height)
+                or not (PAGE_NUMBER.match(line.text) or repeated[_normalize_margin_text(line.text)] >= min_pages)
+            ]
+            removed += len(block) - len(kept)
+            blocks[block_index] = kept
+        pages[page_index] = [block for block in blocks if block]
+    return removed
+
+
+def _join_lines(previous: str, line: str) -> str:
+    """Junta linhas desfazendo a hifenização de fim de linha."""
+    if previous.endswith('\xad'):
+        return previous[:-1] + line
+    if len(previous) > 1 and previous[-1] == '-' and previous[-2].isalpha() and line[:1].islower():
+        return previous[:-1] + line
+    return previous + ' ' + line
+
+
+def _block_paragraphs(block: List[Line]) -> List[List[Line]]:
+    """
+    Quebra um bloco em parágrafos por espaçamento vertical maior que o
+    normal, recuo de primeira linha ou mudança de tamanho de fonte.
+    """
+    gaps = [a.y - b.y for a, b in zip(block, block[1:]) if a.y > b.y]
+    spacing = median(gaps) if gaps else block[0].size * 1.2
+    left = min(line.x for line in block)
+
+    paragraphs: List[List[Line]] = [[block[0]]]
+    for previous, line in zip(block, block[1:]):
+        new_paragraph = (
+            previous.y - line.y > spacing * 1.4
+            or line.x - left > line.size * 0.8
+            or abs(line.size - previous.size) > previous.size * 0.15
+        )
+        if new_paragraph:
+            paragraphs.append([line])
+        else:
+            paragraphs[-1].append(line)
+    return paragraphs
+
+
+def _continues(previous: str, last_line: Line, last_line_full: bool, first_line: Line, indented: bool) -> bool:
+    """
+    O parágrafo anterior continua no próximo bloco (outra coluna ou
+    página)? Linha final cheia seguida de linha sem recuo indica que sim;
+    sem pontuação final, basta a próxima linha começar em minúscula.
+    """
+    if abs(first_line.size - last_line.size) > last_line.size * 0.15:
+        return False
+    if previous.endswith('-') or previous.endswith('\xad'):
+        return True
+    if indented:
+        return False
+    if last_line_full:
+        return True
+    return not TERMINAL.search(previous) and first_line.text[:1].islower()
+
+
+def extract_layout_paragraphs(reader) -> List[List[str]]:
+    """
+    Extrai os parágrafos de um PDF usando a posição do texto: reconstrói
+    a ordem de leitura em páginas com colunas, remove cabeçalhos, rodapés
+    e números de página, desfaz hifenização e junta parágrafos que
+    continuam na coluna ou página seguinte. Retorna os parágrafos por
+    página (o parágrafo fica na página onde começa).
+    """
+    pages: List[List[List[Line]]] = []
+    heights: List[float] = []
+    for page in reader.pages:
+        box = page.mediabox
+        width, height = float(box.width), float(box.height)
+        fragments = _page_fragments(page)
+        pages.append(_page_blocks(fragments, width) if fragments else [])
+        heights.append(height)
+
+    removed = _strip_margins(pages, heights)
+    if removed:
+        logger.info(f"{removed} linhas de cabeçalho/rodapé removidas")
+
+    result: List[List[str]] = []
+    last_page: Optional[List[str]] = None
+    last_line: Optional[Line] = None
+    last_line_full = False
+    for blocks in pages:
+        page_paragraphs: List[str] = []
+        for block in blocks:
+            left = min(line.x for line in block)
+            longest = max(len(line.text) for line in block)
+            for index, lines in enumerate(_block_paragraphs(block)):
+                text = lines[0].text
+                for line in lines[1:]:
+                    text = _join_lines(text, line.text)
+                # Primeiro parágrafo do bloco pode ser continuação do anterior
+                target = page_paragraphs or last_page
+                indented = lines[0].x - left > lines[0].size * 0.8
+                if index == 0 and target and _continues(target[-1], last_line, last_line_full, lines[0], indented):
+                    target[-1] = _join_lines(target[-1], text)
+                else:
+                    page_paragraphs.append(text)
+                last_line = lines[-1]
+                last_line_full = len(block) > 1 and len(last_line.text) >= longest * 0.85
+        result.append(page_paragraphs)
+        if page_paragraphs:
+            last_page = page_paragraphs
+    return result
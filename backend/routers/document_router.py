@@ -1,27 +1,53 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException, Depends, Request, WebSocket
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import orjson
 import os
-import shutil
-from datetime import datetime
 import mimetypes
 import logging
 import traceback
+from urllib.parse import quote
 
-from database import get_db
-from models import Document
+from database import get_db, SessionLocal
+from models import Document, Chapter, Job
+from schemas import BulkArchiveRequest, BulkDocumentRequest, DocxTranslationRequest
 from document_processor import DocumentProcessor
+from document_exporter import (
+    DOCX_MIME_TYPE, EXPORT_FORMATS, iter_export_chapters, pdf_unsupported_characters, stream_docx, stream_pdf,
+    stream_txt
+)
+from services.chapter_service import build_chapters
+from services.document_cache import DOCUMENT, LISTING, TOC, document_cache
+from services.confidential import (
+    CONFIDENTIAL_MAX_BYTES, ConfidentialityError, DocumentCipher, confidential_scope, document_cipher,
+    new_document_key
+)
+from services.document_service import (
+    BULK_MAX_DOCUMENTS, archive_documents, delete_documents, release_deleted_files
+)
+from services.revision_service import carry_over_translations
+from services.event_service import EventStream, stream_events
+from services.api_keys import check_quota, get_tenant
+from services.job_queue import enqueue_job
+from services.paragraph_dedup import dedup_stats, processed_hashes
+from services.language_detector import annotate_document_language
+from services.prompt_templates import PromptTemplateError, load_profile_spec
+from services.storage_service import collect_garbage, document_file_path, release_blob, store_upload
+from services.tenant_scheduler import Tenant
+from storage import get_storage
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-# Configurar diretório para upload
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+ALLOWED_MIME_TYPES = (
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'text/plain'
+)
 
 def get_mime_type(filename: str) -> str:
     """Determina o tipo MIME baseado na extensão do arquivo."""
@@ -37,12 +63,73 @@ def get_mime_type(filename: str) -> str:
         mime_type = mime_map.get(ext)
     return mime_type
 
+def serialize_document(document: Document) -> dict:
+    """Converte um Document em dicionário pronto para o orjson (datetimes inclusos)."""
+    return {
+        column.name: getattr(document, column.name)
+        for column in Document.__table__.columns if column.name != "encryption_key"
+    }
+
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
+    background: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Envia um documento. Com `background=true`, o processamento é feito
+    por um worker (worker.py) e a resposta traz o `job_id`.
+    """
+    return _handle_upload(file, db, background=background)
+
+@router.post("/upload/confidential")
+async def upload_confidential_document(request: Request, filename: str, db: Session = Depends(get_db)):
+    """
+    Envia um documento confidencial. O arquivo vai no corpo da requisição,
+    não em multipart (o parser de formulários grava em disco arquivos
+    acima de 1 MB), e é processado em memória: o original não é guardado,
+    títulos, parágrafos e traduções são gravados cifrados com uma chave do
+    documento e os logs não levam texto.
+    """
+    mime_type = get_mime_type(filename)
+    if mime_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=400, detail=f"Tipo de arquivo não suportado: {mime_type}. Use PDF, DOCX ou TXT.")
+
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > CONFIDENTIAL_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Documento confidencial acima de {CONFIDENTIAL_MAX_BYTES} bytes")
+    if not data:
+        raise HTTPException(status_code=400, detail="Arquivo vazio")
+
+    with confidential_scope():
+        return _handle_confidential_upload(filename, mime_type, bytes(data), db)
+
+@router.post("/{document_id}/revisions")
+async def upload_revision(
+    document_id: int,
+    file: UploadFile = File(...),
+    background: bool = False,
     db: Session = Depends(get_db)
 ):
-    file_path = None
+    """
+    Envia uma nova revisão do documento. Os parágrafos inalterados herdam
+    as traduções da revisão anterior; só os alterados ficam pendentes.
+    """
+    previous_document = db.query(Document).filter(Document.id == document_id).first()
+    if not previous_document:
+        logger.warning(f"Documento {document_id} não encontrado")
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    if previous_document.is_confidential:
+        raise HTTPException(
+            status_code=400,
+            detail="Documentos confidenciais não têm revisões: envie a nova versão como documento confidencial"
+        )
+    return _handle_upload(file, db, previous_document=previous_document, background=background)
+
+def _handle_upload(file: UploadFile, db: Session, previous_document: Document = None, background: bool = False):
+    blob = None
     try:
         logger.info(f"Iniciando upload do arquivo: {file.filename}")
         
@@ -56,73 +143,120 @@ async def upload_document(
         
         logger.info(f"Tipo de arquivo detectado: {mime_type}")
         
-        allowed_types = [
-            'application/pdf',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'text/plain'
-        ]
-        
-        if mime_type not in allowed_types:
+        if mime_type not in ALLOWED_MIME_TYPES:
             logger.warning(f"Tipo de arquivo não suportado: {mime_type}")
             raise HTTPException(
                 status_code=400,
                 detail=f"Tipo de arquivo não suportado: {mime_type}. Use PDF, DOCX ou TXT."
             )
         
-        # Criar nome único para o arquivo
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        logger.info(f"Salvando arquivo em: {file_path}")
-        
-        # Salvar arquivo
+        # Salvar arquivo no armazenamento endereçado por conteúdo (sha256):
+        # uploads idênticos compartilham o mesmo blob
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            logger.info("Arquivo salvo com sucesso")
+            blob = store_upload(file.file)
+            logger.info(f"Arquivo salvo no blob {blob.key}")
         except Exception as e:
             logger.error(f"Erro ao salvar arquivo: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
+        file_path = get_storage().local_path(blob.key)
+
+        # Processamento em segundo plano: registrar o documento e enfileirar o parsing
+        if background:
+            db_document = Document(
+                filename=file.filename,
+                file_path=get_storage().uri(blob.key),
+                content_hash=blob.key,
+                mime_type=mime_type,
+                size=blob.size,
+                num_chapters=0,
+                total_paragraphs=0,
+                document_metadata={},
+                is_confidential=False,
+                parent_document_id=previous_document.id if previous_document else None,
+                revision_number=(previous_document.revision_number or 1) + 1 if previous_document else 1
+            )
+            db.add(db_document)
+            db.flush()
+            job = enqueue_job(
+                db,
+                "parse_document",
+                {
+                    "document_id": db_document.id,
+                    "previous_document_id": previous_document.id if previous_document else None,
+                },
+                document_id=db_document.id
+            )
+            logger.info(f"Documento {db_document.id} registrado, processamento no job {job.id}")
+            document_cache.invalidate_document()
+            return {
+                "id": db_document.id,
+                "filename": db_document.filename,
+                "size": db_document.size,
+                "revision_number": db_document.revision_number,
+                "parent_document_id": db_document.parent_document_id,
+                "content_hash": db_document.content_hash,
+                "deduplicated": not blob.created,
+                "created_at": db_document.created_at,
+                "job_id": job.id,
+                "status": job.status
+            }
         
         # Processar documento
         try:
             logger.info("Iniciando processamento do documento")
             processor = DocumentProcessor()
             processed_data = processor.process_document(file_path, mime_type)
+            annotate_document_language(processed_data)
+            # Parágrafos repetidos no documento e já presentes no acervo
+            deduplication = dedup_stats(db, processed_hashes(processed_data))
             logger.info("Documento processado com sucesso")
             
-            # Debug do processed_data
-            logger.info(f"Dados processados: {processed_data}")
-            
             # Criar entrada no banco de dados
             logger.info("Criando entrada no banco de dados")
             db_document = Document(
                 filename=file.filename,
-                file_path=file_path,
+                file_path=get_storage().uri(blob.key),
+                content_hash=blob.key,
                 mime_type=mime_type,
-                size=os.path.getsize(file_path),
+                size=blob.size,
                 num_chapters=len(processed_data.get("chapters", [])),
                 total_paragraphs=sum(len(chapter.get("paragraphs", [])) 
                                    for chapter in processed_data.get("chapters", [])),
-                document_metadata=processed_data.get("metadata", {}),
-                is_confidential=False  # Default
+                document_metadata=dict(processed_data.get("metadata", {}), deduplication=deduplication),
+                is_confidential=False,  # Default
+                parent_document_id=previous_document.id if previous_document else None,
+                revision_number=(previous_document.revision_number or 1) + 1 if previous_document else 1
             )
+            chapters = build_chapters(db_document, processed_data)
+
+            # Nova revisão: reaproveitar traduções dos parágrafos inalterados
+            revision_summary = None
+            if previous_document is not None:
+                revision_summary = carry_over_translations(previous_document.chapters, chapters)
             
             db.add(db_document)
+            db.add_all(chapters)
             db.commit()
             db.refresh(db_document)
+            document_cache.invalidate_document()
             logger.info(f"Documento {db_document.id} criado com sucesso")
             
-            return {
+            response = {
                 "id": db_document.id,
                 "filename": db_document.filename,
                 "size": db_document.size,
                 "num_chapters": db_document.num_chapters,
                 "total_paragraphs": db_document.total_paragraphs,
+                "revision_number": db_document.revision_number,
+                "parent_document_id": db_document.parent_document_id,
+                "content_hash": db_document.content_hash,
+                "deduplicated": not blob.created,
+                "deduplication": deduplication,
                 "created_at": db_document.created_at
             }
+            if revision_summary is not None:
+                response["revision"] = revision_summary
+            return response
             
         except Exception as e:
             logger.error(f"Erro ao processar documento: {str(e)}")
@@ -132,11 +266,14 @@ async def upload_document(
     except Exception as e:
         logger.error(f"Erro durante o upload: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
-        # Se algo der errado, garantir que o arquivo seja removido
-        if file_path and os.path.exists(file_path):
+        # Se algo der errado, liberar o blob criado por este upload (um blob
+        # que já existia pertence a outros documentos). Dentro da carência
+        # ele fica para um upload concorrente do mesmo arquivo; depois dela,
+        # collect_garbage o remove
+        if blob is not None and blob.created:
             try:
-                os.remove(file_path)
-                logger.info(f"Arquivo removido: {file_path}")
+                db.rollback()
+                release_blob(db, blob.key)
             except Exception as cleanup_error:
                 logger.error(f"Erro ao remover arquivo: {str(cleanup_error)}")
         
@@ -145,12 +282,72 @@ async def upload_document(
             detail=f"Erro ao processar o arquivo: {str(e)}"
         )
 
+def _handle_confidential_upload(filename: str, mime_type: str, data: bytes, db: Session):
+    try:
+        key, wrapped_key = new_document_key()
+        cipher = DocumentCipher(key)
+    except ConfidentialityError as e:
+        logger.error(f"Modo confidencial indisponível: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Modo confidencial indisponível: {str(e)}")
+
+    try:
+        processed_data = DocumentProcessor().process_bytes(data, mime_type)
+        metadata = annotate_document_language(processed_data)
+        # Só a repetição interna: comparar com o acervo exporia o conteúdo
+        metadata["deduplication"] = dedup_stats(db, processed_hashes(processed_data), corpus=False)
+        # Sem blob nem content_hash: o hash do conteúdo revelaria documentos iguais
+        db_document = Document(
+            filename=filename,
+            file_path="",
+            content_hash=None,
+            mime_type=mime_type,
+            size=len(data),
+            num_chapters=len(processed_data.get("chapters", [])),
+            total_paragraphs=sum(len(chapter.get("paragraphs", []))
+                                 for chapter in processed_data.get("chapters", [])),
+            document_metadata=cipher.seal_metadata(metadata),
+            is_confidential=True,
+            encryption_key=wrapped_key,
+            revision_number=1
+        )
+        chapters = build_chapters(db_document, processed_data, cipher)
+        db.add(db_document)
+        db.add_all(chapters)
+        db.commit()
+        db.refresh(db_document)
+        document_cache.invalidate_document()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao processar documento confidencial: {type(e).__name__}")
+        raise HTTPException(status_code=500, detail="Erro ao processar o documento confidencial")
+
+    logger.info(f"Documento confidencial {db_document.id} criado: {db_document.num_chapters} capítulos")
+    return {
+        "id": db_document.id,
+        "filename": db_document.filename,
+        "size": db_document.size,
+        "num_chapters": db_document.num_chapters,
+        "total_paragraphs": db_document.total_paragraphs,
+        "revision_number": db_document.revision_number,
+        "is_confidential": True,
+        "deduplication": metadata["deduplication"],
+        "created_at": db_document.created_at
+    }
+
 @router.get("/")
-def list_documents(db: Session = Depends(get_db)):
+def list_documents(include_archived: bool = False, db: Session = Depends(get_db)):
     try:
         logger.info("Listando documentos")
-        documents = db.query(Document).order_by(Document.created_at.desc()).all()
-        return documents
+
+        def load():
+            query = db.query(Document)
+            if not include_archived:
+                query = query.filter(Document.archived_at.is_(None))
+            return [serialize_document(d) for d in query.order_by(Document.created_at.desc())]
+
+        # Cache de leitura (já serializado em JSON), invalidado no upload, no arquivamento e na deleção
+        data = document_cache.get_or_load(LISTING, "all" if include_archived else "active", load)
+        return Response(data, media_type="application/json")
     except Exception as e:
         logger.error(f"Erro ao listar documentos: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
@@ -159,19 +356,35 @@ def list_documents(db: Session = Depends(get_db)):
             detail=f"Erro ao listar documentos: {str(e)}"
         )
 
+@router.get("/cache/stats")
+def get_document_cache_stats():
+    """Acertos por nível e memória do cache de listagem, detalhes e sumário."""
+    return document_cache.stats()
+
 @router.get("/{document_id}")
 def get_document(document_id: int, db: Session = Depends(get_db)):
     try:
         logger.info(f"Buscando documento {document_id}")
+        # Detalhes reprocessam o arquivo original: o resultado fica em cache
+        cached = document_cache.get(DOCUMENT, document_id)
+        if cached is not None:
+            return Response(cached, media_type="application/json")
+        generation = document_cache.generation
+
         document = db.query(Document).filter(Document.id == document_id).first()
         if not document:
             logger.warning(f"Documento {document_id} não encontrado")
             raise HTTPException(status_code=404, detail="Documento não encontrado")
+
+        # Confidencial: o original não existe; capítulos vêm do banco, decifrados
+        # (e não passam pelo cache)
+        if document.is_confidential:
+            return ORJSONResponse(_confidential_document(document))
         
         # Processar o documento para obter os capítulos
         try:
             processor = DocumentProcessor()
-            processed_data = processor.process_document(document.file_path, document.mime_type)
+            processed_data = processor.process_document(document_file_path(document), document.mime_type)
             
             # Combinar dados do banco com os dados processados
             response_data = {
@@ -183,7 +396,9 @@ def get_document(document_id: int, db: Session = Depends(get_db)):
                 "chapters": processed_data.get("chapters", []),
                 "metadata": processed_data.get("metadata", {})
             }
-            return response_data
+            # Payload grande (todos os parágrafos): serializado uma vez com orjson e guardado
+            data = document_cache.set(DOCUMENT, document_id, response_data, generation)
+            return Response(data, media_type="application/json")
             
         except Exception as e:
             logger.error(f"Erro ao processar documento: {str(e)}")
@@ -203,33 +418,281 @@ def get_document(document_id: int, db: Session = Depends(get_db)):
             detail=f"Erro ao buscar documento: {str(e)}"
         )
 
+def _confidential_document(document: Document) -> dict:
+    cipher = document_cipher(document)
+    return {
+        "id": document.id,
+        "filename": document.filename,
+        "mime_type": document.mime_type,
+        "size": document.size,
+        "created_at": document.created_at,
+        "is_confidential": True,
+        "chapters": [
+            {"title": cipher.decrypt(chapter.title), "paragraphs": cipher.decrypt_list(chapter.content or [])}
+            for chapter in sorted(document.chapters, key=lambda c: c.order)
+        ],
+        "metadata": cipher.open_metadata(document.document_metadata or {})
+    }
+
+def _load_toc(db: Session, document_id: int) -> List[dict]:
+    """Parte fixa do sumário; lê o conteúdo dos capítulos para contar os parágrafos."""
+    generation = document_cache.generation
+    chapters = (
+        db.query(Chapter)
+        .filter(Chapter.document_id == document_id)
+        .order_by(Chapter.order)
+        .all()
+    )
+    if not chapters:
+        return []
+    cipher = document_cipher(chapters[0].document)
+    toc = [
+        {
+            "id": chapter.id,
+            "order": chapter.order,
+            "title": cipher.decrypt(chapter.title),
+            "num_paragraphs": len(chapter.content or []),
+        }
+        for chapter in chapters
+    ]
+    # Títulos de documentos confidenciais não vão para o cache
+    if not cipher.confidential:
+        document_cache.set(TOC, document_id, toc, generation)
+    return toc
+
+@router.get("/{document_id}/chapters")
+def list_chapters(document_id: int, db: Session = Depends(get_db)):
+    """
+    Sumário do documento: capítulos persistidos com status de tradução.
+    Títulos e número de parágrafos vêm do cache; status e progresso, que
+    mudam durante a tradução, de uma consulta que não carrega o conteúdo.
+    """
+    progress = (
+        db.query(Chapter.id, Chapter.translation_status, Chapter.progress_percentage, Chapter.target_progress)
+        .filter(Chapter.document_id == document_id)
+        .order_by(Chapter.order)
+        .all()
+    )
+    if not progress and not db.query(Document.id).filter(Document.id == document_id).first():
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    cached = document_cache.get(TOC, document_id)
+    toc = orjson.loads(cached) if cached is not None else None
+    # Capítulos recriados (reprocessamento) não batem com o sumário guardado
+    if toc is None or [entry["id"] for entry in toc] != [row.id for row in progress]:
+        toc = _load_toc(db, document_id)
+    return [
+        {**entry, "translation_status": row.translation_status, "progress_percentage": row.progress_percentage,
+         "target_progress": row.target_progress or {}}
+        for entry, row in zip(toc, progress)
+    ]
+
+@router.get("/{document_id}/chapters/{order}")
+def get_chapter(document_id: int, order: int, db: Session = Depends(get_db)):
+    """Conteúdo de um capítulo com as traduções já gravadas."""
+    chapter = (
+        db.query(Chapter)
+        .filter(Chapter.document_id == document_id, Chapter.order == order)
+        .first()
+    )
+    if not chapter:
+        raise HTTPException(status_code=404, detail="Capítulo não encontrado")
+    cipher = document_cipher(chapter.document)
+    return ORJSONResponse({
+        "id": chapter.id,
+        "order": chapter.order,
+        "title": cipher.decrypt(chapter.title),
+        "paragraphs": cipher.decrypt_list(chapter.content or []),
+        "translated_content": {
+            language: cipher.decrypt_list(translations)
+            for language, translations in (chapter.translated_content or {}).items()
+        },
+        "sentence_offsets": chapter.sentence_offsets,
+        "translation_status": chapter.translation_status,
+        "progress_percentage": chapter.progress_percentage,
+        "target_progress": chapter.target_progress or {},
+    })
+
+@router.get("/{document_id}/export")
+def export_document(
+    document_id: int,
+    format: str = "docx",
+    target_language: str = "pt",
+    include_untranslated: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta o documento traduzido em DOCX, TXT ou PDF. O arquivo é gerado
+    e enviado em streaming, capítulo a capítulo. Parágrafos ainda sem
+    tradução saem no original, a menos que `include_untranslated` seja falso.
+    O PDF usa fontes cp1252: com caracteres fora dela (CJK, cirílico...), 422.
+    """
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato não suportado: {format}. Use {', '.join(EXPORT_FORMATS)}."
+        )
+
+    cipher = document_cipher(document)
+    if format == "pdf":
+        # O PDF só tem fontes cp1252: recusar antes de começar o streaming
+        unsupported = pdf_unsupported_characters(
+            iter_export_chapters(db, document_id, target_language, include_untranslated, cipher)
+        )
+        if unsupported:
+            raise HTTPException(
+                status_code=422,
+                detail=f"O PDF não suporta os caracteres {' '.join(unsupported)}; exporte em DOCX ou TXT."
+            )
+    source_path = (
+        document_file_path(document)
+        if document.mime_type == DOCX_MIME_TYPE and not document.is_confidential else None
+    )
+    logger.info(f"Exportando documento {document_id} em {format} ({target_language})")
+
+    def generate():
+        # Sessão própria: o gerador continua rodando depois que o endpoint retorna
+        session = SessionLocal()
+        try:
+            chapters = iter_export_chapters(session, document_id, target_language, include_untranslated, cipher)
+            if format == "txt":
+                yield from stream_txt(chapters)
+            elif format == "docx":
+                yield from stream_docx(chapters, source_path)
+            else:
+                yield from stream_pdf(chapters)
+        finally:
+            session.close()
+
+    filename = f"{os.path.splitext(document.filename)[0]}_{target_language}.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+@router.post("/{document_id}/docx-translations")
+def request_docx_translation(
+    document_id: int,
+    request: DocxTranslationRequest,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant)
+):
+    """
+    Enfileira a tradução do DOCX original preservando layout: tabelas,
+    cabeçalhos, rodapés, notas e formatação dos runs.
+    """
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    if document.mime_type != DOCX_MIME_TYPE:
+        raise HTTPException(status_code=400, detail="A tradução com layout preservado exige um DOCX")
+    if document.is_confidential:
+        raise HTTPException(status_code=400, detail="Documentos confidenciais não guardam o DOCX original")
+    check_quota(tenant)
+    if request.translator_profile_id is None:
+        request.translator_profile_id = tenant.profile_id
+    try:
+        load_profile_spec(db, request.translator_profile_id)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = enqueue_job(
+        db,
+        "translate_docx",
+        {"document_id": document.id, **request.model_dump()},
+        document_id=document.id,
+        tenant=tenant
+    )
+    return {"document_id": document.id, "job_id": job.id, "status": job.status}
+
+@router.get("/{document_id}/docx-translations/{job_id}")
+def download_docx_translation(document_id: int, job_id: int, db: Session = Depends(get_db)):
+    """Baixa o DOCX traduzido quando o job terminar."""
+    job = db.query(Job).filter(
+        Job.id == job_id, Job.document_id == document_id, Job.job_type == "translate_docx"
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Tradução não encontrada")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Tradução ainda não concluída (status: {job.status})")
+
+    output_path = (job.result or {}).get("output_path")
+    if not output_path or not os.path.exists(output_path):
+        raise HTTPException(status_code=410, detail="Arquivo traduzido não está mais disponível")
+
+    document = db.get(Document, document_id)
+    target_language = (job.payload or {}).get("target_language", "")
+    filename = f"{os.path.splitext(document.filename)[0]}_{target_language}.docx"
+    return FileResponse(output_path, media_type=DOCX_MIME_TYPE, filename=filename)
+
+@router.post("/storage/gc")
+def collect_storage_garbage(dry_run: bool = False, db: Session = Depends(get_db)):
+    """Apaga blobs de upload que nenhum documento referencia mais."""
+    return collect_garbage(db, dry_run=dry_run)
+
+@router.post("/bulk/delete")
+def bulk_delete_documents(request: BulkDocumentRequest, background_tasks: BackgroundTasks,
+                          db: Session = Depends(get_db)):
+    """
+    Remove vários documentos de uma vez. O banco apaga capítulos,
+    traduções e jobs em cascata; os arquivos são liberados depois da resposta.
+    """
+    _check_bulk_size(request.document_ids)
+    try:
+        result = delete_documents(db, request.document_ids)
+    except Exception as e:
+        logger.error(f"Erro ao remover documentos em lote: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Erro ao remover documentos: {str(e)}")
+    background_tasks.add_task(release_deleted_files, result.files)
+    return {"deleted": len(result.affected), "document_ids": result.affected, "not_found": result.not_found}
+
+@router.post("/bulk/archive")
+def bulk_archive_documents(request: BulkArchiveRequest, db: Session = Depends(get_db)):
+    """Arquiva (ou desarquiva, com `archived=false`) vários documentos de uma vez."""
+    _check_bulk_size(request.document_ids)
+    try:
+        result = archive_documents(db, request.document_ids, request.archived)
+    except Exception as e:
+        logger.error(f"Erro ao arquivar documentos em lote: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Erro ao arquivar documentos: {str(e)}")
+    return {
+        "archived": request.archived,
+        "updated": len(result.affected),
+        "document_ids": result.affected,
+        "not_found": result.not_found,
+    }
+
+def _check_bulk_size(document_ids: List[int]) -> None:
+    if len(document_ids) > BULK_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No máximo {BULK_MAX_DOCUMENTS} documentos por chamada"
+        )
+
 @router.delete("/{document_id}")
-def delete_document(document_id: int, db: Session = Depends(get_db)):
+def delete_document(document_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     try:
         logger.info(f"Iniciando deleção do documento {document_id}")
-        
-        # Buscar o documento
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if not document:
+
+        filename = db.query(Document.filename).filter(Document.id == document_id).scalar()
+        if filename is None:
             logger.warning(f"Documento {document_id} não encontrado")
             raise HTTPException(status_code=404, detail="Documento não encontrado")
-        
-        # Remover arquivo físico
-        try:
-            if os.path.exists(document.file_path):
-                os.remove(document.file_path)
-                logger.info(f"Arquivo físico removido: {document.file_path}")
-        except Exception as e:
-            logger.error(f"Erro ao remover arquivo físico: {str(e)}")
-            # Continuar mesmo se falhar ao remover arquivo físico
-        
-        # Remover do banco de dados
-        db.delete(document)
-        db.commit()
+
+        # DELETE direto: os filhos saem pelo ON DELETE CASCADE, sem carregar o livro na sessão
+        result = delete_documents(db, [document_id])
         logger.info(f"Documento {document_id} removido com sucesso")
-        
-        return {"message": f"Documento {document.filename} removido com sucesso"}
-        
+
+        # Arquivo físico removido depois da resposta, só se nenhum outro documento o referencia
+        background_tasks.add_task(release_deleted_files, result.files)
+
+        return {"message": f"Documento {filename} removido com sucesso"}
+
     except HTTPException:
         raise
     except Exception as e:
@@ -239,3 +702,20 @@ def delete_document(document_id: int, db: Session = Depends(get_db)):
             status_code=500,
             detail=f"Erro ao deletar documento: {str(e)}"
         )
+
+@router.websocket("/{document_id}/events")
+async def document_events(websocket: WebSocket, document_id: int, after: Optional[int] = None, ack: bool = False):
+    """
+    Progresso ao vivo do documento: parágrafos traduzidos, progresso dos
+    capítulos e status dos jobs. `after` retoma a partir de um `seq`.
+    """
+    db = SessionLocal()
+    try:
+        exists = db.get(Document, document_id) is not None
+    finally:
+        db.close()
+    if not exists:
+        await websocket.accept()
+        await websocket.close(code=4404, reason="Documento não encontrado")
+        return
+    await stream_events(websocket, EventStream(document_id=document_id), after, ack)
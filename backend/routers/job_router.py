@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException, WebSocket
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+import traceback
+
+from database import SessionLocal, get_db
+from models import Job
+from services.event_service import EventStream, stream_events
+from services.job_queue import queue_stats, retry_job, serialize_job
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+@router.get("/")
+def list_jobs(
+    status: Optional[str] = None,
+    document_id: Optional[int] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    try:
+        query = db.query(Job)
+        if status:
+            query = query.filter(Job.status == status)
+        if document_id is not None:
+            query = query.filter(Job.document_id == document_id)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        return [serialize_job(job) for job in jobs]
+    except Exception as e:
+        logger.error(f"Erro ao listar jobs: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Erro ao listar jobs: {str(e)}")
+
+@router.get("/stats")
+def get_queue_stats(db: Session = Depends(get_db)):
+    """Contagem de jobs por tipo e status."""
+    return queue_stats(db)
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return serialize_job(job)
+
+@router.post("/{job_id}/retry")
+def retry_dead_job(job_id: int, db: Session = Depends(get_db)):
+    """Recoloca na fila um job que foi para dead letter."""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status not in ("dead", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job está com status {job.status}")
+    retry_job(db, job)
+    logger.info(f"Job {job_id} recolocado na fila")
+    return serialize_job(job)
+
+@router.websocket("/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: int, after: Optional[int] = None, ack: bool = False):
+    """Eventos de um job; a conexão termina com {"type": "end"} quando ele acaba."""
+    db = SessionLocal()
+    try:
+        exists = db.get(Job, job_id) is not None
+    finally:
+        db.close()
+    if not exists:
+        await websocket.accept()
+        await websocket.close(code=4404, reason="Job não encontrado")
+        return
+    await stream_events(websocket, EventStream(job_id=job_id), after, ack)
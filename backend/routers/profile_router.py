@@ -0,0 +1,133 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+import logging
+
+from database import get_db
+from models import ApiKey, Translation, TranslatorProfile
+from schemas import ApiKeyCreate, TranslatorProfileCreate, TranslatorProfileUpdate
+from services.api_keys import (
+    create_api_key, invalidate_api_keys, require_admin, revoke_api_key, serialize_api_key
+)
+from services.job_queue import tenant_queue_stats
+from services.prompt_templates import PromptTemplateError, validate_preferred_style
+from services.tenant_scheduler import fair_scheduler
+from services.tenant_usage import usage_ledger
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+def serialize_profile(profile: TranslatorProfile) -> dict:
+    return {column.name: getattr(profile, column.name) for column in TranslatorProfile.__table__.columns}
+
+def _validate_style(preferred_style):
+    """Templates inválidos são recusados na gravação, não na primeira tradução."""
+    try:
+        validate_preferred_style(preferred_style)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.post("/")
+def create_profile(request: TranslatorProfileCreate, db: Session = Depends(get_db)):
+    """
+    Cria um perfil de tradutor. `preferred_style` aceita `formality`, `style`,
+    `instructions`, `glossary` e `templates` por par/estilo, por exemplo
+    {"templates": {"en-pt:literary": {"instructions": "...", "glossary": {...}}}}.
+    """
+    _validate_style(request.preferred_style)
+    profile = TranslatorProfile(**request.model_dump())
+    db.add(profile)
+    db.commit()
+    db.refresh(profile)
+    logger.info(f"Perfil de tradutor {profile.id} criado")
+    return serialize_profile(profile)
+
+@router.get("/")
+def list_profiles(db: Session = Depends(get_db)):
+    return [serialize_profile(profile) for profile in db.query(TranslatorProfile).order_by(TranslatorProfile.id)]
+
+@router.get("/usage")
+def get_usage(db: Session = Depends(get_db)):
+    """
+    Consumo por cliente: tokens e chamadas nas últimas 24 h e no último
+    minuto, somados de todos os processos (API e workers); jobs pendentes e
+    traduções gravadas nas últimas 24 h. `scheduler` traz a fila justa,
+    recusas (429) e espera só deste processo.
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    translations = (
+        db.query(Translation.translator_profile_id, func.count(Translation.id))
+        .filter(Translation.created_at >= since)
+        .group_by(Translation.translator_profile_id)
+        .all()
+    )
+    return {
+        "tenants_24h": usage_ledger.usage(db, since),
+        "scheduler": fair_scheduler.stats(),
+        "queue": tenant_queue_stats(db),
+        "translations_24h": {
+            f"profile:{profile_id}" if profile_id is not None else "anonymous": count
+            for profile_id, count in translations
+        },
+    }
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: int, db: Session = Depends(get_db)):
+    profile = db.get(TranslatorProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return serialize_profile(profile)
+
+@router.put("/{profile_id}")
+def update_profile(profile_id: int, request: TranslatorProfileUpdate, db: Session = Depends(get_db)):
+    profile = db.get(TranslatorProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    changes = request.model_dump(exclude_unset=True)
+    if "preferred_style" in changes:
+        _validate_style(changes["preferred_style"])
+    for field, value in changes.items():
+        setattr(profile, field, value)
+    db.commit()
+    db.refresh(profile)
+    if {"tokens_per_minute", "scheduling_weight"} & changes.keys():
+        invalidate_api_keys()
+    logger.info(f"Perfil de tradutor {profile.id} atualizado")
+    return serialize_profile(profile)
+
+def _get_profile_or_404(db: Session, profile_id: int) -> TranslatorProfile:
+    profile = db.get(TranslatorProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return profile
+
+@router.post("/{profile_id}/api-keys", dependencies=[Depends(require_admin)])
+def create_profile_api_key(profile_id: int, request: ApiKeyCreate, db: Session = Depends(get_db)):
+    """
+    Cria uma chave de API para o perfil (exige X-Admin-Key). A chave só
+    aparece nesta resposta: o servidor guarda apenas o hash.
+    """
+    profile = _get_profile_or_404(db, profile_id)
+    api_key, key = create_api_key(db, profile, request.name)
+    return dict(serialize_api_key(api_key), key=key)
+
+@router.get("/{profile_id}/api-keys", dependencies=[Depends(require_admin)])
+def list_profile_api_keys(profile_id: int, db: Session = Depends(get_db)):
+    _get_profile_or_404(db, profile_id)
+    keys = db.query(ApiKey).filter(ApiKey.translator_profile_id == profile_id).order_by(ApiKey.id)
+    return [serialize_api_key(api_key) for api_key in keys]
+
+@router.delete("/{profile_id}/api-keys/{key_id}", dependencies=[Depends(require_admin)])
+def revoke_profile_api_key(profile_id: int, key_id: int, db: Session = Depends(get_db)):
+    api_key = db.get(ApiKey, key_id)
+    if not api_key or api_key.translator_profile_id != profile_id:
+        raise HTTPException(status_code=404, detail="Chave não encontrada")
+    if api_key.revoked_at is None:
+        revoke_api_key(db, api_key)
+        logger.info(f"Chave de API {api_key.key_prefix}... do perfil {profile_id} revogada")
+    return serialize_api_key(api_key)
@@ -1,29 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from collections import Counter
 from typing import List, Optional
 import logging
 from datetime import datetime
 from pydantic import BaseModel
+import time
 import traceback
 
 from database import get_db
+from edit_distance import edit_stats
 from models import Translation, Document, Chapter
-from services.openai_service import translate_text
+from schemas import DocumentTranslationRequest, EditDistanceRequest, TranslationRevisionCreate
+from services.confidential import confidential_scope, document_cipher, redact, translation_cipher
+from services.example_retrieval import example_store
+from services.language_detector import (
+    AUTO, analyze_segment, detect_language, language_metrics, resolve_source_language
+)
+from services.openai_service import dominant_model, translate_text
+from services.paragraph_dedup import dedup_metrics
+from services.model_router import routing_metrics
+from services.post_edit_service import GROUP_COLUMNS, revision_stats, serialize_revision, submit_revision
+from services.prefetch_service import cancel_prefetch, consume_prefetch, options_key, prefetch_stats, schedule_prefetch
+from services.job_queue import enqueue_job, fair_orders, translation_cost
+from services.api_keys import check_quota, get_tenant
+from services.tenant_scheduler import Tenant, tenant_scope
+from services.prompt_templates import (
+    ProfileSpec, PromptTemplateError, load_profile_spec, profile_glossary, prompt_metrics, resolve_options
+)
+from services.quality_estimator import estimate_quality, quality_metrics
+from services.translation_cache import translation_cache
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+def get_profile_spec(db: Session, profile_id: Optional[int]) -> Optional[ProfileSpec]:
+    """Carrega o perfil do tradutor, convertendo erros de template em 400."""
+    try:
+        return load_profile_spec(db, profile_id)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Schema para requisição de tradução
 class TranslationRequest(BaseModel):
     text: str
-    source_language: str
+    source_language: Optional[str] = None  # None ou "auto": detectado no texto
     target_language: str
-    formality_level: Optional[str] = "neutral"
+    formality_level: Optional[str] = None  # padrão do perfil ou "neutral"
     tone: Optional[str] = None
-    style: Optional[str] = "general"
+    style: Optional[str] = None  # padrão do perfil ou "general"
+    granularity: Optional[str] = "paragraph"  # paragraph ou sentence
+    translator_profile_id: Optional[int] = None
+    confidential: bool = False  # sem cache/memória de tradução e sem texto nos logs (só /quick)
 
 # Schema para resposta de tradução
 class TranslationResponse(BaseModel):
@@ -32,33 +65,71 @@ class TranslationResponse(BaseModel):
     target_language: str
     created_at: datetime
 
+# Schema para detecção de idioma
+class LanguageDetectionRequest(BaseModel):
+    text: str
+    target_language: Optional[str] = None
+
+def _tenant_profile(request, tenant: Tenant) -> None:
+    # Sem perfil explícito, a chave de API determina o perfil do tradutor
+    if request.translator_profile_id is None:
+        request.translator_profile_id = tenant.profile_id
+
+def _chapter_costs(document: Document, chapters: List[Chapter], targets: int = 1) -> List[float]:
+    cipher = document_cipher(document)
+    return [
+        translation_cost(sum(len(text) for text in cipher.decrypt_list(chapter.content or [])), targets)
+        for chapter in chapters
+    ]
+
 # Endpoint para tradução rápida (sem salvar no banco)
 @router.post("/quick")
 async def translate_quick(
     request: TranslationRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant)
 ):
+    # A cota pode ir ao banco: fora do event loop
+    await run_in_threadpool(check_quota, tenant)
+    _tenant_profile(request, tenant)
+    profile = get_profile_spec(db, request.translator_profile_id)
+    formality, style = resolve_options(profile, request.formality_level, request.style)
+    source_language = resolve_source_language(request.text, request.source_language) or AUTO
     try:
-        logger.info(f"Iniciando tradução rápida de {request.source_language} para {request.target_language}")
-        logger.info(f"Formalidade: {request.formality_level}, Estilo: {request.style}")
-        logger.info(f"Texto a ser traduzido: {request.text[:100]}...")  # Log apenas os primeiros 100 caracteres
+        logger.info(f"Iniciando tradução rápida de {source_language} para {request.target_language}")
+        logger.info(f"Formalidade: {formality}, Estilo: {style}")
+        with confidential_scope(request.confidential):
+            logger.info(f"Texto a ser traduzido: {redact(request.text, 100)}")
         
-        translated_text = await translate_text(
-            text=request.text,
-            source_language=request.source_language,
-            target_language=request.target_language,
-            formality=request.formality_level,
-            style=request.style
-        )
+        model_usage = Counter()
+        with tenant_scope(tenant):
+            translated_text = await translate_text(
+                text=request.text,
+                source_language=source_language,
+                target_language=request.target_language,
+                formality=formality,
+                style=style,
+                granularity=request.granularity,
+                db=db,
+                profile=profile,
+                model_usage=model_usage,
+                confidential=request.confidential
+            )
         
         logger.info("Tradução concluída com sucesso")
+        quality = estimate_quality(
+            request.text, translated_text, source_language, request.target_language,
+            profile_glossary(profile, source_language, request.target_language, style)
+        )
         
         return {
             "translated_text": translated_text,
-            "source_language": request.source_language,
+            "source_language": source_language,
             "target_language": request.target_language,
-            "formality": request.formality_level,
-            "style": request.style
+            "formality": formality,
+            "style": style,
+            "model": dominant_model(model_usage),
+            **quality.as_dict()
         }
         
     except Exception as e:
@@ -73,30 +144,56 @@ async def translate_quick(
 @router.post("/", response_model=TranslationResponse)
 async def translate(
     request: TranslationRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant)
 ):
+    if request.confidential:
+        # Sem documento não há chave para cifrar o histórico
+        raise HTTPException(
+            status_code=400,
+            detail="Traduções confidenciais avulsas não são gravadas: use /quick ou um documento confidencial"
+        )
+    await run_in_threadpool(check_quota, tenant)
+    _tenant_profile(request, tenant)
+    profile = get_profile_spec(db, request.translator_profile_id)
+    formality, style = resolve_options(profile, request.formality_level, request.style)
+    source_language = resolve_source_language(request.text, request.source_language) or AUTO
     try:
-        logger.info(f"Iniciando tradução: {request.text[:50]}...")
+        logger.info(f"Iniciando tradução: {redact(request.text, 50)}")
         
         # Realizar a tradução
-        translated_text = await translate_text(
-            text=request.text,
-            source_language=request.source_language,
-            target_language=request.target_language,
-            formality=request.formality_level,
-            style=request.style
-        )
+        model_usage = Counter()
+        with tenant_scope(tenant):
+            translated_text = await translate_text(
+                text=request.text,
+                source_language=source_language,
+                target_language=request.target_language,
+                formality=formality,
+                style=style,
+                granularity=request.granularity,
+                db=db,
+                profile=profile,
+                model_usage=model_usage
+            )
         
+        quality = estimate_quality(
+            request.text, translated_text, source_language, request.target_language,
+            profile_glossary(profile, source_language, request.target_language, style)
+        )
+
         # Criar registro da tradução
         translation = Translation(
             original_text=request.text,
             translated_text=translated_text,
-            source_language=request.source_language,
+            source_language=source_language,
             target_language=request.target_language,
-            formality_level=request.formality_level,
+            formality_level=formality,
+            style=style,
             tone=request.tone,
-            style=request.style,
-            created_at=datetime.utcnow()
+            translator_profile_id=request.translator_profile_id,
+            created_at=datetime.utcnow(),
+            model_used=dominant_model(model_usage),
+            **quality.translation_fields()
         )
         
         db.add(translation)
@@ -107,7 +204,7 @@ async def translate(
         
         return TranslationResponse(
             translated_text=translated_text,
-            source_language=request.source_language,
+            source_language=source_language,
             target_language=request.target_language,
             created_at=translation.created_at
         )
@@ -120,6 +217,270 @@ async def translate(
             detail=f"Erro ao processar a tradução: {str(e)}"
         )
 
+# Endpoint para tradução de documento (processada pelo worker)
+@router.post("/document")
+def translate_document(
+    request: DocumentTranslationRequest,
+    db: Session = Depends(get_db),
+    tenant: Tenant = Depends(get_tenant)
+):
+    """
+    Enfileira a tradução de um capítulo (ou de todos) de um documento.
+    Apenas parágrafos ainda sem tradução no idioma de destino são enviados,
+    a menos que `force` seja verdadeiro. Com `prefetch_chapters`, os
+    capítulos seguintes são traduzidos em prioridade baixa enquanto o
+    leitor revisa o atual. Com `target_languages` (e opcionalmente
+    `pivot_language`), cada capítulo é traduzido para todos os destinos
+    num só job. Os jobs entram na fila justa do cliente (chave de API):
+    um livro inteiro não atrasa os capítulos de outros clientes.
+    """
+    check_quota(tenant)
+    _tenant_profile(request, tenant)
+    try:
+        targets = list(dict.fromkeys(request.target_languages or []))
+        if len(targets) > 1 or (targets and request.pivot_language):
+            return _translate_document_multi(request, targets, db, tenant)
+        if targets:
+            request.target_language = targets[0]
+
+        document, chapters = _requested_chapters(request, db)
+
+        payload = {
+            "source_language": request.source_language,
+            "target_language": request.target_language,
+            "formality_level": request.formality_level,
+            "style": request.style,
+            "granularity": request.granularity,
+            "start_paragraph": request.start_paragraph,
+            "end_paragraph": request.end_paragraph,
+            "force": request.force,
+            "translator_profile_id": request.translator_profile_id,
+        }
+        key = options_key(payload)
+        full_chapter = request.start_paragraph is None and request.end_paragraph is None and not request.force
+
+        jobs = []
+        orders = fair_orders(db, tenant, _chapter_costs(document, chapters))
+        for chapter, fair_order in zip(chapters, orders):
+            # Capítulo já antecipado: registrar o acerto e reaproveitar o job se ainda estiver na fila
+            job = consume_prefetch(
+                db, chapter, request.target_language, key,
+                reusable=full_chapter, record_miss=request.prefetch_chapters > 0
+            )
+            if job is None:
+                job = enqueue_job(
+                    db,
+                    "translate_chapter",
+                    dict(payload, chapter_id=chapter.id),
+                    document_id=document.id,
+                    commit=False,
+                    tenant=tenant,
+                    fair_order=fair_order
+                )
+            jobs.append((chapter, job))
+
+        prefetched = []
+        if request.prefetch_chapters > 0:
+            prefetched = schedule_prefetch(
+                db, document, max(chapter.order for chapter in chapters), request.prefetch_chapters, payload,
+                tenant=tenant
+            )
+        db.commit()
+
+        logger.info(f"{len(jobs)} job(s) de tradução enfileirados para o documento {document.id}")
+        cipher = document_cipher(document)
+        return {
+            "document_id": document.id,
+            "target_language": request.target_language,
+            "jobs": [
+                {"job_id": job.id, "chapter_id": chapter.id, "chapter_order": chapter.order,
+                 "chapter_title": cipher.decrypt(chapter.title)}
+                for chapter, job in jobs
+            ],
+            "prefetch": prefetched
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar tradução do documento: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao enfileirar tradução do documento: {str(e)}"
+        )
+
+def _requested_chapters(request: DocumentTranslationRequest, db: Session):
+    """Documento e capítulos (um ou todos) de um pedido de tradução de documento."""
+    document = db.query(Document).filter(Document.id == request.document_id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    # Validar o perfil agora para não enfileirar jobs que falhariam
+    get_profile_spec(db, request.translator_profile_id)
+
+    query = db.query(Chapter).filter(Chapter.document_id == document.id)
+    if request.chapter_order is not None:
+        query = query.filter(Chapter.order == request.chapter_order)
+    elif request.chapter_title and not document.is_confidential:
+        query = query.filter(Chapter.title == request.chapter_title)
+    chapters = query.order_by(Chapter.order).all()
+    if request.chapter_order is None and request.chapter_title and document.is_confidential:
+        # Títulos cifrados (nonce próprio) não se comparam no banco: decifrar e comparar aqui
+        cipher = document_cipher(document)
+        chapters = [chapter for chapter in chapters if cipher.decrypt(chapter.title) == request.chapter_title]
+    if not chapters:
+        raise HTTPException(status_code=404, detail="Capítulo não encontrado")
+    return document, chapters
+
+def _translate_document_multi(request: DocumentTranslationRequest, targets: List[str], db: Session,
+                              tenant: Tenant):
+    """
+    Enfileira um job translate_chapter_multi por capítulo: análise, memória
+    de tradução e limite de concorrência compartilhados entre os destinos.
+    """
+    if request.prefetch_chapters > 0:
+        raise HTTPException(status_code=400, detail="Tradução antecipada não é suportada com vários destinos")
+    document, chapters = _requested_chapters(request, db)
+
+    payload = {
+        "source_language": request.source_language,
+        "target_languages": targets,
+        "pivot_language": request.pivot_language,
+        "formality_level": request.formality_level,
+        "style": request.style,
+        "granularity": request.granularity,
+        "start_paragraph": request.start_paragraph,
+        "end_paragraph": request.end_paragraph,
+        "force": request.force,
+        "translator_profile_id": request.translator_profile_id,
+    }
+    orders = fair_orders(db, tenant, _chapter_costs(document, chapters, len(targets)))
+    jobs = [
+        (chapter, enqueue_job(db, "translate_chapter_multi", dict(payload, chapter_id=chapter.id),
+                              document_id=document.id, commit=False, tenant=tenant, fair_order=fair_order))
+        for chapter, fair_order in zip(chapters, orders)
+    ]
+    db.commit()
+
+    logger.info(f"{len(jobs)} job(s) de tradução para {', '.join(targets)} enfileirados para o documento {document.id}")
+    cipher = document_cipher(document)
+    return {
+        "document_id": document.id,
+        "target_languages": targets,
+        "pivot_language": request.pivot_language,
+        "jobs": [
+            {"job_id": job.id, "chapter_id": chapter.id, "chapter_order": chapter.order,
+             "chapter_title": cipher.decrypt(chapter.title)}
+            for chapter, job in jobs
+        ],
+        "prefetch": []
+    }
+
+@router.post("/document/{document_id}/prefetch/cancel")
+def cancel_document_prefetch(
+    document_id: int,
+    target_language: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancela as traduções antecipadas ainda não usadas do documento.
+    POST para poder ser chamado com navigator.sendBeacon ao sair da página.
+    """
+    return {"document_id": document_id, "cancelled": cancel_prefetch(db, document_id, target_language)}
+
+@router.get("/prefetch/stats")
+def get_prefetch_stats(document_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Taxa de acerto das traduções antecipadas."""
+    return prefetch_stats(db, document_id)
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Estatísticas do cache de segmentos traduzidos."""
+    return translation_cache.stats()
+
+@router.get("/dedup/stats")
+def get_dedup_stats():
+    """Parágrafos repetidos nos uploads e tarefas de tradução evitadas pela deduplicação."""
+    return dedup_metrics.stats()
+
+@router.post("/detect")
+def detect(request: LanguageDetectionRequest):
+    """Idioma do texto e se ele seria enviado à API para o idioma de destino."""
+    guess = detect_language(request.text)
+    response = {
+        "language": guess.language,
+        "confidence": round(guess.confidence, 4),
+        "margin": round(guess.margin, 4),
+    }
+    if request.target_language:
+        response["action"] = analyze_segment(request.text, request.target_language).action
+    return response
+
+@router.get("/languages/stats")
+def get_language_stats():
+    """Segmentos mantidos sem tradução pela detecção de idioma (chamadas evitadas)."""
+    return language_metrics.stats()
+
+@router.get("/prompts/stats")
+def get_prompt_stats():
+    """Templates compilados e tokens de prompt economizados com o prefixo fixo."""
+    return prompt_metrics.stats()
+
+@router.get("/models/stats")
+def get_model_stats():
+    """Divisão do tráfego entre os níveis de modelo, falhas, escalonamentos e latência."""
+    return routing_metrics.stats()
+
+@router.get("/examples/stats")
+def get_example_stats():
+    """Post-edições indexadas e usadas como exemplos few-shot."""
+    return example_store.stats()
+
+@router.get("/quality/stats")
+def get_quality_stats(db: Session = Depends(get_db)):
+    """Segmentos sinalizados pela estimativa de qualidade e revisados pelo modelo mais caro."""
+    pending_review = db.query(Translation).filter(Translation.revision_needed.is_(True)).count()
+    return {**quality_metrics.stats(), "translations_pending_review": pending_review}
+
+@router.post("/revisions/distance")
+def compute_edit_distance(request: EditDistanceRequest):
+    """Distância de edição entre dois textos, sem gravar (métrica ao vivo do editor)."""
+    started = time.perf_counter()
+    stats = edit_stats(request.original, request.revised)
+    return {**stats.as_dict(), "elapsed_ms": round(1000 * (time.perf_counter() - started), 2)}
+
+@router.get("/revisions/stats")
+def get_revision_stats(
+    group_by: str = "profile",
+    since: Optional[datetime] = None,
+    document_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Esforço de post-edição agregado por perfil, modelo ou idioma de destino."""
+    if group_by not in GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by deve ser um de {sorted(GROUP_COLUMNS)}")
+    return {"group_by": group_by, "groups": revision_stats(db, group_by, since, document_id)}
+
+@router.post("/{translation_id}/revisions")
+def create_revision(translation_id: int, request: TranslationRevisionCreate, db: Session = Depends(get_db)):
+    """Grava a post-edição de uma tradução e calcula o esforço em caracteres e palavras."""
+    translation = db.get(Translation, translation_id)
+    if translation is None:
+        raise HTTPException(status_code=404, detail="Tradução não encontrada")
+    revision = submit_revision(
+        db, translation, request.revised_text, request.revision_type,
+        request.revision_comments, request.time_spent, request.accepted_changes
+    )
+    return serialize_revision(revision, translation_cipher(translation))
+
+@router.get("/{translation_id}/revisions")
+def list_revisions(translation_id: int, db: Session = Depends(get_db)):
+    translation = db.get(Translation, translation_id)
+    if translation is None:
+        raise HTTPException(status_code=404, detail="Tradução não encontrada")
+    cipher = translation_cipher(translation)
+    return [serialize_revision(revision, cipher) for revision in sorted(translation.revisions, key=lambda r: r.id)]
+
 @router.get("/", response_model=List[TranslationResponse])
 def list_translations(db: Session = Depends(get_db)):
     try:
@@ -127,7 +488,7 @@ def list_translations(db: Session = Depends(get_db)):
         translations = db.query(Translation).order_by(Translation.created_at.desc()).all()
         return [
             TranslationResponse(
-                translated_text=t.translated_text,
+                translated_text=translation_cipher(t).decrypt(t.translated_text),
                 source_language=t.source_language,
                 target_language=t.target_language,
                 created_at=t.created_at
@@ -150,7 +511,7 @@ def get_translation(translation_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Tradução não encontrada")
             
         return TranslationResponse(
-            translated_text=translation.translated_text,
+            translated_text=translation_cipher(translation).decrypt(translation.translated_text),
             source_language=translation.source_language,
             target_language=translation.target_language,
             created_at=translation.created_at
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 from datetime import datetime
 
@@ -30,6 +30,18 @@ class Translation(TranslationBase):
     class Config:
         from_attributes = True
 
+# Post-edição de uma tradução
+class TranslationRevisionCreate(BaseModel):
+    revised_text: str
+    revision_type: str = "manual"  # manual, automatic, peer
+    revision_comments: Optional[str] = None
+    time_spent: Optional[int] = None  # segundos
+    accepted_changes: bool = True
+
+class EditDistanceRequest(BaseModel):
+    original: str
+    revised: str
+
 # Novos schemas para documentos
 class DocumentMetadata(BaseModel):
     filename: str
@@ -47,14 +59,23 @@ class DocumentContent(BaseModel):
     chapters: Dict[str, List[str]]
 
 class DocumentTranslationRequest(BaseModel):
-    document_id: str
+    document_id: int
     chapter_title: Optional[str] = None
+    chapter_order: Optional[int] = None
     start_paragraph: Optional[int] = None
     end_paragraph: Optional[int] = None
-    source_language: str = "en"
+    source_language: Optional[str] = None  # None ou "auto": detectado por parágrafo
     target_language: str = "pt"
+    # Vários destinos num job por capítulo (substitui target_language), com
+    # pivot_language opcional: origem -> pivô -> cada destino
+    target_languages: Optional[List[str]] = None
+    pivot_language: Optional[str] = None
     formality_level: Optional[str] = None
     style: Optional[str] = None
+    granularity: Optional[str] = "paragraph"
+    force: bool = False  # retraduzir parágrafos que já têm tradução
+    translator_profile_id: Optional[int] = None
+    prefetch_chapters: int = 0  # antecipar os N capítulos seguintes em prioridade baixa
 
 class DocumentTranslationResponse(BaseModel):
     document_id: str
@@ -63,3 +84,39 @@ class DocumentTranslationResponse(BaseModel):
     translated_paragraphs: List[str]
     translation_status: str
     progress_percentage: float
+
+# Operações em lote sobre documentos
+class BulkDocumentRequest(BaseModel):
+    document_ids: List[int]
+
+class BulkArchiveRequest(BulkDocumentRequest):
+    archived: bool = True  # False desarquiva
+
+class DocxTranslationRequest(BaseModel):
+    source_language: Optional[str] = None  # None ou "auto": detectado por segmento
+    target_language: str = "pt"
+    formality_level: Optional[str] = None
+    style: Optional[str] = None
+    translator_profile_id: Optional[int] = None
+
+# Perfis de tradutor: preferred_style guarda padrões, instruções, glossário e templates
+class TranslatorProfileBase(BaseModel):
+    name: str
+    preferred_style: Optional[Dict] = None
+    language_pairs: Optional[List[str]] = None
+    # Cota (tokens/min) e peso na fila justa; nulos usam os padrões do servidor
+    tokens_per_minute: Optional[int] = Field(default=None, gt=0)
+    scheduling_weight: Optional[int] = Field(default=None, gt=0)
+
+class TranslatorProfileCreate(TranslatorProfileBase):
+    pass
+
+class TranslatorProfileUpdate(BaseModel):
+    name: Optional[str] = None
+    preferred_style: Optional[Dict] = None
+    language_pairs: Optional[List[str]] = None
+    tokens_per_minute: Optional[int] = Field(default=None, gt=0)
+    scheduling_weight: Optional[int] = Field(default=None, gt=0)
+
+class ApiKeyCreate(BaseModel):
+    name: Optional[str] = None
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Abreviações que terminam em ponto e não encerram a frase (minúsculas, sem o ponto final)
+ABBREVIATIONS: Dict[str, FrozenSet[str]] = {
+    'en': frozenset({
+        'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'vs', 'etc',
+        'e.g', 'i.e', 'cf', 'approx', 'dept', 'est', 'fig', 'figs', 'inc',
+        'ltd', 'co', 'corp', 'no', 'nos', 'vol', 'vols', 'pp', 'p', 'ed', 'eds',
+        'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct',
+        'nov', 'dec', 'gen', 'gov', 'sen', 'rep', 'rev', 'capt', 'col', 'lt',
+        'u.s', 'u.k', 'a.m', 'p.m', 'ch', 'sec', 'al',
+    }),
+    'pt': frozenset({
+        'sr', 'sra', 'srta', 'dr', 'dra', 'prof', 'profa', 'exmo', 'exma',
+        'ilmo', 'ilma', 'v.exa', 'v.sa', 'av', 'r', 'pç', 'nº', 'n', 'no',
+        'pág', 'págs', 'p', 'pp', 'cap', 'caps', 'vol', 'vols', 'ed', 'etc',
+        'obs', 'ex', 'cf', 'fig', 'séc', 'ltda', 'cia', 'jan', 'fev', 'mar',
+        'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez',
+        'gen', 'cel', 'ten', 'cap', 'dir', 'depto', 'tel', 'aprox', 'a.c', 'd.c',
+    }),
+    'es': frozenset({
+        'sr', 'sra', 'srta', 'sres', 'dr', 'dra', 'prof', 'profa', 'lic',
+        'ing', 'arq', 'ud', 'uds', 'vd', 'vds', 'd', 'dña', 'av', 'avda',
+        'c', 'núm', 'n', 'no', 'pág', 'págs', 'p', 'pp', 'cap', 'vol', 'ed',
+        'etc', 'ej', 'cf', 'fig', 'aprox', 'cía', 'ene', 'feb', 'mar', 'abr',
+        'may', 'jun', 'jul', 'ago', 'sept', 'oct', 'nov', 'dic', 'gral',
+        'tel', 'dpto', 'a.c', 'd.c', 'ee.uu',
+    }),
+}
+
+# Conjunto usado quando o idioma não é conhecido
+ALL_ABBREVIATIONS: FrozenSet[str] = frozenset().union(*ABBREVIATIONS.values())
+
+# Candidato a fim de frase: pontuação final, fechamentos opcionais, espaço
+# e, em seguida, algo que pode iniciar uma nova frase
+_BOUNDARY = re.compile(
+    r'([.!?…]+)'
+    r'(["\'”’»)\]]*)'
+    r'(\s+)'
+    r'(?=["\'“‘«(\[¿¡—–-]?\s*[A-ZÀ-ÖØ-Þ0-9])'
+)
+
+# Última "palavra" antes do ponto (pode conter pontos internos: e.g, U.S)
+_LAST_TOKEN = re.compile(r'([\w.º]+)$')
+
+
+def _abbreviations(language: Optional[str]) -> FrozenSet[str]:
+    if not language:
+        return ALL_ABBREVIATIONS
+    return ABBREVIATIONS.get(language.lower()[:2], ALL_ABBREVIATIONS)
+
+
+def segment_sentences(text: str, language: Optional[str] = None) -> List[Tuple[int, int]]:
+    """
+    Segmenta um texto em frases e retorna os offsets [início, fim) de cada uma.
+
+    Regras: a frase termina em . ! ? ou …, seguidos de espaço e de um início
+    de frase (maiúscula, número, aspas, travessão). Pontos de abreviações,
+    iniciais (J. R. R. Tolkien) e números ordinais não encerram a frase.
+    """
+    abbreviations = _abbreviations(language)
+    offsets = []
+    start = 0
+    length = len(text)
+
+    # Pular espaços iniciais
+    while start < length and text[start].isspace():
+        start += 1
+
+    for match in _BOUNDARY.finditer(text, start):
+        punctuation = match.group(1)
+        if punctuation == '.':
+            token_match = _LAST_TOKEN.search(text, start, match.start(1))
+            token = token_match.group(1).lower() if token_match else ''
+            if token in abbreviations:
+                continue
+            # Inicial de nome ou número ordinal/enumeração ("J.", "3.")
+            if len(token) == 1 and token.isalpha():
+                continue
+            if token.isdigit() and token_match.start(1) == start:
+                continue
+
+        end = match.end(2)
+        if end > start:
+            offsets.append((start, end))
+        start = match.end(3)
+
+    # Último trecho (sem espaços finais)
+    end = length
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        offsets.append((start, end))
+
+    return offsets
+
+
+def split_sentences(text: str, language: Optional[str] = None) -> List[str]:
+    """Atalho que retorna o texto de cada frase."""
+    return [text[start:end] for start, end in segment_sentences(text, language)]
@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import ApiKey, TranslatorProfile
+from services.tenant_scheduler import (
+    ANONYMOUS_JOBS_TENANT, ANONYMOUS_TENANT, TENANT_DEFAULT_WEIGHT, TENANT_TOKENS_PER_MINUTE, QuotaExceeded, Tenant,
+    fair_scheduler
+)
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Exigir chave de API em todas as rotas de tradução (sem ela, anônimo com a cota padrão)
+API_KEYS_REQUIRED = os.getenv("API_KEYS_REQUIRED", "false").lower() in ("1", "true", "yes")
+# Segredo de administração exigido (header X-Admin-Key) para criar, listar e revogar
+# chaves; sem ele configurado, a gestão de chaves pela API fica desligada
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+# Validade (s) da chave resolvida em memória: revogação e mudança de cota demoram até isso
+API_KEY_CACHE_SECONDS = int(os.getenv("API_KEY_CACHE_SECONDS", "60"))
+
+KEY_PREFIX = "tpk_"
+
+_cache: Dict[str, Tuple[float, Optional[Tenant]]] = {}
+_cache_lock = threading.Lock()
+
+
+def hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def serialize_api_key(api_key: ApiKey) -> dict:
+    """Dados da chave sem o hash (a chave em claro nunca é guardada)."""
+    return {
+        "id": api_key.id,
+        "translator_profile_id": api_key.translator_profile_id,
+        "name": api_key.name,
+        "key_prefix": api_key.key_prefix,
+        "created_at": api_key.created_at,
+        "last_used_at": api_key.last_used_at,
+        "revoked_at": api_key.revoked_at,
+    }
+
+
+def create_api_key(db: Session, profile: TranslatorProfile, name: Optional[str] = None) -> Tuple[ApiKey, str]:
+    """Gera uma chave para o perfil. A chave em claro só existe no retorno desta função."""
+    key = KEY_PREFIX + secrets.token_urlsafe(32)
+    api_key = ApiKey(
+        translator_profile_id=profile.id,
+        name=name,
+        key_prefix=key[:len(KEY_PREFIX) + 6],
+        key_hash=hash_key(key),
+    )
+    db.add(api_key)
+    db.commit()
+    db.refresh(api_key)
+    logger.info(f"Chave de API {api_key.key_prefix}... criada para o perfil {profile.id}")
+    return api_key, key
+
+
+def revoke_api_key(db: Session, api_key: ApiKey) -> None:
+    api_key.revoked_at = datetime.now(timezone.utc)
+    db.commit()
+    invalidate_api_keys()
+
+
+def invalidate_api_keys() -> None:
+    """Descarta as chaves resolvidas (revogação, mudança de cota ou peso do perfil)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def profile_tenant(profile: TranslatorProfile, interactive: bool = True) -> Tenant:
+    return Tenant(
+        key=f"profile:{profile.id}",
+        profile_id=profile.id,
+        weight=profile.scheduling_weight or TENANT_DEFAULT_WEIGHT,
+        tokens_per_minute=profile.tokens_per_minute or TENANT_TOKENS_PER_MINUTE,
+        interactive=interactive,
+    )
+
+
+def tenant_for_job(db: Session, tenant_key: Optional[str]) -> Tenant:
+    """Cliente de um job (coluna jobs.tenant), com peso e cota atuais do perfil."""
+    if tenant_key and tenant_key.startswith("profile:"):
+        profile = db.get(TranslatorProfile, int(tenant_key.split(":", 1)[1]))
+        if profile is not None:
+            return profile_tenant(profile, interactive=False)
+    return ANONYMOUS_JOBS_TENANT
+
+
+def _resolve(db: Session, key: str) -> Optional[Tenant]:
+    digest = hash_key(key)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(digest)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+    api_key = db.query(ApiKey).filter(ApiKey.key_hash == digest).first()
+    tenant = None
+    if api_key is not None and api_key.revoked_at is None:
+        tenant = profile_tenant(api_key.translator_profile)
+        # Uso registrado no máximo uma vez por validade do cache, não a cada requisição
+        api_key.last_used_at = datetime.now(timezone.utc)
+        db.commit()
+    with _cache_lock:
+        _cache[digest] = (now + API_KEY_CACHE_SECONDS, tenant)
+    return tenant
+
+
+def get_tenant(
+    x_api_key: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+) -> Tenant:
+    """
+    Dependência das rotas de tradução: identifica o cliente pela chave em
+    `X-API-Key` (ou `Authorization: Bearer`). Sem chave, o cliente é o
+    anônimo, a menos que API_KEYS_REQUIRED esteja ligado.
+    """
+    key = x_api_key
+    if key is None and authorization and authorization.lower().startswith("bearer "):
+        key = authorization[7:].strip()
+    if not key:
+        if API_KEYS_REQUIRED:
+            raise HTTPException(status_code=401, detail="Chave de API obrigatória")
+        return ANONYMOUS_TENANT
+    tenant = _resolve(db, key)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Chave de API inválida ou revogada")
+    return tenant
+
+
+def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Dependência das rotas de gestão de chaves: só com o segredo de administração."""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Gestão de chaves desativada: configure ADMIN_API_KEY")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode("utf-8"), ADMIN_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Chave de administração inválida")
+
+
+def check_quota(tenant: Tenant) -> None:
+    """429 com Retry-After para o cliente que esgotou a cota de tokens por minuto."""
+    try:
+        fair_scheduler.check_quota(tenant)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
@@ -0,0 +1,92 @@
+import logging
+from typing import Dict, List, Optional
+
+from document_processor import paragraph_hash
+from models import Chapter, Document, ParagraphHash
+from sentence_segmenter import segment_sentences
+from services.confidential import PLAINTEXT, PlainCipher
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def build_chapters(document: Document, processed_data: Dict,
+                   cipher: PlainCipher = PLAINTEXT) -> List[Chapter]:
+    """
+    Cria os registros Chapter a partir do resultado do DocumentProcessor.
+
+    `translated_content` guarda as traduções por idioma de destino,
+    em listas paralelas a `content`: {"pt": ["...", None, ...]}.
+    `sentence_offsets` guarda, para cada parágrafo, os offsets das frases.
+    Em documentos confidenciais título e parágrafos são gravados cifrados.
+    Os demais ganham o hash de cada parágrafo em `paragraph_hashes`.
+    """
+    language = processed_data.get('metadata', {}).get('language')
+    chapters = []
+    for order, chapter_data in enumerate(processed_data.get('chapters', [])):
+        paragraphs = chapter_data.get('paragraphs', [])
+        chapters.append(Chapter(
+            document=document,
+            title=cipher.encrypt(chapter_data.get('title') or f"Chapter {order + 1}"),
+            order=order,
+            content=cipher.encrypt_list(paragraphs),
+            sentence_offsets=[
+                [list(offset) for offset in segment_sentences(paragraph, language)]
+                for paragraph in paragraphs
+            ],
+            paragraph_styles=chapter_data.get('styles'),
+            translated_content={},
+            translation_status="pending",
+            progress_percentage=0.0,
+            paragraph_hashes=[] if cipher.confidential else [
+                ParagraphHash(document=document, position=position, content_hash=paragraph_hash(paragraph))
+                for position, paragraph in enumerate(paragraphs)
+            ],
+        ))
+    return chapters
+
+
+def update_chapter_progress(chapter: Chapter) -> None:
+    """Recalcula status e porcentagem de tradução do capítulo."""
+    total = len(chapter.content or [])
+    translated_content = chapter.translated_content or {}
+    if not total or not translated_content:
+        chapter.progress_percentage = 100.0 if not total and translated_content else 0.0
+        chapter.target_progress = {language: chapter.progress_percentage for language in translated_content}
+        chapter.translation_status = "completed" if chapter.progress_percentage else "pending"
+        return
+
+    # Progresso por idioma de destino (jobs com vários destinos avançam em paralelo)
+    percentages = {
+        language: round(100.0 * sum(1 for t in translations if t is not None) / total, 2)
+        for language, translations in translated_content.items()
+    }
+    chapter.target_progress = percentages
+    chapter.progress_percentage = round(sum(percentages.values()) / len(percentages), 2)
+    if chapter.progress_percentage >= 100.0:
+        chapter.translation_status = "completed"
+    elif chapter.progress_percentage > 0:
+        chapter.translation_status = "in_progress"
+    else:
+        chapter.translation_status = "pending"
+
+
+def get_paragraph_translations(chapter: Chapter, language: str) -> List[Optional[str]]:
+    """Lista de traduções do capítulo para um idioma, do tamanho de `content`."""
+    translations = list((chapter.translated_content or {}).get(language) or [])
+    total = len(chapter.content or [])
+    return (translations + [None] * total)[:total]
+
+
+def set_paragraph_translations(chapter: Chapter, language: str, updates: Dict[int, str]) -> None:
+    """
+    Grava traduções de parágrafos no capítulo e atualiza o progresso.
+    O JSON é reatribuído (não alterado no lugar) para o SQLAlchemy detectar a mudança.
+    """
+    translations = get_paragraph_translations(chapter, language)
+    for index, text in updates.items():
+        translations[index] = text
+    translated_content = dict(chapter.translated_content or {})
+    translated_content[language] = translations
+    chapter.translated_content = translated_content
+    update_chapter_progress(chapter)
@@ -0,0 +1,205 @@
+import base64
+import contextvars
+import json
+import logging
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Chave mestra (32 bytes em base64) que cifra as chaves dos documentos confidenciais.
+# Sem ela os uploads confidenciais são recusados
+CONFIDENTIAL_MASTER_KEY = os.getenv("CONFIDENTIAL_MASTER_KEY", "")
+# Upload confidencial fica inteiro em memória: limitar o tamanho
+CONFIDENTIAL_MAX_BYTES = int(os.getenv("CONFIDENTIAL_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Textos cifrados são gravados como "enc1:" + base64(nonce + texto cifrado + tag)
+TOKEN_PREFIX = "enc1:"
+NONCE_BYTES = 12
+KEY_BYTES = 32
+# Dado associado à chave de documento cifrada (não serve para cifrar textos)
+KEY_CONTEXT = b"document-key"
+
+# Metadados sem conteúdo do documento, mantidos em claro (idioma orienta a tradução)
+PLAIN_METADATA = ('language', 'languages', 'num_pages', 'extraction_mode', 'encoding', 'size')
+
+_confidential = contextvars.ContextVar("confidential", default=False)
+
+
+class ConfidentialityError(Exception):
+    """Modo confidencial indisponível (chave mestra ou biblioteca ausente) ou texto cifrado inválido."""
+
+
+def _aead(key: bytes):
+    # Importado sob demanda: só o modo confidencial precisa da biblioteca
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError:
+        raise ConfidentialityError("O modo confidencial requer o pacote 'cryptography'")
+    return AESGCM(key)
+
+
+@lru_cache(maxsize=1)
+def _master():
+    if not CONFIDENTIAL_MASTER_KEY:
+        raise ConfidentialityError("CONFIDENTIAL_MASTER_KEY não configurada")
+    try:
+        key = base64.urlsafe_b64decode(CONFIDENTIAL_MASTER_KEY)
+    except ValueError:
+        raise ConfidentialityError("CONFIDENTIAL_MASTER_KEY não é base64 válido")
+    if len(key) != KEY_BYTES:
+        raise ConfidentialityError(f"CONFIDENTIAL_MASTER_KEY deve ter {KEY_BYTES} bytes")
+    return _aead(key)
+
+
+def _seal(aead, data: bytes, associated: Optional[bytes] = None) -> str:
+    nonce = os.urandom(NONCE_BYTES)
+    return base64.urlsafe_b64encode(nonce + aead.encrypt(nonce, data, associated)).decode('ascii')
+
+
+def _open(aead, sealed: str, associated: Optional[bytes] = None) -> bytes:
+    from cryptography.exceptions import InvalidTag
+    raw = base64.urlsafe_b64decode(sealed)
+    try:
+        return aead.decrypt(raw[:NONCE_BYTES], raw[NONCE_BYTES:], associated)
+    except InvalidTag:
+        raise ConfidentialityError("Texto cifrado inválido ou chave incorreta")
+
+
+def new_document_key() -> Tuple[bytes, str]:
+    """Chave aleatória de um documento e a mesma chave cifrada pela chave mestra (para gravar)."""
+    key = os.urandom(KEY_BYTES)
+    return key, _seal(_master(), key, KEY_CONTEXT)
+
+
+class PlainCipher:
+    """Documentos comuns: os textos são gravados e lidos sem transformação."""
+
+    confidential = False
+
+    def encrypt(self, text: Optional[str]) -> Optional[str]:
+        return text
+
+    def decrypt(self, token: Optional[str]) -> Optional[str]:
+        return token
+
+    def encrypt_list(self, texts: List[Optional[str]]) -> List[Optional[str]]:
+        return texts
+
+    def decrypt_list(self, tokens: List[Optional[str]]) -> List[Optional[str]]:
+        return tokens
+
+    def seal_metadata(self, metadata: Dict) -> Dict:
+        return metadata
+
+    def open_metadata(self, metadata: Dict) -> Dict:
+        return metadata
+
+
+class DocumentCipher(PlainCipher):
+    """
+    AES-GCM com a chave do documento. Cada texto (parágrafo, título,
+    tradução) é cifrado em separado, com nonce próprio, para que as listas
+    de parágrafos mantenham a estrutura usada no progresso e nas revisões.
+    """
+
+    confidential = True
+
+    def __init__(self, key: bytes):
+        self._aead = _aead(key)
+
+    def encrypt(self, text: Optional[str]) -> Optional[str]:
+        if text is None:
+            return None
+        return TOKEN_PREFIX + _seal(self._aead, text.encode('utf-8'))
+
+    def decrypt(self, token: Optional[str]) -> Optional[str]:
+        if token is None:
+            return None
+        if not token.startswith(TOKEN_PREFIX):
+            raise ConfidentialityError("Texto em claro num documento confidencial")
+        return _open(self._aead, token[len(TOKEN_PREFIX):]).decode('utf-8')
+
+    def encrypt_list(self, texts: List[Optional[str]]) -> List[Optional[str]]:
+        return [self.encrypt(text) for text in texts]
+
+    def decrypt_list(self, tokens: List[Optional[str]]) -> List[Optional[str]]:
+        return [self.decrypt(token) for token in tokens]
+
+    def seal_metadata(self, metadata: Dict) -> Dict:
+        """Mantém em claro só os metadados estruturais; título, autor etc. vão cifrados."""
+        plain = {key: value for key, value in metadata.items() if key in PLAIN_METADATA}
+        rest = {key: value for key, value in metadata.items() if key not in PLAIN_METADATA}
+        if rest:
+            plain['sealed'] = self.encrypt(json.dumps(rest, default=str))
+        return plain
+
+    def open_metadata(self, metadata: Dict) -> Dict:
+        metadata = dict(metadata)
+        sealed = metadata.pop('sealed', None)
+        if sealed:
+            metadata.update(json.loads(self.decrypt(sealed)))
+        return metadata
+
+
+PLAINTEXT = PlainCipher()
+
+
+def document_cipher(document) -> PlainCipher:
+    """Cifra de um documento: a chave é decifrada com a chave mestra a cada uso, nunca fica em cache."""
+    if document is None or not document.is_confidential:
+        return PLAINTEXT
+    if not document.encryption_key:
+        raise ConfidentialityError(f"Documento confidencial {document.id} sem chave")
+    return DocumentCipher(_open(_master(), document.encryption_key, KEY_CONTEXT))
+
+
+def translation_cipher(translation) -> PlainCipher:
+    """Cifra dos textos de uma Translation (a do documento, se ela for confidencial)."""
+    if not translation.is_confidential:
+        return PLAINTEXT
+    return document_cipher(translation.document)
+
+
+# ---------------------------------------------------------------------------
+# Logs
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def confidential_scope(active: bool = True):
+    """
+    Marca o contexto atual (e as tarefas e threads criadas a partir dele
+    com asyncio.gather/to_thread) como confidencial: `redact` passa a
+    omitir o texto e os logs de depuração são descartados.
+    """
+    token = _confidential.set(_confidential.get() or active)
+    try:
+        yield
+    finally:
+        _confidential.reset(token)
+
+
+def redact(text: str, limit: Optional[int] = None) -> str:
+    """Texto para log: num contexto confidencial, só o tamanho."""
+    if _confidential.get():
+        return f"<confidencial: {len(text)} caracteres>"
+    if limit is not None and len(text) > limit:
+        return text[:limit] + "..."
+    return text
+
+
+class ConfidentialLogFilter(logging.Filter):
+    """
+    Descarta registros de depuração emitidos num contexto confidencial: o
+    SDK da OpenAI e o httpx logam o corpo das requisições em DEBUG.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.INFO or not _confidential.get()
+
+
+def install_log_filter() -> None:
+    """Instala o filtro nos handlers do logger raiz (chamar depois de configurar o logging)."""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, ConfidentialLogFilter) for f in handler.filters):
+            handler.addFilter(ConfidentialLogFilter())
@@ -0,0 +1,298 @@
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+import orjson
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Cache de leitura da listagem, dos detalhes e do sumário dos documentos
+DOCUMENT_CACHE = os.getenv("DOCUMENT_CACHE", "true").lower() in ("1", "true", "yes")
+# Validade (s) no nível em processo: limita quanto tempo uma escrita feita
+# em outro processo (worker) demora a aparecer quando não há nível compartilhado
+DOCUMENT_CACHE_TTL = int(os.getenv("DOCUMENT_CACHE_TTL", "30"))
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "512"))  # entradas
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Nível compartilhado entre processos: '' (desligado), 'local' (diretório no
+# disco, para desenvolvimento e máquina única) ou 'redis'
+DOCUMENT_CACHE_BACKEND = os.getenv("DOCUMENT_CACHE_BACKEND", "")
+DOCUMENT_CACHE_SHARED_TTL = int(os.getenv("DOCUMENT_CACHE_SHARED_TTL", "600"))
+DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "document_cache"))
+
+# Espaços de chaves
+LISTING = "listing"
+DOCUMENT = "document"
+TOC = "toc"
+NAMESPACES = (LISTING, DOCUMENT, TOC)
+# Chaves da listagem: só os documentos ativos ou também os arquivados
+LISTINGS = ("active", "all")
+
+_EXPIRY = struct.Struct(">d")
+
+
+def cache_key(namespace: str, key: Any) -> str:
+    return f"documents:{namespace}:{key}"
+
+
+class SharedCacheBackend:
+    """Nível compartilhado: guarda bytes com validade, visível para a API e os workers."""
+
+    name = "none"
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class DirectoryCacheBackend(SharedCacheBackend):
+    """
+    Substituto local do cache compartilhado: um arquivo por chave num
+    diretório, com a validade no cabeçalho. Serve a processos da mesma máquina.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as file:
+                raw = file.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = _EXPIRY.unpack_from(raw)
+        if expires_at < time.time():
+            self.delete(key)
+            return None
+        return raw[_EXPIRY.size:]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        handle, temp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(handle, "wb") as file:
+            file.write(_EXPIRY.pack(time.time() + ttl))
+            file.write(value)
+        os.replace(temp_path, self._path(key))
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+class RedisCacheBackend(SharedCacheBackend):
+    name = "redis"
+
+    def __init__(self, url: str):
+        # Importado sob demanda: redis só é necessário com DOCUMENT_CACHE_BACKEND=redis
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.setex(key, ttl, value)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+
+@lru_cache(maxsize=1)
+def get_shared_backend() -> Optional[SharedCacheBackend]:
+    """Nível compartilhado configurado por DOCUMENT_CACHE_BACKEND (criado uma vez por processo)."""
+    if DOCUMENT_CACHE_BACKEND == "redis":
+        return RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    if DOCUMENT_CACHE_BACKEND == "local":
+        return DirectoryCacheBackend(DOCUMENT_CACHE_DIR)
+    return None
+
+
+class DocumentCache:
+    """
+    Cache de leitura em dois níveis para respostas de documentos, guardadas
+    já serializadas em JSON: um LRU com validade em processo e, opcionalmente,
+    um nível compartilhado. As escritas invalidam explicitamente; um contador
+    de gerações impede que uma leitura iniciada antes da invalidação grave
+    de volta um valor antigo.
+    """
+
+    def __init__(self, max_entries: int = DOCUMENT_CACHE_SIZE, max_bytes: int = DOCUMENT_CACHE_MAX_BYTES,
+                 ttl: int = DOCUMENT_CACHE_TTL, shared: Optional[SharedCacheBackend] = None,
+                 shared_ttl: int = DOCUMENT_CACHE_SHARED_TTL, enabled: bool = DOCUMENT_CACHE):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.enabled = enabled
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.local_hits: Counter = Counter()
+        self.shared_hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    def _local_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _local_set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _shared_call(self, method: str, *args):
+        # O cache nunca derruba a leitura: erro no nível compartilhado vira miss
+        try:
+            return getattr(self.shared, method)(*args)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Cache compartilhado indisponível ({method}): {str(e)}")
+            return None
+
+    def get(self, namespace: str, key: Any) -> Optional[bytes]:
+        """JSON em cache, do nível local ou do compartilhado (que realimenta o local)."""
+        if not self.enabled:
+            return None
+        full_key = cache_key(namespace, key)
+        value = self._local_get(full_key)
+        if value is not None:
+            self.local_hits[namespace] += 1
+            return value
+        if self.shared is not None:
+            value = self._shared_call("get", full_key)
+            if value is not None:
+                self.shared_hits[namespace] += 1
+                self._local_set(full_key, value)
+                return value
+        self.misses[namespace] += 1
+        return None
+
+    def set(self, namespace: str, key: Any, value: Any, generation: int) -> bytes:
+        """
+        Serializa e guarda o valor, se nada foi invalidado desde `generation`
+        (lida antes de consultar o banco). Retorna o JSON.
+        """
+        data = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        if not self.enabled or generation != self.generation:
+            return data
+        full_key = cache_key(namespace, key)
+        self._local_set(full_key, data)
+        if self.shared is not None:
+            self._shared_call("set", full_key, data, self.shared_ttl)
+        return data
+
+    def get_or_load(self, namespace: str, key: Any, loader: Callable[[], Any]) -> bytes:
+        """Leitura com carga: em caso de miss, chama `loader` e guarda o resultado."""
+        cached = self.get(namespace, key)
+        if cached is not None:
+            return cached
+        generation = self.generation
+        return self.set(namespace, key, loader(), generation)
+
+    def invalidate(self, *keys: Tuple[str, Any]) -> None:
+        """Remove as entradas (namespace, chave) dos dois níveis."""
+        full_keys = [cache_key(namespace, key) for namespace, key in keys]
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            for full_key in full_keys:
+                self._remove(full_key)
+        if self.shared is not None:
+            self._shared_call("delete", *full_keys)
+
+    def invalidate_document(self, document_id: Optional[int] = None) -> None:
+        """Depois de criar, alterar ou apagar um documento: listagem, detalhes e sumário."""
+        self.invalidate_documents([] if document_id is None else [document_id])
+
+    def invalidate_documents(self, document_ids: Iterable[int]) -> None:
+        """invalidate_document para vários documentos (operações em lote), numa só geração."""
+        keys = [(LISTING, listing) for listing in LISTINGS]
+        for document_id in document_ids:
+            keys += [(DOCUMENT, document_id), (TOC, document_id)]
+        self.invalidate(*keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {}
+            for namespace in NAMESPACES:
+                hits = self.local_hits[namespace] + self.shared_hits[namespace]
+                total = hits + self.misses[namespace]
+                namespaces[namespace] = {
+                    "local_hits": self.local_hits[namespace],
+                    "shared_hits": self.shared_hits[namespace],
+                    "misses": self.misses[namespace],
+                    "hit_rate": round(hits / total, 4) if total else 0.0,
+                }
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "shared_backend": self.shared.name if self.shared is not None else None,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "shared_errors": self.shared_errors,
+                "namespaces": namespaces,
+            }
+
+
+document_cache = DocumentCache(shared=get_shared_backend())
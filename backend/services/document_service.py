@@ -0,0 +1,117 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Document
+from services.document_cache import document_cache
+from services.storage_service import release_blobs, release_legacy_file
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Documentos por chamada às operações em lote
+BULK_MAX_DOCUMENTS = int(os.getenv("BULK_MAX_DOCUMENTS", "10000"))
+# Documentos por DELETE/UPDATE (uma transação por lote: não segura locks por muito tempo)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+
+class DeletedFiles(NamedTuple):
+    """Arquivos dos documentos removidos, liberados depois da resposta."""
+    content_hashes: Set[str]
+    legacy_paths: Set[str]
+
+
+class BulkResult(NamedTuple):
+    affected: List[int]
+    not_found: List[int]
+    files: Optional[DeletedFiles] = None
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        yield ids[start:start + BULK_CHUNK_SIZE]
+
+
+def delete_documents(db: Session, document_ids: List[int]) -> BulkResult:
+    """
+    Remove documentos com DELETE por conjunto de ids. Capítulos, traduções,
+    revisões, jobs e eventos saem pelo ON DELETE CASCADE do banco, sem
+    passar pela sessão. Os arquivos não são tocados aqui: a liberação
+    (release_deleted_files) roda depois, fora da requisição.
+    """
+    ids = list(dict.fromkeys(document_ids))
+    deleted: List[int] = []
+    files = DeletedFiles(set(), set())
+    for chunk in _chunks(ids):
+        rows = (
+            db.query(Document.id, Document.content_hash, Document.file_path)
+            .filter(Document.id.in_(chunk))
+            .all()
+        )
+        if not rows:
+            continue
+        db.execute(
+            delete(Document).where(Document.id.in_([row.id for row in rows])),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        for row in rows:
+            deleted.append(row.id)
+            if row.content_hash:
+                files.content_hashes.add(row.content_hash)
+            elif row.file_path:
+                # Confidenciais não têm arquivo (file_path vazio)
+                files.legacy_paths.add(row.file_path)
+    db.expire_all()
+    if deleted:
+        document_cache.invalidate_documents(deleted)
+        logger.info(f"{len(deleted)} documento(s) removidos em lote")
+    found = set(deleted)
+    return BulkResult(deleted, [i for i in ids if i not in found], files)
+
+
+def archive_documents(db: Session, document_ids: List[int], archived: bool = True) -> BulkResult:
+    """Arquiva (ou desarquiva) documentos com UPDATE por conjunto de ids."""
+    ids = list(dict.fromkeys(document_ids))
+    archived_at = datetime.now(timezone.utc) if archived else None
+    affected: List[int] = []
+    for chunk in _chunks(ids):
+        found = [row.id for row in db.query(Document.id).filter(Document.id.in_(chunk))]
+        if not found:
+            continue
+        db.execute(
+            update(Document).where(Document.id.in_(found)).values(archived_at=archived_at),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        affected += found
+    db.expire_all()
+    if affected:
+        document_cache.invalidate_documents(affected)
+        logger.info(f"{len(affected)} documento(s) {'arquivados' if archived else 'desarquivados'} em lote")
+    found = set(affected)
+    return BulkResult(affected, [i for i in ids if i not in found])
+
+
+def release_deleted_files(files: DeletedFiles) -> Dict:
+    """
+    Apaga os arquivos que nenhum documento restante referencia (os blobs
+    são compartilhados entre uploads iguais). Roda em segundo plano com
+    sessão própria; o que falhar fica para o GC de blobs.
+    """
+    db = SessionLocal()
+    released = legacy = 0
+    try:
+        released = release_blobs(db, files.content_hashes)
+        for path in files.legacy_paths:
+            legacy += release_legacy_file(db, path)
+    except Exception as e:
+        logger.error(f"Erro ao remover arquivos de documentos apagados: {str(e)}")
+    finally:
+        db.close()
+    return {"blobs_deleted": released, "legacy_files_deleted": legacy}
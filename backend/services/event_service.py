@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import Chapter, Document, Job, JobEvent
+from services.confidential import document_cipher
+from services.job_queue import utcnow
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Por quanto tempo (s) os eventos ficam disponíveis para retomar um stream
+EVENT_RETENTION = int(os.getenv("EVENT_RETENTION", "86400"))
+# Intervalo (s) entre consultas por eventos novos
+WS_POLL_INTERVAL = float(os.getenv("WS_POLL_INTERVAL", "0.5"))
+# Eventos lidos por consulta
+WS_BATCH_SIZE = 200
+# Cliente atrasado mais que isso recebe um snapshot em vez do histórico
+WS_MAX_LAG = int(os.getenv("WS_MAX_LAG", "5000"))
+# Com controle de fluxo (?ack=true), máximo de eventos enviados sem confirmação
+WS_WINDOW = int(os.getenv("WS_WINDOW", "500"))
+# Ids recentes relidos a cada consulta: uma transação pode gravar um id menor
+# e fazer commit depois de outra com id maior
+WS_RESCAN = 50
+
+TERMINAL_JOB_STATUSES = ("completed", "dead", "cancelled")
+
+
+def publish_event(db: Session, event_type: str, data: Dict,
+                  document_id: Optional[int] = None, job_id: Optional[int] = None) -> None:
+    """Registra um evento; o commit fica com o chamador, junto com a mudança que ele descreve."""
+    db.add(JobEvent(document_id=document_id, job_id=job_id, event_type=event_type, data=data))
+
+
+def publish_job_status(db: Session, job: Job) -> None:
+    data = {"job_type": job.job_type, "status": job.status, "attempts": job.attempts}
+    if job.status == "completed":
+        data["result"] = job.result
+    elif job.last_error and job.status in ("queued", "dead"):
+        data["error"] = job.last_error
+    publish_event(db, "job", data, document_id=job.document_id, job_id=job.id)
+
+
+def publish_chapter_progress(db: Session, chapter: Chapter, target_language: str,
+                             updates: Dict[int, str], job_id: Optional[int] = None,
+                             confidential: bool = False) -> None:
+    """
+    Um evento por parágrafo traduzido e um com o novo progresso do capítulo.
+    Eventos ficam gravados em job_events: os de documentos confidenciais
+    não levam o texto (o cliente busca o capítulo, que é decifrado na leitura).
+    """
+    for index, text in sorted(updates.items()):
+        data = {
+            "chapter_id": chapter.id,
+            "chapter_order": chapter.order,
+            "paragraph_index": index,
+            "target_language": target_language,
+        }
+        if confidential:
+            data["confidential"] = True
+        else:
+            data["translated_text"] = text
+        publish_event(db, "paragraph", data, document_id=chapter.document_id, job_id=job_id)
+    publish_event(db, "progress", {
+        "chapter_id": chapter.id,
+        "chapter_order": chapter.order,
+        "target_language": target_language,
+        "progress_percentage": chapter.progress_percentage,
+        "target_percentage": (chapter.target_progress or {}).get(target_language),
+        "translation_status": chapter.translation_status,
+    }, document_id=chapter.document_id, job_id=job_id)
+
+
+def prune_events(db: Session, document_id: Optional[int] = None,
+                 older_than: int = EVENT_RETENTION) -> int:
+    query = db.query(JobEvent).filter(JobEvent.created_at < utcnow() - timedelta(seconds=older_than))
+    if document_id is not None:
+        query = query.filter(JobEvent.document_id == document_id)
+    removed = query.delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def serialize_event(event: JobEvent) -> Dict:
+    return {"seq": event.id, "type": event.event_type, "job_id": event.job_id, **(event.data or {})}
+
+
+def coalesce(events: Iterable[JobEvent]) -> List[JobEvent]:
+    """
+    Mantém só o último evento de progresso de cada capítulo/idioma do
+    lote: para um cliente atrasado, os intermediários não têm valor.
+    Parágrafos e mudanças de status de job são sempre entregues.
+    """
+    events = list(events)
+    last_progress = {}
+    for position, event in enumerate(events):
+        if event.event_type == "progress":
+            data = event.data or {}
+            last_progress[(data.get("chapter_id"), data.get("target_language"))] = position
+    keep = set(last_progress.values())
+    return [
+        event for position, event in enumerate(events)
+        if event.event_type != "progress" or position in keep
+    ]
+
+
+class EventStream:
+    """Eventos de um documento ou de um job, lidos do banco por sequência."""
+
+    def __init__(self, document_id: Optional[int] = None, job_id: Optional[int] = None):
+        self.document_id = document_id
+        self.job_id = job_id
+
+    def _query(self, db: Session):
+        query = db.query(JobEvent)
+        if self.job_id is not None:
+            return query.filter(JobEvent.job_id == self.job_id)
+        return query.filter(JobEvent.document_id == self.document_id)
+
+    def fetch(self, after: int, limit: int = WS_BATCH_SIZE) -> List[JobEvent]:
+        db = SessionLocal()
+        try:
+            events = self._query(db).filter(JobEvent.id > after).order_by(JobEvent.id).limit(limit).all()
+            db.expunge_all()
+            return events
+        finally:
+            db.close()
+
+    def bounds(self) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            first, last = self._query(db).with_entities(func.min(JobEvent.id), func.max(JobEvent.id)).one()
+            return {"first": first or 0, "last": last or 0}
+        finally:
+            db.close()
+
+    def snapshot(self) -> Dict:
+        """Estado atual (progresso dos capítulos e jobs ativos) para quem não pode retomar."""
+        db = SessionLocal()
+        try:
+            job = db.get(Job, self.job_id) if self.job_id is not None else None
+            document_id = job.document_id if job is not None else self.document_id
+            chapters = (
+                db.query(Chapter.id, Chapter.order, Chapter.title, Chapter.progress_percentage,
+                         Chapter.translation_status)
+                .filter(Chapter.document_id == document_id)
+                .order_by(Chapter.order)
+                .all()
+            )
+            # O snapshot não é gravado em job_events: títulos de documentos confidenciais vão decifrados
+            cipher = document_cipher(db.get(Document, document_id))
+            jobs = db.query(Job).filter(Job.document_id == document_id, Job.status.in_(("queued", "running")))
+            if job is not None:
+                jobs = [job]
+            return {
+                "document_id": document_id,
+                "chapters": [
+                    {"chapter_id": id_, "chapter_order": order, "chapter_title": cipher.decrypt(title),
+                     "progress_percentage": progress, "translation_status": status}
+                    for id_, order, title, progress, status in chapters
+                ],
+                "jobs": [{"job_id": j.id, "job_type": j.job_type, "status": j.status} for j in jobs],
+            }
+        finally:
+            db.close()
+
+    def job_finished(self) -> bool:
+        db = SessionLocal()
+        try:
+            status = db.query(Job.status).filter(Job.id == self.job_id).scalar()
+            return status is None or status in TERMINAL_JOB_STATUSES
+        finally:
+            db.close()
+
+
+async def stream_events(websocket: WebSocket, stream: EventStream,
+                        after: Optional[int] = None, ack: bool = False) -> None:
+    """
+    Envia os eventos pelo WebSocket à medida que os workers os gravam.
+
+    - Cada mensagem traz `seq`; ao reconectar, o cliente passa
+      `?after=<último seq>` e recebe só o que perdeu. Sem `after`, ou se
+      os eventos já foram removidos, recebe antes um `snapshot`.
+    - Backpressure: o próximo lote só é lido depois que o anterior foi
+      enviado; eventos de progresso do lote são agrupados; cliente muito
+      atrasado recebe um snapshot e pula para o fim. Com `?ack=true`, o
+      cliente confirma com {"type": "ack", "seq": N} e o servidor não
+      passa de WS_WINDOW eventos sem confirmação.
+    - Stream de job termina com {"type": "end"} quando o job acaba.
+    """
+    await websocket.accept()
+    acked = {"seq": after or 0}
+    ack_received = asyncio.Event()
+
+    async def receive():
+        # Lê confirmações e detecta a desconexão do cliente
+        while True:
+            message = await websocket.receive_json()
+            if isinstance(message, dict) and message.get("type") == "ack":
+                acked["seq"] = max(acked["seq"], int(message.get("seq") or 0))
+                ack_received.set()
+
+    receiver = asyncio.create_task(receive())
+
+    async def send_snapshot(cursor: int, reset: bool) -> None:
+        snapshot = await run_in_threadpool(stream.snapshot)
+        await websocket.send_json({"type": "snapshot", "seq": cursor, "reset": reset, **snapshot})
+
+    try:
+        bounds = await run_in_threadpool(stream.bounds)
+        if after is None or after < bounds["first"] - 1 or bounds["last"] - after > WS_MAX_LAG:
+            cursor = bounds["last"]
+            acked["seq"] = cursor
+            await send_snapshot(cursor, reset=after is not None)
+        else:
+            cursor = after
+        # Abaixo do ponto de partida nada é relido (o cliente já tem ou recebeu o snapshot)
+        floor = cursor
+        delivered = deque(maxlen=WS_BATCH_SIZE)
+        unacked = deque()  # seqs enviados e ainda não confirmados (modo ack)
+
+        while not receiver.done():
+            while unacked and unacked[0] <= acked["seq"]:
+                unacked.popleft()
+            room = WS_WINDOW - len(unacked) if ack else WS_BATCH_SIZE
+            if room <= 0:
+                ack_received.clear()
+                waiter = asyncio.ensure_future(ack_received.wait())
+                await asyncio.wait({receiver, waiter}, timeout=WS_POLL_INTERVAL * 10,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                continue
+
+            events = await run_in_threadpool(stream.fetch, max(floor, cursor - WS_RESCAN))
+            seen = set(delivered)
+            events = [event for event in events if event.id not in seen]
+            if not events:
+                if stream.job_id is not None and await run_in_threadpool(stream.job_finished):
+                    # Última leitura: eventos gravados junto com o status final
+                    if not await run_in_threadpool(stream.fetch, cursor):
+                        await websocket.send_json({"type": "end", "seq": cursor})
+                        break
+                    continue
+                await asyncio.wait({receiver}, timeout=WS_POLL_INTERVAL)
+                continue
+
+            if len(events) >= WS_BATCH_SIZE:
+                bounds = await run_in_threadpool(stream.bounds)
+                if bounds["last"] - cursor > WS_MAX_LAG:
+                    logger.info(f"Cliente atrasado {bounds['last'] - cursor} eventos: enviando snapshot")
+                    cursor = floor = bounds["last"]
+                    delivered.clear()
+                    await send_snapshot(cursor, reset=True)
+                    continue
+
+            events = events[:room]
+            for event in coalesce(events):
+                await websocket.send_json(serialize_event(event))
+                if ack:
+                    unacked.append(event.id)
+            delivered.extend(event.id for event in events)
+            cursor = max(cursor, events[-1].id)
+    except (WebSocketDisconnect, RuntimeError):
+        # Cliente saiu no meio de um envio
+        return
+    finally:
+        disconnected = receiver.done() and not receiver.cancelled()
+        if disconnected:
+            receiver.exception()  # WebSocketDisconnect: o cliente fechou a conexão
+        else:
+            receiver.cancel()
+
+    if not disconnected:
+        await websocket.close()
@@ -0,0 +1,273 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Translation, TranslationRevision
+from services.prompt_templates import estimate_tokens
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Exemplos de post-edição incluídos por segmento (0 desliga a recuperação)
+FEW_SHOT_EXAMPLES = int(os.getenv("FEW_SHOT_EXAMPLES", "3"))
+# Tokens que os exemplos podem ocupar no prompt
+FEW_SHOT_TOKEN_BUDGET = int(os.getenv("FEW_SHOT_TOKEN_BUDGET", "800"))
+# Similaridade mínima (fração do segmento coberta pelo exemplo) para usar um exemplo
+FEW_SHOT_MIN_SCORE = float(os.getenv("FEW_SHOT_MIN_SCORE", "0.3"))
+# Intervalo (s) para buscar no banco revisões novas (feitas em outro processo)
+EXAMPLE_REFRESH_SECONDS = int(os.getenv("EXAMPLE_REFRESH_SECONDS", "60"))
+# Ids recentes relidos a cada atualização: uma transação pode gravar uma revisão
+# com id menor e fazer commit depois de outra com id maior
+EXAMPLE_RESCAN = 50
+# Exemplos maiores que isso não cabem como few-shot e não são indexados
+EXAMPLE_MAX_CHARS = 2000
+# Características mais raras do segmento usadas para achar candidatos
+QUERY_FEATURES = 32
+# Máximo de ocorrências percorridas por busca (termos comuns ficam de fora)
+MAX_SCAN = 10000
+# Candidatos reavaliados com a similaridade ponderada, por exemplo pedido
+CANDIDATES_PER_RESULT = 8
+# Prefixo da palavra usado como radical (cobre flexões sem depender de idioma)
+STEM_CHARS = 6
+
+LATENCY_WINDOW = 1000
+
+_WORD = re.compile(r'[^\W\d_]+')
+
+
+class Example(NamedTuple):
+    revision_id: int
+    translation_id: int
+    source: str
+    target: str
+    features: int
+
+
+def features(text: str) -> set:
+    """Radicais das palavras e pares de radicais vizinhos."""
+    stems = [word[:STEM_CHARS] for word in _WORD.findall(text.lower())]
+    return set(stems) | {f"{a} {b}" for a, b in zip(stems, stems[1:])}
+
+
+class ExampleIndex:
+    """
+    Índice invertido das post-edições aceitas de um perfil e par de
+    idiomas. A busca percorre só as listas das características mais raras
+    do segmento e pontua pela fração do segmento coberta pelo exemplo.
+    """
+
+    def __init__(self):
+        self.examples: List[Optional[Example]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.by_translation: Dict[int, int] = {}
+        # Última revisão vista de cada tradução: releituras e revisões antigas são ignoradas
+        self.latest_revision: Dict[int, int] = {}
+        # Marca d'água das leituras do banco; só _refresh a move
+        self.max_revision_id = 0
+        self.refreshed_at = 0.0
+        self.live = 0
+
+    def add(self, revision_id: int, translation_id: int, source: str, target: str) -> bool:
+        """Indexa uma revisão; False se ela já foi vista ou é mais antiga que a indexada."""
+        if revision_id <= self.latest_revision.get(translation_id, 0):
+            return False
+        self.latest_revision[translation_id] = revision_id
+        previous = self.by_translation.pop(translation_id, None)
+        if previous is not None:
+            # Nova revisão da mesma tradução substitui a anterior
+            self.examples[previous] = None
+            self.live -= 1
+        if len(source) > EXAMPLE_MAX_CHARS or len(target) > EXAMPLE_MAX_CHARS or not source.strip():
+            return True
+        feats = features(source)
+        slot = len(self.examples)
+        self.examples.append(Example(revision_id, translation_id, source, target, len(feats)))
+        self.by_translation[translation_id] = slot
+        self.live += 1
+        for feature in feats:
+            self.postings.setdefault(feature, []).append(slot)
+        return True
+
+    def search(self, text: str, k: int, min_score: float) -> List[Tuple[float, Example]]:
+        if not self.live:
+            return []
+        query = features(text)
+        known = sorted((len(self.postings[f]), f) for f in query if f in self.postings)
+        if not known:
+            return []
+
+        # Candidatos: exemplos que compartilham as características mais raras,
+        # contados em C (Counter.update) sem percorrer listas de termos comuns
+        counts: Counter = Counter()
+        scanned = 0
+        for df, feature in known[:QUERY_FEATURES]:
+            if scanned + df > MAX_SCAN:
+                break
+            counts.update(self.postings[feature])
+            scanned += df
+
+        # Reavaliação: fração do segmento (ponderada por raridade) coberta pelo exemplo
+        total = len(self.examples)
+        weights = {f: math.log(1 + total / df) for df, f in known}
+        # Características que nenhum exemplo tem pesam como as mais raras
+        unseen = math.log(1 + total)
+        query_weight = sum(weights.get(f, unseen) for f in query)
+        results = []
+        for slot, _ in counts.most_common(k * CANDIDATES_PER_RESULT):
+            example = self.examples[slot]
+            if example is None:
+                continue
+            shared = query & features(example.source)
+            size = min(len(query), example.features) / max(len(query), example.features)
+            similarity = sum(weights[f] for f in shared) / query_weight * math.sqrt(size)
+            if similarity >= min_score:
+                results.append((similarity, example))
+        results.sort(key=lambda item: -item[0])
+        return results[:k]
+
+
+class ExampleStore:
+    """Índices por (perfil, origem, destino), carregados sob demanda e atualizados incrementalmente."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[int, str, str], ExampleIndex] = {}
+        # Uma carga por índice de cada vez; as dos outros pares seguem em paralelo
+        self._loading: Dict[Tuple[int, str, str], threading.Lock] = {}
+        self.retrievals = 0
+        self.with_examples = 0
+        self.examples_used = 0
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def _fetch(self, db: Session, key: Tuple[int, str, str], after: int) -> List[Tuple[int, int, str, str]]:
+        profile_id, source_language, target_language = key
+        return (
+            db.query(TranslationRevision.id, TranslationRevision.translation_id,
+                     Translation.original_text, TranslationRevision.revised_text)
+            .join(Translation, Translation.id == TranslationRevision.translation_id)
+            .filter(
+                Translation.translator_profile_id == profile_id,
+                Translation.source_language == source_language,
+                Translation.target_language == target_language,
+                TranslationRevision.accepted_changes.is_(True),
+                Translation.is_confidential.isnot(True),
+                TranslationRevision.id > after,
+            )
+            .order_by(TranslationRevision.id)
+            .all()
+        )
+
+    @staticmethod
+    def _apply(index: ExampleIndex, rows: List[Tuple[int, int, str, str]]) -> int:
+        """Indexa as linhas lidas e avança a marca d'água; retorna quantas eram novas."""
+        added = 0
+        for revision_id, translation_id, source, target in rows:
+            added += index.add(revision_id, translation_id, source, target)
+            index.max_revision_id = max(index.max_revision_id, revision_id)
+        index.refreshed_at = time.monotonic()
+        return added
+
+    def _index(self, db: Session, key: Tuple[int, str, str]) -> ExampleIndex:
+        """
+        Índice do par, carregado ou atualizado se passou do intervalo. As
+        consultas ao banco rodam fora do lock global: a primeira carga de
+        um perfil grande não trava a busca dos outros perfis.
+        """
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and time.monotonic() - index.refreshed_at < EXAMPLE_REFRESH_SECONDS:
+                return index
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is not None and time.monotonic() - index.refreshed_at < EXAMPLE_REFRESH_SECONDS:
+                    # Outra thread acabou de carregar
+                    return index
+            if index is None:
+                # Primeira carga: montada fora do lock e publicada pronta
+                fresh = ExampleIndex()
+                added = self._apply(fresh, self._fetch(db, key, 0))
+                with self._lock:
+                    index = self._indexes.setdefault(key, fresh)
+            else:
+                rows = self._fetch(db, key, max(0, index.max_revision_id - EXAMPLE_RESCAN))
+                with self._lock:
+                    added = self._apply(index, rows)
+        if added:
+            profile_id, source_language, target_language = key
+            logger.info(f"Exemplos do perfil {profile_id} ({source_language}-{target_language}): "
+                        f"{added} novos, {index.live} no índice")
+        return index
+
+    def add_revision(self, revision: TranslationRevision, translation: Translation) -> None:
+        """Torna uma post-edição aceita disponível já, se o índice do par estiver carregado."""
+        if (not revision.accepted_changes or translation.translator_profile_id is None
+                or translation.is_confidential):
+            return
+        key = (translation.translator_profile_id, translation.source_language, translation.target_language)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                index.add(revision.id, translation.id, translation.original_text, revision.revised_text)
+
+    def retrieve(self, db: Session, profile_id: int, source_language: str, target_language: str,
+                 text: str, k: int = FEW_SHOT_EXAMPLES,
+                 token_budget: int = FEW_SHOT_TOKEN_BUDGET) -> List[Tuple[str, str]]:
+        """
+        As k post-edições aceitas mais parecidas com o segmento, do mesmo
+        perfil e par de idiomas, como pares (origem, revisada), dentro do
+        orçamento de tokens. O próprio segmento não é usado como exemplo.
+        """
+        if k <= 0:
+            return []
+        started = time.perf_counter()
+        index = self._index(db, (profile_id, source_language, target_language))
+        with self._lock:
+            found = index.search(text, k + 1, FEW_SHOT_MIN_SCORE)
+
+        examples, spent = [], 0
+        for _, example in found:
+            if example.source == text:
+                continue
+            tokens = estimate_tokens(example.source) + estimate_tokens(example.target)
+            if spent + tokens > token_budget:
+                continue
+            examples.append((example.source, example.target))
+            spent += tokens
+            if len(examples) == k:
+                break
+
+        with self._lock:
+            self.retrievals += 1
+            self.with_examples += bool(examples)
+            self.examples_used += len(examples)
+            self.latencies.append(time.perf_counter() - started)
+        return examples
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "enabled": FEW_SHOT_EXAMPLES > 0,
+                "k": FEW_SHOT_EXAMPLES,
+                "token_budget": FEW_SHOT_TOKEN_BUDGET,
+                "indexes": len(self._indexes),
+                "indexed_examples": sum(index.live for index in self._indexes.values()),
+                "retrievals": self.retrievals,
+                "with_examples": self.with_examples,
+                "examples_used": self.examples_used,
+                "latency_avg_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "latency_p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else 0.0,
+            }
+
+
+example_store = ExampleStore()
@@ -0,0 +1,489 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from document_exporter import DOCX_MIME_TYPE
+from document_processor import DocumentProcessor
+from docx_roundtrip import EXPORT_DIR, translate_docx
+from models import Chapter, Document, Job, Translation
+from services.chapter_service import build_chapters, get_paragraph_translations, set_paragraph_translations
+from services.confidential import PlainCipher, confidential_scope, document_cipher
+from services.document_cache import document_cache
+from services.event_service import publish_chapter_progress
+from services.language_detector import (
+    AUTO, LANGUAGE_PASSTHROUGH, analyze_segment, analyze_targets, annotate_document_language, language_metrics,
+    resolve_source_language
+)
+from services.openai_service import TRANSLATION_CONCURRENCY, dominant_model, translate_text
+from services.paragraph_dedup import (
+    PARAGRAPH_DEDUP, Occurrences, dedup_metrics, dedup_stats, ensure_paragraph_index, fan_out, lock_translations,
+    processed_hashes, shared_hashes
+)
+from services.prompt_templates import load_profile_spec, profile_glossary, resolve_options
+from services.quality_estimator import estimate_quality
+from services.revision_service import carry_over_translations
+from services.storage_service import document_file_path
+from services.translation_cache import cache_key, lookup_translation_memory_batch, translation_cache
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+async def handle_parse_document(db: Session, job: Job) -> Dict:
+    """Processa o arquivo de um documento e grava seus capítulos."""
+    payload = job.payload or {}
+    document = db.get(Document, payload["document_id"])
+    if document is None:
+        return {"skipped": "Documento não encontrado"}
+    if document.is_confidential:
+        # O original de um documento confidencial não é guardado: só o upload o processa
+        raise ValueError(f"Documento {document.id} é confidencial e não pode ser reprocessado")
+
+    # Parsing é CPU-bound: rodar fora do loop de eventos
+    loop = asyncio.get_event_loop()
+    processed_data = await loop.run_in_executor(
+        None, DocumentProcessor().process_document, document_file_path(document), document.mime_type
+    )
+
+    # Idioma predominante: origem padrão das traduções e regras de segmentação
+    metadata = annotate_document_language(processed_data)
+
+    # Reprocessamento (nova tentativa) substitui os capítulos anteriores
+    for chapter in list(document.chapters):
+        db.delete(chapter)
+    db.flush()
+
+    chapters = build_chapters(document, processed_data)
+    revision_summary = None
+    previous_document_id = payload.get("previous_document_id")
+    if previous_document_id:
+        previous_document = db.get(Document, previous_document_id)
+        if previous_document is not None:
+            revision_summary = carry_over_translations(previous_document.chapters, chapters)
+
+    # Repetição dentro do documento e em relação ao acervo (antes de gravar os hashes deste)
+    deduplication = dedup_stats(db, processed_hashes(processed_data), document.id)
+
+    document.num_chapters = len(chapters)
+    document.total_paragraphs = sum(len(chapter.content) for chapter in chapters)
+    document.document_metadata = dict(metadata, deduplication=deduplication)
+    db.add_all(chapters)
+    db.commit()
+    # Só alcança o nível compartilhado e o cache deste processo; na API o
+    # nível local expira em DOCUMENT_CACHE_TTL
+    document_cache.invalidate_document(document.id)
+
+    return {
+        "num_chapters": document.num_chapters,
+        "total_paragraphs": document.total_paragraphs,
+        "revision": revision_summary,
+        "language": metadata.get("language"),
+        "deduplication": deduplication,
+    }
+
+
+async def handle_translate_chapter(db: Session, job: Job) -> Dict:
+    """
+    Traduz os parágrafos pendentes de um capítulo, gravando o progresso
+    a cada lote para que uma nova tentativa continue de onde parou.
+    """
+    payload = job.payload or {}
+    chapter = db.get(Chapter, payload["chapter_id"])
+    if chapter is None:
+        return {"skipped": "Capítulo não encontrado"}
+
+    # Documento confidencial: textos decifrados só em memória, logs sem texto
+    cipher = document_cipher(chapter.document)
+    with confidential_scope(cipher.confidential):
+        return await _translate_chapter(db, job, chapter, cipher)
+
+
+async def _translate_chapter(db: Session, job: Job, chapter: Chapter, cipher: PlainCipher) -> Dict:
+    payload = job.payload or {}
+    target_language = payload["target_language"]
+    # Sem idioma de origem, cada parágrafo usa o detectado (trechos citados em
+    # outro idioma) e, se a detecção não for conclusiva, o do documento
+    source_language = payload.get("source_language")
+    document_language = (chapter.document.document_metadata or {}).get("language")
+    profile = load_profile_spec(db, payload.get("translator_profile_id"))
+    formality, style = resolve_options(profile, payload.get("formality_level"), payload.get("style"))
+    granularity = payload.get("granularity") or "paragraph"
+
+    paragraphs = cipher.decrypt_list(chapter.content or [])
+    translations = get_paragraph_translations(chapter, target_language)
+    start = payload.get("start_paragraph") or 0
+    end = payload.get("end_paragraph")
+    end = len(paragraphs) if end is None else min(end, len(paragraphs))
+    # Parágrafos repetidos viram uma tarefa só (o representante de cada conteúdo)
+    occurrences = Occurrences(paragraphs, (
+        index for index in range(start, end)
+        if payload.get("force") or translations[index] is None
+    ))
+    pending = occurrences.representatives
+    dedup_metrics.record_collapsed(occurrences.collapsed)
+    shared = _shared_hashes(db, chapter, cipher, paragraphs)
+
+    # Parágrafos já no idioma de destino, números e código são copiados sem chamar a API
+    passthrough: Dict[int, str] = {}
+    sources: Dict[int, str] = {}
+    for index in pending:
+        if LANGUAGE_PASSTHROUGH:
+            analysis = analyze_segment(paragraphs[index], target_language)
+            language_metrics.record(paragraphs[index], analysis)
+            if analysis.passthrough:
+                passthrough[index] = paragraphs[index]
+                continue
+        sources[index] = resolve_source_language(paragraphs[index], source_language, document_language) or AUTO
+    passthrough = occurrences.expand(passthrough)
+    if passthrough:
+        set_paragraph_translations(chapter, target_language, _encrypt_values(cipher, passthrough))
+        publish_chapter_progress(db, chapter, target_language, passthrough, job.id, cipher.confidential)
+        db.commit()
+    pending = [index for index in pending if index in sources]
+
+    translated = 0
+    fanned_out = 0
+    cancelled = False
+    for batch_start in range(0, len(pending), TRANSLATION_CONCURRENCY):
+        # Tradução antecipada: parar se o leitor saiu do documento
+        if payload.get("prefetch") and batch_start:
+            db.refresh(job)
+            if job.status == "cancelled":
+                cancelled = True
+                break
+        batch = pending[batch_start:batch_start + TRANSLATION_CONCURRENCY]
+        if shared and not payload.get("force"):
+            # Outro capítulo pode já ter traduzido e copiado para cá um parágrafo repetido
+            db.refresh(chapter, ["translated_content"])
+            current = get_paragraph_translations(chapter, target_language)
+            batch = [index for index in batch if any(current[i] is None for i in occurrences.group_of(index))]
+            if not batch:
+                continue
+        usage = {index: Counter() for index in batch}
+        results = await asyncio.gather(*(
+            translate_text(
+                text=paragraphs[index],
+                source_language=sources[index],
+                target_language=target_language,
+                formality=formality,
+                style=style,
+                granularity=granularity,
+                db=db,
+                profile=profile,
+                language_check=False,
+                model_usage=usage[index],
+                confidential=cipher.confidential
+            )
+            for index in batch
+        ))
+        updates = dict(zip(batch, results))
+        if shared:
+            lock_translations(db, chapter)
+        written = occurrences.expand(updates)
+        set_paragraph_translations(chapter, target_language, _encrypt_values(cipher, written))
+        publish_chapter_progress(db, chapter, target_language, written, job.id, cipher.confidential)
+        # Uma linha na memória de tradução por conteúdo, não por ocorrência
+        db.add_all(_translation_rows(
+            chapter, cipher, paragraphs, sources, target_language, updates, usage, profile, formality, style
+        ))
+        db.commit()
+        translated += len(written)
+        fanned_out += _fan_out(db, chapter, target_language, occurrences, updates, shared, job.id)
+
+    logger.info(
+        f"Capítulo {chapter.id}: {translated} parágrafos traduzidos para {target_language} "
+        f"({occurrences.collapsed} repetidos), {len(passthrough)} mantidos sem tradução"
+    )
+    return {
+        "chapter_id": chapter.id,
+        "target_language": target_language,
+        "translated_paragraphs": translated,
+        "passthrough_paragraphs": len(passthrough),
+        "skipped_paragraphs": (end - start) - translated - len(passthrough),
+        "deduplicated_paragraphs": occurrences.collapsed,
+        "fanned_out_paragraphs": fanned_out,
+        "progress_percentage": chapter.progress_percentage,
+        "cancelled": cancelled,
+    }
+
+
+async def handle_translate_docx(db: Session, job: Job) -> Dict:
+    """Gera uma cópia traduzida do DOCX original preservando o layout."""
+    payload = job.payload or {}
+    document = db.get(Document, payload["document_id"])
+    if document is None:
+        return {"skipped": "Documento não encontrado"}
+    if document.mime_type != DOCX_MIME_TYPE:
+        raise ValueError(f"Documento {document.id} não é um DOCX")
+    if document.is_confidential:
+        raise ValueError(f"Documento {document.id} é confidencial: o DOCX original não é guardado")
+
+    target_language = payload["target_language"]
+    output_path = os.path.join(EXPORT_DIR, f"{document.id}_{job.id}_{target_language}.docx")
+    profile = load_profile_spec(db, payload.get("translator_profile_id"))
+    document_language = (document.document_metadata or {}).get("language")
+
+    async def translate(text: str) -> str:
+        return await translate_text(
+            text=text,
+            source_language=payload.get("source_language"),
+            target_language=target_language,
+            formality=payload.get("formality_level"),
+            style=payload.get("style"),
+            db=db,
+            profile=profile,
+            source_hint=document_language
+        )
+
+    return await translate_docx(document_file_path(document), output_path, translate, TRANSLATION_CONCURRENCY)
+
+
+async def handle_translate_chapter_multi(db: Session, job: Job) -> Dict:
+    """
+    Traduz um capítulo para vários idiomas de destino num só job: os
+    parágrafos são decifrados, analisados e têm a origem resolvida uma vez,
+    a memória de tradução é consultada em lote para todos os destinos e
+    todas as chamadas à API dividem o mesmo limite de concorrência.
+    """
+    payload = job.payload or {}
+    chapter = db.get(Chapter, payload["chapter_id"])
+    if chapter is None:
+        return {"skipped": "Capítulo não encontrado"}
+
+    cipher = document_cipher(chapter.document)
+    with confidential_scope(cipher.confidential):
+        return await _translate_chapter_multi(db, job, chapter, cipher)
+
+
+async def _translate_chapter_multi(db: Session, job: Job, chapter: Chapter, cipher: PlainCipher) -> Dict:
+    payload = job.payload or {}
+    targets = list(dict.fromkeys(payload["target_languages"]))
+    # Idioma intermediário: origem -> pivô uma vez por parágrafo, pivô -> cada destino
+    pivot_language = payload.get("pivot_language")
+    source_language = payload.get("source_language")
+    document_language = (chapter.document.document_metadata or {}).get("language")
+    profile = load_profile_spec(db, payload.get("translator_profile_id"))
+    formality, style = resolve_options(profile, payload.get("formality_level"), payload.get("style"))
+    granularity = payload.get("granularity") or "paragraph"
+
+    paragraphs = cipher.decrypt_list(chapter.content or [])
+    start = payload.get("start_paragraph") or 0
+    end = payload.get("end_paragraph")
+    end = len(paragraphs) if end is None else min(end, len(paragraphs))
+    # Parágrafos pendentes de cada destino (um destino pode já estar adiantado)
+    requested: Dict[str, set] = {}
+    for target in targets:
+        translations = get_paragraph_translations(chapter, target)
+        requested[target] = {
+            index for index in range(start, end)
+            if payload.get("force") or translations[index] is None
+        }
+    # Parágrafos repetidos: só o representante de cada conteúdo é analisado e traduzido
+    occurrences = Occurrences(paragraphs, sorted(set().union(*requested.values())))
+    pending: Dict[str, set] = {
+        target: {
+            representative for representative in occurrences.representatives
+            if any(index in requested[target] for index in occurrences.group_of(representative))
+        }
+        for target in targets
+    }
+    dedup_metrics.record_collapsed(occurrences.collapsed)
+    shared = _shared_hashes(db, chapter, cipher, paragraphs)
+
+    # Detecção de idioma uma vez por parágrafo, decidida para todos os destinos
+    passthrough: Dict[str, Dict[int, str]] = {target: {} for target in targets}
+    sources: Dict[int, str] = {}
+    for index in sorted(set().union(*pending.values())):
+        needed = [target for target in targets if index in pending[target]]
+        if LANGUAGE_PASSTHROUGH:
+            for target, analysis in analyze_targets(paragraphs[index], needed).items():
+                language_metrics.record(paragraphs[index], analysis)
+                if analysis.passthrough:
+                    passthrough[target][index] = paragraphs[index]
+                    pending[target].discard(index)
+        if any(index in pending[target] for target in needed):
+            sources[index] = resolve_source_language(paragraphs[index], source_language, document_language) or AUTO
+    for target in targets:
+        passthrough[target] = occurrences.expand(passthrough[target], requested[target])
+        if passthrough[target]:
+            set_paragraph_translations(chapter, target, _encrypt_values(cipher, passthrough[target]))
+            publish_chapter_progress(db, chapter, target, passthrough[target], job.id, cipher.confidential)
+    if any(passthrough.values()):
+        db.commit()
+
+    def pivots(index: int) -> bool:
+        return bool(pivot_language) and sources[index] not in (AUTO, pivot_language)
+
+    # Memória de tradução dos parágrafos originais para todos os destinos numa
+    # consulta por lote; os acertos entram no cache e a consulta por segmento
+    # é dispensada (o segundo salto do pivô ainda consulta, o texto só existe agora)
+    memory_checked = False
+    if granularity == "paragraph" and not cipher.confidential and sources:
+        remembered = lookup_translation_memory_batch(
+            db, [paragraphs[index] for index in sources], set(sources.values()),
+            set(targets) | ({pivot_language} if pivot_language else set()), formality, style,
+            profile.profile_id if profile else None
+        )
+        fingerprint = profile.fingerprint if profile else None
+        for (text, source, target), translated_text in remembered.items():
+            translation_cache.set(cache_key(text, source, target, formality, style, fingerprint), translated_text)
+        memory_checked = True
+
+    semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+
+    async def translate(text: str, source: str, target: str, usage: Counter, check_memory: bool = True) -> str:
+        async with semaphore:
+            return await translate_text(
+                text=text,
+                source_language=source,
+                target_language=target,
+                formality=formality,
+                style=style,
+                granularity=granularity,
+                db=db,
+                profile=profile,
+                language_check=False,
+                model_usage=usage,
+                confidential=cipher.confidential,
+                check_memory=check_memory
+            )
+
+    async def translate_paragraph(index: int) -> Dict[str, Tuple[str, Counter]]:
+        wanted = [target for target in targets if index in pending[target]]
+        if not pivots(index):
+            usages = [Counter() for _ in wanted]
+            texts = await asyncio.gather(*(
+                translate(paragraphs[index], sources[index], target, usage, not memory_checked)
+                for target, usage in zip(wanted, usages)
+            ))
+            return dict(zip(wanted, zip(texts, usages)))
+
+        pivot_usage = Counter()
+        pivot_text = await translate(paragraphs[index], sources[index], pivot_language, pivot_usage,
+                                     not memory_checked)
+        hops = [target for target in wanted if target != pivot_language]
+        usages = [pivot_usage + Counter() for _ in hops]
+        texts = await asyncio.gather(*(
+            translate(pivot_text, pivot_language, target, usage) for target, usage in zip(hops, usages)
+        ))
+        results = dict(zip(hops, zip(texts, usages)))
+        if pivot_language in wanted:
+            results[pivot_language] = (pivot_text, pivot_usage)
+        return results
+
+    order = sorted(sources)
+    translated: Counter = Counter()
+    fanned_out = 0
+    for batch_start in range(0, len(order), TRANSLATION_CONCURRENCY):
+        batch = order[batch_start:batch_start + TRANSLATION_CONCURRENCY]
+        results = await asyncio.gather(*(translate_paragraph(index) for index in batch))
+        if shared:
+            lock_translations(db, chapter)
+        batch_updates = {}
+        for target in targets:
+            updates = {index: result[target][0] for index, result in zip(batch, results) if target in result}
+            if not updates:
+                continue
+            usage = {index: result[target][1] for index, result in zip(batch, results) if target in result}
+            written = occurrences.expand(updates, requested[target])
+            set_paragraph_translations(chapter, target, _encrypt_values(cipher, written))
+            publish_chapter_progress(db, chapter, target, written, job.id, cipher.confidential)
+            db.add_all(_translation_rows(
+                chapter, cipher, paragraphs, sources, target, updates, usage, profile, formality, style,
+                pivot_language=pivot_language if pivot_language != target else None
+            ))
+            translated[target] += len(written)
+            batch_updates[target] = updates
+        db.commit()
+        for target, updates in batch_updates.items():
+            fanned_out += _fan_out(db, chapter, target, occurrences, updates, shared, job.id)
+
+    logger.info(
+        f"Capítulo {chapter.id}: traduzido para {', '.join(targets)}"
+        f"{f' via {pivot_language}' if pivot_language else ''} "
+        f"({sum(translated.values())} parágrafos, {sum(len(p) for p in passthrough.values())} mantidos)"
+    )
+    return {
+        "chapter_id": chapter.id,
+        "target_languages": targets,
+        "pivot_language": pivot_language,
+        "targets": {
+            target: {
+                "translated_paragraphs": translated[target],
+                "passthrough_paragraphs": len(passthrough[target]),
+                "progress_percentage": (chapter.target_progress or {}).get(target, 0.0),
+            }
+            for target in targets
+        },
+        "progress_percentage": chapter.progress_percentage,
+        "memory_batched": memory_checked,
+        "deduplicated_paragraphs": occurrences.collapsed,
+        "fanned_out_paragraphs": fanned_out,
+    }
+
+
+def _translation_rows(chapter: Chapter, cipher: PlainCipher, paragraphs: List[str], sources: Dict[int, str],
+                      target_language: str, updates: Dict[int, str], usage: Dict[int, Counter],
+                      profile, formality: Optional[str], style: Optional[str],
+                      pivot_language: Optional[str] = None) -> List[Translation]:
+    """Linhas da memória de tradução para os parágrafos traduzidos de um capítulo."""
+    rows = []
+    for index, text in updates.items():
+        # Tradução via pivô: origem registrada é a do parágrafo, não a do pivô
+        pivoted = pivot_language is not None and sources[index] not in (AUTO, pivot_language)
+        rows.append(Translation(
+            original_text=cipher.encrypt(paragraphs[index]),
+            translated_text=cipher.encrypt(text),
+            source_language=sources[index],
+            target_language=target_language,
+            formality_level=formality,
+            style=style,
+            translator_profile_id=profile.profile_id if profile else None,
+            document_id=chapter.document_id,
+            chapter_id=chapter.id,
+            model_used=dominant_model(usage[index]),
+            is_confidential=cipher.confidential,
+            security_level="confidential" if cipher.confidential else "normal",
+            learning_flags={"pivot_language": pivot_language} if pivoted else None,
+            **estimate_quality(
+                paragraphs[index], text, sources[index], target_language,
+                profile_glossary(profile, sources[index], target_language, style)
+            ).translation_fields(),
+        ))
+    return rows
+
+
+def _shared_hashes(db: Session, chapter: Chapter, cipher: PlainCipher, paragraphs: List[str]) -> set:
+    """Conteúdos deste capítulo repetidos em outros capítulos (confidenciais não têm índice)."""
+    if cipher.confidential or not PARAGRAPH_DEDUP:
+        return set()
+    ensure_paragraph_index(db, chapter, paragraphs)
+    return shared_hashes(db, chapter)
+
+
+def _fan_out(db: Session, chapter: Chapter, target_language: str, occurrences: Occurrences,
+             updates: Dict[int, str], shared: set, job_id: int) -> int:
+    """Copia as traduções de conteúdos repetidos para os outros capítulos do documento."""
+    if not shared:
+        return 0
+    translations = {
+        content_hash: text for content_hash, text in occurrences.by_hash(updates).items() if content_hash in shared
+    }
+    return fan_out(db, chapter, target_language, translations, job_id)
+
+
+def _encrypt_values(cipher: PlainCipher, updates: Dict[int, str]) -> Dict[int, str]:
+    return {index: cipher.encrypt(text) for index, text in updates.items()}
+
+
+# Tipos de job conhecidos pelo worker
+HANDLERS = {
+    "parse_document": handle_parse_document,
+    "translate_chapter": handle_translate_chapter,
+    "translate_chapter_multi": handle_translate_chapter_multi,
+    "translate_docx": handle_translate_docx,
+}
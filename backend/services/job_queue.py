@@ -0,0 +1,302 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.orm import Session
+
+from models import Job
+from services.tenant_scheduler import Tenant
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Tempo (s) que um job fica reservado para um worker sem heartbeat
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+# Tentativas antes de mover o job para a fila de mortos (dead letter)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Base do backoff exponencial entre tentativas (s)
+JOB_RETRY_BACKOFF = int(os.getenv("JOB_RETRY_BACKOFF", "10"))
+
+# Prioridades usuais (menor valor = executa antes)
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 100
+PRIORITY_LOW = 1000
+
+# Custo (tokens estimados) de um job sem estimativa, para o escalonamento justo
+DEFAULT_JOB_COST = 1000
+PENDING = ("queued", "running")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_job(
+    db: Session,
+    job_type: str,
+    payload: Dict,
+    document_id: Optional[int] = None,
+    priority: int = PRIORITY_NORMAL,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    commit: bool = True,
+    tenant: Optional[Tenant] = None,
+    fair_order: Optional[float] = None
+) -> Job:
+    """
+    Coloca um job na fila persistente. `fair_order` vem de fair_orders
+    (ao enfileirar vários jobs na mesma transação); sem ele, é calculado
+    para um job de custo padrão.
+    """
+    if fair_order is None:
+        fair_order = fair_orders(db, tenant, [DEFAULT_JOB_COST])[0]
+    job = Job(
+        job_type=job_type,
+        payload=payload,
+        document_id=document_id,
+        priority=priority,
+        tenant=_tenant_key(tenant),
+        fair_order=fair_order,
+        max_attempts=max_attempts,
+        status="queued",
+        attempts=0,
+        available_at=utcnow(),
+    )
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Job {job.id} ({job_type}) enfileirado")
+    return job
+
+
+def translation_cost(characters: int, targets: int = 1) -> float:
+    """Tokens estimados (entrada + saída, ~4 caracteres por token) para traduzir `characters`."""
+    return max(1, characters // 2) * targets
+
+
+def _tenant_key(tenant: Optional[Tenant]) -> Optional[str]:
+    return tenant.key if tenant is not None and tenant.profile_id is not None else None
+
+
+def fair_orders(db: Session, tenant: Optional[Tenant], costs: List[float]) -> List[float]:
+    """
+    Tags de término (fila justa ponderada) para os próximos jobs do cliente:
+    cada job termina `custo / peso` depois do anterior do mesmo cliente, a
+    partir do tempo virtual (menor tag pendente). Um livro de 1000 capítulos
+    ocupa tags altas; o job de outro cliente entra perto do tempo virtual e
+    é reservado antes, na mesma prioridade.
+    """
+    tenant_key = _tenant_key(tenant)
+    virtual_time = db.query(func.min(Job.fair_order)).filter(Job.status.in_(PENDING)).scalar() or 0.0
+    last = (
+        db.query(func.max(Job.fair_order))
+        .filter(Job.status.in_(PENDING), Job.tenant.is_(None) if tenant_key is None else Job.tenant == tenant_key)
+        .scalar()
+    )
+    weight = max(1, tenant.weight) if tenant is not None else 1
+    finish = max(virtual_time, last or 0.0)
+    orders = []
+    for cost in costs:
+        finish += cost / weight
+        orders.append(finish)
+    return orders
+
+
+def _claimable(now: datetime):
+    """Jobs prontos para execução ou reservados por um worker que sumiu."""
+    return or_(
+        and_(Job.status == "queued", Job.available_at <= now),
+        and_(Job.status == "running", Job.locked_until < now),
+    )
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    job_types: Optional[Iterable[str]] = None,
+    visibility_timeout: int = JOB_VISIBILITY_TIMEOUT
+) -> Optional[Job]:
+    """
+    Reserva o próximo job disponível para este worker.
+
+    No PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED, então vários
+    workers (em processos ou máquinas diferentes) não disputam a mesma
+    linha. No SQLite, que serializa as escritas, a reserva é um UPDATE
+    condicional: só um worker consegue trocar o status da linha.
+    """
+    now = utcnow()
+    query = db.query(Job).filter(_claimable(now))
+    if job_types:
+        query = query.filter(Job.job_type.in_(list(job_types)))
+    query = query.order_by(Job.priority, Job.fair_order, Job.id)
+
+    if db.get_bind().dialect.name == "postgresql":
+        job = query.with_for_update(skip_locked=True).first()
+        if job is None:
+            db.rollback()
+            return None
+        if job.status == "running" and job.attempts >= job.max_attempts:
+            _dead_letter(db, job, "Timeout de visibilidade excedido na última tentativa")
+            return claim_job(db, worker_id, job_types, visibility_timeout)
+        job.status = "running"
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=visibility_timeout)
+        job.attempts += 1
+        db.commit()
+        return job
+
+    # SQLite e demais bancos: reserva otimista com UPDATE condicional
+    for candidate_id, status, attempts, max_attempts in query.with_entities(
+        Job.id, Job.status, Job.attempts, Job.max_attempts
+    ).limit(10).all():
+        if status == "running" and attempts >= max_attempts:
+            job = db.get(Job, candidate_id)
+            _dead_letter(db, job, "Timeout de visibilidade excedido na última tentativa")
+            continue
+        result = db.execute(
+            update(Job)
+            .where(Job.id == candidate_id, _claimable(now))
+            .values(
+                status="running",
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=visibility_timeout),
+                attempts=Job.attempts + 1,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount == 1:
+            job = db.get(Job, candidate_id)
+            db.refresh(job)
+            return job
+    return None
+
+
+def extend_lock(db: Session, job_id: int, worker_id: str,
+                visibility_timeout: int = JOB_VISIBILITY_TIMEOUT) -> bool:
+    """Heartbeat: renova a reserva enquanto o job ainda está em execução."""
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == "running", Job.locked_by == worker_id)
+        .values(locked_until=utcnow() + timedelta(seconds=visibility_timeout))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _finish(db: Session, job: Job, worker_id: str, values: Dict) -> bool:
+    """
+    Grava o desfecho com UPDATE condicional: só o worker que ainda tem a
+    reserva consegue (outro pode ter pego o job após o timeout de
+    visibilidade). Retorna False se a reserva foi perdida.
+    """
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.locked_by == worker_id)
+        .values(locked_by=None, locked_until=None, updated_at=utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount != 1:
+        logger.warning(f"Job {job.id} ({job.job_type}) não está mais reservado por {worker_id}: desfecho descartado")
+        return False
+    db.refresh(job)
+    return True
+
+
+def complete_job(db: Session, job: Job, worker_id: str, result: Optional[Dict] = None) -> bool:
+    # Cancelado enquanto rodava (ex.: prefetch abandonado): mantém o status
+    if not _finish(db, job, worker_id, {
+        "status": case((Job.status == "cancelled", "cancelled"), else_="completed"),
+        "result": result,
+        "finished_at": case((Job.status == "cancelled", Job.finished_at), else_=utcnow()),
+    }):
+        return False
+    logger.info(f"Job {job.id} ({job.job_type}) concluído")
+    return True
+
+
+def fail_job(db: Session, job: Job, worker_id: str, error: str) -> bool:
+    """Registra a falha e reagenda com backoff, ou move para dead letter."""
+    # Tentativas só mudam na reserva, então valem as do objeto; o cancelamento
+    # pode ter chegado enquanto o job rodava e é resolvido no próprio UPDATE
+    cancelled = Job.status == "cancelled"
+    if job.attempts >= job.max_attempts:
+        delay = None
+        values = {
+            "status": case((cancelled, "cancelled"), else_="dead"),
+            "finished_at": case((cancelled, Job.finished_at), else_=utcnow()),
+        }
+    else:
+        delay = JOB_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+        values = {
+            "status": case((cancelled, "cancelled"), else_="queued"),
+            "available_at": utcnow() + timedelta(seconds=delay),
+        }
+    if not _finish(db, job, worker_id, {"last_error": error, **values}):
+        return False
+    if job.status == "dead":
+        logger.error(f"Job {job.id} ({job.job_type}) movido para dead letter após {job.attempts} tentativas: {error}")
+    elif job.status == "queued":
+        logger.warning(f"Job {job.id} ({job.job_type}) falhou, nova tentativa em {delay}s: {error}")
+    return True
+
+
+def _dead_letter(db: Session, job: Job, error: str) -> None:
+    job.status = "dead"
+    job.last_error = error
+    job.locked_by = None
+    job.locked_until = None
+    job.finished_at = utcnow()
+    db.commit()
+    logger.error(f"Job {job.id} ({job.job_type}) movido para dead letter após {job.attempts} tentativas: {error}")
+
+
+def release_job(db: Session, job: Job, worker_id: str) -> bool:
+    """Devolve o job à fila sem contar tentativa (desligamento do worker)."""
+    return _finish(db, job, worker_id, {
+        "status": case((Job.status == "cancelled", "cancelled"), else_="queued"),
+        "attempts": case((Job.attempts > 0, Job.attempts - 1), else_=0),
+        "available_at": utcnow(),
+    })
+
+
+def retry_job(db: Session, job: Job) -> None:
+    """Recoloca na fila um job morto ou cancelado, zerando as tentativas."""
+    job.status = "queued"
+    job.attempts = 0
+    job.last_error = None
+    job.finished_at = None
+    job.available_at = utcnow()
+    db.commit()
+
+
+def serialize_job(job: Job) -> Dict:
+    return {column.name: getattr(job, column.name) for column in Job.__table__.columns}
+
+
+def queue_stats(db: Session) -> List[Dict]:
+    rows = (
+        db.query(Job.job_type, Job.status, func.count(Job.id))
+        .group_by(Job.job_type, Job.status)
+        .all()
+    )
+    return [{"job_type": t, "status": s, "count": c} for t, s, c in rows]
+
+
+def tenant_queue_stats(db: Session) -> Dict[str, Dict[str, int]]:
+    """Jobs pendentes por cliente e status (anônimo como 'anonymous')."""
+    usage: Dict[str, Dict[str, int]] = {}
+    rows = (
+        db.query(Job.tenant, Job.status, func.count(Job.id))
+        .filter(Job.status.in_(PENDING))
+        .group_by(Job.tenant, Job.status)
+        .all()
+    )
+    for tenant, status, count in rows:
+        usage.setdefault(tenant or "anonymous", {})[status] = count
+    return usage
@@ -0,0 +1,467 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sentence_segmenter import segment_sentences
+
+# Pular a API para segmentos já no idioma de destino ou sem texto traduzível
+LANGUAGE_PASSTHROUGH = os.getenv("LANGUAGE_PASSTHROUGH", "true").lower() in ("1", "true", "yes")
+# Confiança mínima para considerar um segmento já no idioma de destino (idiomas de escrita própria)
+PASSTHROUGH_CONFIDENCE = float(os.getenv("PASSTHROUGH_CONFIDENCE", "0.95"))
+# Idiomas latinos: vantagem mínima, em log-verossimilhança por trigrama, do idioma
+# detectado sobre o segundo colocado. A posterior do naive Bayes satura em ~1.0
+# em qualquer frase; a vantagem separa o idioma certo (0.2 a 0.9) de idiomas
+# fora do modelo (catalão e galego ficam abaixo de 0.1 contra es/pt)
+PASSTHROUGH_MARGIN = float(os.getenv("PASSTHROUGH_MARGIN", "0.12"))
+# Confiança mínima para usar o idioma detectado como idioma de origem
+SOURCE_CONFIDENCE = 0.8
+# Com menos letras que isso a detecção não é confiável ("OK", "Fim", nomes próprios)
+MIN_DETECTION_LETTERS = 20
+# Trechos curtos (orações, falas) a partir deste tamanho ainda podem vetar o repasse
+MIN_VETO_LETTERS = 8
+# Só o começo de segmentos longos é analisado
+MAX_DETECTION_CHARS = 1000
+
+# Textos de referência dos idiomas em alfabeto latino, de onde saem os
+# perfis de trigramas. Idiomas com escrita própria são reconhecidos pelo
+# alfabeto (SCRIPT_RANGES) e não precisam de perfil.
+SAMPLES: Dict[str, str] = {
+    'en': (
+        "The translator reads the whole chapter before starting the work, because the meaning of a "
+        "sentence often depends on what comes after it. When the original text uses an idiom, the "
+        "translation should find an expression that sounds natural to readers in the other language. "
+        "This is one of the reasons why machine translation still needs a careful human review. "
+        "We have been working with these documents for years and they were always delivered on time. "
+        "Please make sure that the names of people and places are not changed, and that the numbers "
+        "in the tables match the original. She said that they would come back in the morning with "
+        "the new version of the report, which should include all the changes that were discussed "
+        "during the meeting. If you have any questions about the style guide, you can ask the editor "
+        "who is responsible for this project. It was the best of times, it was the worst of times; "
+        "nobody knew what would happen next, but everyone thought that something important was about "
+        "to change. I think we should also check the footnotes, the headers and the captions of the "
+        "images, which are often forgotten. How many pages are left? There are only a few, so we "
+        "could finish them today and send everything to the publisher tomorrow morning."
+    ),
+    'pt': (
+        "O tradutor lê o capítulo inteiro antes de começar o trabalho, porque o sentido de uma frase "
+        "muitas vezes depende do que vem depois dela. Quando o texto original usa uma expressão "
+        "idiomática, a tradução deve encontrar uma forma que soe natural para os leitores do outro "
+        "idioma. Essa é uma das razões pelas quais a tradução automática ainda precisa de uma revisão "
+        "humana cuidadosa. Nós trabalhamos com esses documentos há anos e eles sempre foram entregues "
+        "no prazo. Por favor, verifique se os nomes das pessoas e dos lugares não foram alterados e se "
+        "os números das tabelas correspondem ao original. Ela disse que eles voltariam pela manhã com "
+        "a nova versão do relatório, que deve incluir todas as alterações discutidas durante a reunião. "
+        "Se você tiver alguma dúvida sobre o guia de estilo, pode perguntar ao editor responsável por "
+        "este projeto. Não sabíamos o que aconteceria depois, mas todos achavam que algo importante "
+        "estava para mudar. Acho que também devemos conferir as notas de rodapé, os cabeçalhos e as "
+        "legendas das imagens, que são esquecidas com frequência. Quantas páginas ainda faltam? São "
+        "poucas, então poderíamos terminá-las hoje e enviar tudo à editora amanhã de manhã. A informação "
+        "e a comunicação são essenciais para o desenvolvimento da nossa organização."
+    ),
+    'es': (
+        "El traductor lee el capítulo entero antes de empezar el trabajo, porque el sentido de una "
+        "frase muchas veces depende de lo que viene después. Cuando el texto original usa una "
+        "expresión idiomática, la traducción debe encontrar una forma que suene natural para los "
+        "lectores del otro idioma. Esa es una de las razones por las que la traducción automática "
+        "todavía necesita una revisión humana cuidadosa. Hemos trabajado con estos documentos durante "
+        "años y siempre se entregaron a tiempo. Por favor, compruebe que los nombres de las personas y "
+        "de los lugares no se han cambiado y que los números de las tablas coinciden con el original. "
+        "Ella dijo que ellos volverían por la mañana con la nueva versión del informe, que debe incluir "
+        "todos los cambios discutidos durante la reunión. Si usted tiene alguna duda sobre la guía de "
+        "estilo, puede preguntar al editor responsable de este proyecto. No sabíamos qué pasaría "
+        "después, pero todos pensaban que algo importante estaba a punto de cambiar. Creo que también "
+        "deberíamos revisar las notas al pie, los encabezados y los pies de las imágenes, que se olvidan "
+        "con frecuencia. ¿Cuántas páginas quedan? Son pocas, así que podríamos terminarlas hoy y enviar "
+        "todo a la editorial mañana por la mañana. La información y la comunicación son esenciales para "
+        "el desarrollo de nuestra organización y de los niños del país."
+    ),
+    'fr': (
+        "Le traducteur lit le chapitre entier avant de commencer le travail, parce que le sens d'une "
+        "phrase dépend souvent de ce qui vient après. Quand le texte original utilise une expression "
+        "idiomatique, la traduction doit trouver une tournure qui semble naturelle aux lecteurs de "
+        "l'autre langue. C'est l'une des raisons pour lesquelles la traduction automatique a encore "
+        "besoin d'une relecture humaine attentive. Nous travaillons avec ces documents depuis des années "
+        "et ils ont toujours été livrés à temps. Veuillez vérifier que les noms des personnes et des "
+        "lieux n'ont pas été modifiés et que les chiffres des tableaux correspondent à l'original. Elle "
+        "a dit qu'ils reviendraient le matin avec la nouvelle version du rapport, qui doit inclure tous "
+        "les changements discutés pendant la réunion. Si vous avez des questions sur le guide de style, "
+        "vous pouvez demander à l'éditeur responsable de ce projet. Personne ne savait ce qui allait se "
+        "passer ensuite, mais tout le monde pensait que quelque chose d'important était sur le point de "
+        "changer. Je pense que nous devrions aussi vérifier les notes de bas de page, les en-têtes et "
+        "les légendes des images, qui sont souvent oubliées. Combien de pages reste-t-il ? Il n'en reste "
+        "que quelques-unes, donc nous pourrions les terminer aujourd'hui et tout envoyer à l'éditeur "
+        "demain matin."
+    ),
+    'de': (
+        "Der Übersetzer liest das ganze Kapitel, bevor er mit der Arbeit beginnt, weil die Bedeutung "
+        "eines Satzes oft davon abhängt, was danach kommt. Wenn der Originaltext eine Redewendung "
+        "verwendet, sollte die Übersetzung einen Ausdruck finden, der für die Leser der anderen Sprache "
+        "natürlich klingt. Das ist einer der Gründe, warum die maschinelle Übersetzung immer noch eine "
+        "sorgfältige Prüfung durch einen Menschen braucht. Wir arbeiten seit Jahren mit diesen Dokumenten "
+        "und sie wurden immer pünktlich geliefert. Bitte stellen Sie sicher, dass die Namen von Personen "
+        "und Orten nicht geändert werden und dass die Zahlen in den Tabellen mit dem Original "
+        "übereinstimmen. Sie sagte, dass sie am Morgen mit der neuen Version des Berichts zurückkommen "
+        "würden, die alle Änderungen enthalten soll, die während der Besprechung diskutiert wurden. Wenn "
+        "Sie Fragen zum Styleguide haben, können Sie den Redakteur fragen, der für dieses Projekt "
+        "verantwortlich ist. Niemand wusste, was als Nächstes passieren würde, aber alle dachten, dass "
+        "sich etwas Wichtiges ändern würde. Ich denke, wir sollten auch die Fußnoten, die Kopfzeilen und "
+        "die Bildunterschriften prüfen, die oft vergessen werden. Wie viele Seiten sind noch übrig? Es "
+        "sind nur noch wenige, also könnten wir sie heute fertigstellen und morgen früh alles an den "
+        "Verlag schicken."
+    ),
+    'it': (
+        "Il traduttore legge l'intero capitolo prima di iniziare il lavoro, perché il senso di una frase "
+        "dipende spesso da ciò che viene dopo. Quando il testo originale usa un'espressione idiomatica, "
+        "la traduzione deve trovare una forma che suoni naturale per i lettori dell'altra lingua. Questa "
+        "è una delle ragioni per cui la traduzione automatica ha ancora bisogno di una revisione umana "
+        "attenta. Lavoriamo con questi documenti da anni e sono sempre stati consegnati in tempo. Per "
+        "favore, verificate che i nomi delle persone e dei luoghi non siano stati cambiati e che i numeri "
+        "delle tabelle corrispondano all'originale. Lei ha detto che sarebbero tornati la mattina con la "
+        "nuova versione della relazione, che deve includere tutte le modifiche discusse durante la "
+        "riunione. Se avete domande sulla guida di stile, potete chiedere al redattore responsabile di "
+        "questo progetto. Nessuno sapeva cosa sarebbe successo dopo, ma tutti pensavano che qualcosa di "
+        "importante stesse per cambiare. Penso che dovremmo controllare anche le note a piè di pagina, "
+        "le intestazioni e le didascalie delle immagini, che spesso vengono dimenticate. Quante pagine "
+        "mancano ancora? Sono poche, quindi potremmo finirle oggi e mandare tutto all'editore domani "
+        "mattina. Gli studenti della scuola hanno già letto questi libri."
+    ),
+    'nl': (
+        "De vertaler leest het hele hoofdstuk voordat hij aan het werk begint, omdat de betekenis van "
+        "een zin vaak afhangt van wat erna komt. Wanneer de oorspronkelijke tekst een uitdrukking "
+        "gebruikt, moet de vertaling een vorm vinden die natuurlijk klinkt voor de lezers van de andere "
+        "taal. Dat is een van de redenen waarom automatische vertaling nog steeds een zorgvuldige "
+        "controle door een mens nodig heeft. Wij werken al jaren met deze documenten en ze zijn altijd "
+        "op tijd geleverd. Controleer alstublieft of de namen van personen en plaatsen niet zijn "
+        "gewijzigd en of de getallen in de tabellen overeenkomen met het origineel. Ze zei dat ze "
+        "morgenochtend terug zouden komen met de nieuwe versie van het verslag, waarin alle wijzigingen "
+        "moeten staan die tijdens de vergadering zijn besproken. Als u vragen heeft over de stijlgids, "
+        "kunt u de redacteur vragen die verantwoordelijk is voor dit project. Niemand wist wat er daarna "
+        "zou gebeuren, maar iedereen dacht dat er iets belangrijks ging veranderen. Ik denk dat we ook "
+        "de voetnoten, de kopteksten en de onderschriften van de afbeeldingen moeten nakijken, die vaak "
+        "worden vergeten. Hoeveel bladzijden zijn er nog over? Het zijn er maar een paar, dus we kunnen "
+        "ze vandaag afmaken en morgenochtend alles naar de uitgever sturen."
+    ),
+}
+
+# Alfabetos que identificam o idioma sozinhos (faixas de code points)
+SCRIPT_RANGES: List[Tuple[int, int, str]] = [
+    (0x3040, 0x30FF, 'ja'),   # hiragana e katakana
+    (0xAC00, 0xD7AF, 'ko'),   # hangul
+    (0x1100, 0x11FF, 'ko'),
+    (0x4E00, 0x9FFF, 'zh'),   # ideogramas CJK (japonês sem kana cai aqui)
+    (0x3400, 0x4DBF, 'zh'),
+    (0x0400, 0x04FF, 'ru'),   # cirílico
+    (0x0370, 0x03FF, 'el'),   # grego
+    (0x0590, 0x05FF, 'he'),   # hebraico
+    (0x0600, 0x06FF, 'ar'),   # árabe
+    (0x0900, 0x097F, 'hi'),   # devanágari
+    (0x0E00, 0x0E7F, 'th'),   # tailandês
+]
+
+# Marcação e trechos que não são texto traduzível
+_MARKUP = re.compile(r'</?g\d+>|https?://\S+|www\.\S+|[\w.+-]+@[\w-]+\.[\w.-]+')
+_WORD = re.compile(r'[^\W\d_]+')
+# Limites de oração dentro de uma frase: falas entre aspas, dois-pontos, travessões
+_CLAUSE_BREAK = re.compile(r'[“”"«»„:;()\[\]—–]')
+
+# Linhas típicas de código-fonte: começo com palavra-chave ou comentário
+# (vale sozinho) e terminações/operadores (só contam em blocos de várias
+# linhas: "desconto: 5%; total = R$ 9,50." também casa com eles)
+_CODE_KEYWORD_LINE = re.compile(
+    r'^\s*(?:(?:def|class|import|return|function|var|let|const|public|private|protected|static|'
+    r'void|int|package|using|namespace|elif|lambda)\b|from\s+[\w.]+\s+import\b|#include\b|'
+    r'<\?php|//|/\*|\*/|[{}\[\]]\s*$|@\w+)'
+)
+_CODE_LINE = re.compile(
+    _CODE_KEYWORD_LINE.pattern +
+    r'|[;{]\s*$|\)\s*:\s*$|=>|==|!=|:=|\+\+|&&|\|\||\w+\([^)]*\)\s*;|\w+\s*=\s*[\w\'"\[{(]'
+)
+# Linhas a partir das quais a proporção de linhas de código decide sozinha
+MIN_CODE_LINES = 3
+_CODE_SYMBOLS = re.compile(r'[{}()\[\];=<>_$#*/\\|&]')
+
+# Valor aceito no lugar do idioma de origem para pedir detecção
+AUTO = 'auto'
+
+# Resultados da análise de um segmento
+TRANSLATE = 'translate'
+SAME_LANGUAGE = 'same_language'
+NO_CONTENT = 'no_content'
+CODE = 'code'
+
+
+class LanguageGuess(NamedTuple):
+    language: Optional[str]
+    confidence: float
+    letters: int
+    margin: float = 0.0  # idiomas latinos: vantagem por trigrama sobre o segundo colocado
+
+
+class SegmentAnalysis(NamedTuple):
+    action: str
+    language: Optional[str]
+    confidence: float
+
+    @property
+    def passthrough(self) -> bool:
+        return self.action != TRANSLATE
+
+
+def base_language(code: Optional[str]) -> Optional[str]:
+    """'pt-BR' -> 'pt'. Idiomas são comparados só pelo código principal."""
+    if not code:
+        return None
+    return code.strip().lower().replace('_', '-').split('-')[0] or None
+
+
+def _trigrams(words: List[str]) -> Counter:
+    """Trigramas do texto normalizado, com espaço marcando o limite das palavras."""
+    text = f" {' '.join(words)} "
+    return Counter([text[i:i + 3] for i in range(len(text) - 2)])
+
+
+class _NgramModel(NamedTuple):
+    languages: Tuple[str, ...]
+    profiles: Tuple[Dict[str, float], ...]  # log-probabilidade de cada trigrama por idioma
+    unseen: Tuple[float, ...]               # log-probabilidade de um trigrama ausente
+
+
+@lru_cache(maxsize=1)
+def _model() -> _NgramModel:
+    """Perfis de trigramas por idioma (naive Bayes, suavização add-one)."""
+    languages = tuple(SAMPLES)
+    counts = [_trigrams(_WORD.findall(SAMPLES[language].lower())) for language in languages]
+    vocabulary = set().union(*counts)
+    totals = [sum(count.values()) + len(vocabulary) for count in counts]
+    profiles = tuple(
+        {gram: math.log((count[gram] + 1) / total) for gram in vocabulary}
+        for count, total in zip(counts, totals)
+    )
+    return _NgramModel(languages, profiles, tuple(math.log(1 / total) for total in totals))
+
+
+def _script_language(text: str) -> Optional[Tuple[str, int, int]]:
+    """Idioma de escrita não latina predominante: (idioma, letras dele, letras latinas)."""
+    scripts: Counter = Counter()
+    latin = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        code = ord(char)
+        if code < 0x0250:
+            latin += 1
+            continue
+        for start, end, language in SCRIPT_RANGES:
+            if start <= code <= end:
+                scripts[language] += 1
+                break
+    if not scripts:
+        return None
+    # Japonês mistura kanji e kana: qualquer kana decide
+    if scripts.get('ja') and scripts.get('zh'):
+        scripts['ja'] += scripts.pop('zh')
+    language, count = scripts.most_common(1)[0]
+    return language, count, latin
+
+
+def detect_language(text: str, min_letters: int = MIN_DETECTION_LETTERS) -> LanguageGuess:
+    """
+    Identifica o idioma de um texto sem chamar nenhum serviço: alfabetos
+    não latinos pelo code point; idiomas latinos por um modelo de
+    trigramas de caracteres. Retorna idioma None se o texto tiver menos
+    que `min_letters` letras.
+    """
+    sample = unicodedata.normalize('NFC', _MARKUP.sub(' ', text[:MAX_DETECTION_CHARS]))
+
+    script = _script_language(sample)
+    if script is not None:
+        language, count, latin = script
+        if count >= latin:
+            # CJK carrega muito mais informação por caractere
+            letters = count * (4 if language in ('ja', 'ko', 'zh') else 1)
+            return LanguageGuess(language, count / (count + latin), letters)
+
+    words = _WORD.findall(sample.lower())
+    letters = sum(len(word) for word in words)
+    if letters < min_letters:
+        return LanguageGuess(None, 0.0, letters)
+
+    model = _model()
+    trigrams = _trigrams(words)
+    grams = trigrams.items()
+    scores = [
+        sum(profile.get(gram, unseen) * count for gram, count in grams)
+        for profile, unseen in zip(model.profiles, model.unseen)
+    ]
+
+    # Posterior com prioris iguais; estável numericamente subtraindo o máximo
+    best = max(scores)
+    weights = [math.exp(score - best) for score in scores]
+    index = scores.index(best)
+    runner_up = max(score for i, score in enumerate(scores) if i != index)
+    margin = (best - runner_up) / max(1, sum(trigrams.values()))
+    return LanguageGuess(model.languages[index], weights[index] / sum(weights), letters, margin)
+
+
+def is_confident(guess: LanguageGuess) -> bool:
+    """Detecção firme o bastante para agir sobre ela (repassar o texto, descartar código)."""
+    if guess.language is None or guess.letters < MIN_DETECTION_LETTERS:
+        return False
+    if guess.language in _model().languages:
+        return guess.margin >= PASSTHROUGH_MARGIN
+    return guess.confidence >= PASSTHROUGH_CONFIDENCE
+
+
+def _all_in_language(text: str, language: str) -> bool:
+    """
+    Cada frase do texto, e cada oração delas (falas entre aspas, trechos
+    após dois-pontos), está no idioma: uma oração de outro idioma veta o
+    repasse. Orações curtas só vetam; ao menos uma precisa ser conclusiva.
+    """
+    conclusive = False
+    for start, end in segment_sentences(text, language):
+        for clause in _CLAUSE_BREAK.split(text[start:end]):
+            guess = detect_language(clause, MIN_VETO_LETTERS)
+            if guess.language is None:
+                continue
+            if guess.language != language:
+                return False
+            if guess.letters >= MIN_DETECTION_LETTERS:
+                if not is_confident(guess):
+                    return False
+                conclusive = True
+    return conclusive
+
+
+def looks_like_code(text: str) -> bool:
+    """
+    Parágrafo que é código-fonte: muitos símbolos e, em blocos de várias
+    linhas, maioria das linhas com cara de código. Trechos de uma ou duas
+    linhas precisam começar todas com palavra-chave ou comentário e não
+    podem ser texto num idioma detectado com confiança.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return False
+    density = len(_CODE_SYMBOLS.findall(text)) / max(1, len(text.strip()))
+    if density < 0.04:
+        return False
+    if len(lines) >= MIN_CODE_LINES:
+        code_lines = sum(1 for line in lines if _CODE_LINE.search(line))
+        return code_lines / len(lines) >= 0.6
+    if not all(_CODE_KEYWORD_LINE.search(line) for line in lines):
+        return False
+    return not is_confident(detect_language(text))
+
+
+def has_translatable_content(text: str) -> bool:
+    """Falso para números, datas, pontuação, URLs e siglas soltas."""
+    words = _WORD.findall(_MARKUP.sub(' ', text))
+    return any(len(word) > 1 for word in words)
+
+
+def analyze_segment(text: str, target_language: Optional[str]) -> SegmentAnalysis:
+    """
+    Decide se um segmento precisa ir para a API. Segmentos sem conteúdo
+    traduzível, código-fonte e trechos com todas as frases já no idioma de
+    destino (com vantagem clara sobre os outros idiomas) são devolvidos
+    como estão.
+    """
+    return analyze_targets(text, [target_language])[target_language]
+
+
+def analyze_targets(text: str, target_languages: List[Optional[str]]) -> Dict[Optional[str], SegmentAnalysis]:
+    """analyze_segment para vários idiomas de destino, detectando o idioma do texto uma vez só."""
+    if not has_translatable_content(text):
+        return {target: SegmentAnalysis(NO_CONTENT, None, 1.0) for target in target_languages}
+    if looks_like_code(text):
+        return {target: SegmentAnalysis(CODE, None, 1.0) for target in target_languages}
+
+    guess = detect_language(text)
+    # O texto inteiro decide o idioma provável; o repasse exige todas as frases nele
+    same = is_confident(guess) and guess.language in {base_language(target) for target in target_languages} \
+        and _all_in_language(text, guess.language)
+    analyses = {}
+    for target in target_languages:
+        if same and guess.language == base_language(target):
+            analyses[target] = SegmentAnalysis(SAME_LANGUAGE, guess.language, guess.confidence)
+        else:
+            analyses[target] = SegmentAnalysis(TRANSLATE, guess.language, guess.confidence)
+    return analyses
+
+
+def resolve_source_language(text: str, source_language: Optional[str],
+                            fallback: Optional[str] = None) -> Optional[str]:
+    """Idioma de origem informado ou, se ausente ("auto"), o detectado no texto."""
+    if source_language and source_language.lower() != AUTO:
+        return source_language
+    guess = detect_language(text)
+    if guess.language is not None and guess.confidence >= SOURCE_CONFIDENCE:
+        return guess.language
+    return fallback
+
+
+def dominant_language(paragraphs: List[str], max_paragraphs: int = 200) -> Tuple[Optional[str], Dict[str, int]]:
+    """Idioma predominante de um documento, ponderado pelo tamanho dos parágrafos."""
+    weights: Counter = Counter()
+    for paragraph in paragraphs[:max_paragraphs]:
+        guess = detect_language(paragraph)
+        if guess.language is not None:
+            weights[guess.language] += guess.letters
+    if not weights:
+        return None, {}
+    return weights.most_common(1)[0][0], dict(weights)
+
+
+def annotate_document_language(processed_data: Dict) -> Dict:
+    """Grava em processed_data["metadata"] o idioma predominante e a participação de cada um."""
+    metadata = processed_data.setdefault("metadata", {})
+    language, weights = dominant_language([
+        paragraph for chapter in processed_data.get("chapters", []) for paragraph in chapter.get("paragraphs", [])
+    ])
+    if language is not None:
+        total = sum(weights.values())
+        metadata["language"] = language
+        metadata["languages"] = {code: round(weight / total, 3) for code, weight in weights.items()}
+    return metadata
+
+
+class LanguageMetrics:
+    """Segmentos analisados e chamadas à API evitadas pela detecção de idioma."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.actions: Counter = Counter()
+        self.detected: Counter = Counter()
+        self.characters_skipped = 0
+
+    def record(self, text: str, analysis: SegmentAnalysis) -> None:
+        with self._lock:
+            self.analyzed += 1
+            self.actions[analysis.action] += 1
+            if analysis.language:
+                self.detected[analysis.language] += 1
+            if analysis.passthrough:
+                self.characters_skipped += len(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            skipped = self.analyzed - self.actions[TRANSLATE]
+            return {
+                "enabled": LANGUAGE_PASSTHROUGH,
+                "analyzed": self.analyzed,
+                "api_calls_avoided": skipped,
+                "skip_ratio": round(skipped / self.analyzed, 4) if self.analyzed else 0.0,
+                "characters_skipped": self.characters_skipped,
+                "by_action": dict(self.actions),
+                "detected_languages": dict(self.detected),
+            }
+
+
+language_metrics = LanguageMetrics()
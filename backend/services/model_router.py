@@ -0,0 +1,199 @@
+import logging
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Escolher o modelo pela dificuldade do segmento; desligado, tudo vai para o padrão
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+
+ECONOMY = 'economy'
+STANDARD = 'standard'
+PREMIUM = 'premium'
+TIERS = (ECONOMY, STANDARD, PREMIUM)
+
+logger = logging.getLogger(__name__)
+
+# Modelo de cada nível. TRANSLATION_MODEL e QUALITY_REVIEW_MODEL continuam valendo.
+# Por padrão o premium usa o mesmo gpt-4o do padrão: sem MODEL_PREMIUM (ou
+# QUALITY_REVIEW_MODEL) apontando para um modelo mais forte, o nível premium
+# só serve ao roteamento, e a revisão e o fallback para ele ficam desligados
+# para os níveis que já usam esse modelo.
+TIER_MODELS = {
+    ECONOMY: os.getenv("MODEL_ECONOMY", "gpt-4o-mini"),
+    STANDARD: os.getenv("MODEL_STANDARD", os.getenv("TRANSLATION_MODEL", "gpt-4o")),
+    PREMIUM: os.getenv("MODEL_PREMIUM", os.getenv("QUALITY_REVIEW_MODEL", "gpt-4o")),
+}
+
+if TIER_MODELS[PREMIUM] == TIER_MODELS[STANDARD]:
+    logger.warning(
+        f"Níveis padrão e premium usam o mesmo modelo ({TIER_MODELS[PREMIUM]}): "
+        "defina MODEL_PREMIUM para revisar e escalonar com um modelo mais forte"
+    )
+
+# Segmentos até este tamanho, sem outros sinais de dificuldade, vão para o nível econômico
+SIMPLE_MAX_CHARS = int(os.getenv("ROUTING_SIMPLE_MAX_CHARS", "200"))
+# Acima deste tamanho o segmento vai pelo menos para o nível padrão
+LONG_MIN_CHARS = 600
+# Complexidade léxica: tamanho médio das palavras e fração de palavras longas
+COMPLEX_AVG_WORD = 6.5
+COMPLEX_LONG_WORDS = 0.15
+LONG_WORD = 12
+# Termos de glossário por 100 palavras que pedem o nível premium
+GLOSSARY_DENSE = 5.0
+# Estilos que pedem mais do modelo
+STYLE_TIERS = {'literary': PREMIUM, 'technical': STANDARD, 'academic': STANDARD}
+
+# Latências guardadas por nível para os percentis
+LATENCY_WINDOW = 1000
+
+_WORD = re.compile(r'[^\W\d_]+')
+
+
+class RouteDecision(NamedTuple):
+    tier: str
+    model: str
+    reasons: Tuple[str, ...]
+
+
+def _raise(tier: str, minimum: str) -> str:
+    return max(tier, minimum, key=TIERS.index)
+
+
+def glossary_density(text: str, glossary: Iterable[Tuple[str, str]], words: int) -> float:
+    """Termos do glossário encontrados por 100 palavras."""
+    lower = text.lower()
+    hits = sum(lower.count(term.lower()) for term, _ in glossary)
+    return 100.0 * hits / max(1, words)
+
+
+def route_segment(text: str, style: str, glossary: Iterable[Tuple[str, str]] = ()) -> RouteDecision:
+    """
+    Classifica o segmento localmente e escolhe o nível de modelo: textos
+    curtos e simples vão para o econômico; estilo literário, vocabulário
+    complexo ou muitos termos de glossário sobem de nível.
+    """
+    if not MODEL_ROUTING:
+        return RouteDecision(STANDARD, TIER_MODELS[STANDARD], ('routing_disabled',))
+
+    words = _WORD.findall(text)
+    tier, reasons = ECONOMY, []
+
+    if len(text) > LONG_MIN_CHARS:
+        tier = _raise(tier, STANDARD)
+        reasons.append('long')
+    elif len(text) > SIMPLE_MAX_CHARS:
+        tier = _raise(tier, STANDARD)
+        reasons.append('medium')
+
+    if words:
+        average = sum(len(word) for word in words) / len(words)
+        long_share = sum(1 for word in words if len(word) >= LONG_WORD) / len(words)
+        if average >= COMPLEX_AVG_WORD or long_share >= COMPLEX_LONG_WORDS:
+            tier = _raise(tier, STANDARD)
+            reasons.append('lexical')
+
+    if style in STYLE_TIERS:
+        tier = _raise(tier, STYLE_TIERS[style])
+        reasons.append(style)
+
+    glossary = tuple(glossary)
+    if glossary:
+        density = glossary_density(text, glossary, len(words))
+        if density >= GLOSSARY_DENSE:
+            tier = _raise(tier, PREMIUM)
+            reasons.append('glossary_dense')
+        elif density > 0:
+            tier = _raise(tier, STANDARD)
+            reasons.append('glossary')
+
+    return RouteDecision(tier, TIER_MODELS[tier], tuple(reasons) or ('simple',))
+
+
+def same_model(tier: str, other: str) -> bool:
+    """Os dois níveis chamam o mesmo modelo (reenviar a ele não muda nada)."""
+    return TIER_MODELS[tier] == TIER_MODELS[other]
+
+
+def fallback_tier(tier: str) -> Optional[str]:
+    """
+    Nível acima usado quando o escolhido falha, do premium para baixo, pulando
+    os que usam o mesmo modelo que falhou; None se não há outro modelo acima.
+    """
+    for candidate in reversed(TIERS[TIERS.index(tier) + 1:]):
+        if not same_model(candidate, tier):
+            return candidate
+    return None
+
+
+class RoutingMetrics:
+    """Tráfego, falhas, escalonamentos e latência por nível de modelo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routed: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.characters: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.fallbacks: Counter = Counter()
+        self.escalations: Counter = Counter()
+        self.reasons: Counter = Counter()
+        self.latencies: Dict[str, deque] = {tier: deque(maxlen=LATENCY_WINDOW) for tier in TIERS}
+
+    def record_route(self, decision: RouteDecision) -> None:
+        with self._lock:
+            self.routed[decision.tier] += 1
+            self.reasons.update(decision.reasons)
+
+    def record_call(self, tier: str, text: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls[tier] += 1
+            self.characters[tier] += len(text)
+            self.latencies[tier].append(seconds)
+            if not ok:
+                self.failures[tier] += 1
+
+    def record_fallback(self, tier: str) -> None:
+        with self._lock:
+            self.fallbacks[tier] += 1
+
+    def record_escalation(self, tier: str) -> None:
+        """Segmento do nível `tier` reenviado ao premium por qualidade baixa."""
+        with self._lock:
+            self.escalations[tier] += 1
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> float:
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            routed = sum(self.routed.values())
+            tiers = {}
+            for tier in TIERS:
+                latencies = sorted(self.latencies[tier])
+                tiers[tier] = {
+                    "model": TIER_MODELS[tier],
+                    "routed": self.routed[tier],
+                    "share": round(self.routed[tier] / routed, 4) if routed else 0.0,
+                    "api_calls": self.calls[tier],
+                    "characters": self.characters[tier],
+                    "failures": self.failures[tier],
+                    "fallbacks": self.fallbacks[tier],
+                    "quality_escalations": self.escalations[tier],
+                    "latency_avg_ms": round(1000 * sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                    "latency_p50_ms": round(1000 * self._percentile(latencies, 0.5), 1),
+                    "latency_p95_ms": round(1000 * self._percentile(latencies, 0.95), 1),
+                }
+            return {
+                "enabled": MODEL_ROUTING,
+                "routed": routed,
+                "tiers": tiers,
+                "reasons": dict(self.reasons),
+            }
+
+
+routing_metrics = RoutingMetrics()
@@ -1,67 +1,336 @@
 import os
 import logging
 import json
-from typing import Dict, List, Optional
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 import traceback
-from openai import OpenAI
 import asyncio
-from functools import partial
+from functools import lru_cache, partial
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+from sentence_segmenter import segment_sentences
+from services.confidential import confidential_scope
+from services.example_retrieval import example_store
+from services.language_detector import (
+    AUTO, LANGUAGE_PASSTHROUGH, analyze_segment, language_metrics, resolve_source_language
+)
+from services.prompt_templates import (
+    ProfileSpec, compile_prompt, estimate_tokens, profile_glossary, prompt_metrics, resolve_options
+)
+from services.model_router import (
+    PREMIUM, STANDARD, TIER_MODELS, fallback_tier, route_segment, routing_metrics, same_model
+)
+from services.paragraph_dedup import dedup_metrics
+from services.quality_estimator import QUALITY_REVIEW, estimate_quality, quality_metrics, review_instructions
+from services.tenant_scheduler import current_tenant, fair_scheduler, metered
+from services.translation_cache import cache_key, lookup_translation_memory, translation_cache
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configurar OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    Cliente OpenAI criado na primeira tradução. O SDK é importado aqui
+    para não pesar no tempo de inicialização da API.
+    """
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Máximo de chamadas simultâneas à API ao traduzir frase a frase
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+
+# Traduções em andamento neste processo, pela chave do cache
+_in_flight: Dict[tuple, "asyncio.Future"] = {}
 
-async def translate_text(text: str, source_language: str, target_language: str, formality: str = 'neutral', style: str = 'general') -> str:
+async def translate_text(
+    text: str,
+    source_language: Optional[str],
+    target_language: str,
+    formality: Optional[str] = 'neutral',
+    style: Optional[str] = 'general',
+    granularity: str = 'paragraph',
+    db: Optional[Session] = None,
+    profile: Optional[ProfileSpec] = None,
+    language_check: bool = True,
+    source_hint: Optional[str] = None,
+    model_usage: Optional[Counter] = None,
+    confidential: bool = False,
+    check_memory: bool = True
+) -> str:
     """
     Traduz um texto de um idioma para outro usando a API da OpenAI.
     
     Args:
         text (str): Texto a ser traduzido
-        source_language (str): Idioma de origem
+        source_language (str): Idioma de origem (None ou "auto" para detectar)
         target_language (str): Idioma de destino
         formality (str): Nível de formalidade (formal, neutral, informal)
         style (str): Estilo da tradução (general, technical, literary, academic)
+        granularity (str): Unidade de tradução e cache (paragraph, sentence)
+        db (Session): Sessão opcional para consultar a memória de tradução
+        profile (ProfileSpec): Perfil do tradutor (instruções, glossário e padrões)
+        language_check (bool): Devolver sem chamar a API textos já no idioma de
+            destino ou sem conteúdo traduzível (False se o chamador já verificou)
+        source_hint (str): Idioma usado quando a detecção não é conclusiva
+        model_usage (Counter): Se informado, recebe os caracteres traduzidos por
+            cada modelo (para registrar em Translation.model_used)
+        confidential (bool): Texto de documento confidencial: não passa pelo
+            cache, pela memória de tradução nem pelos exemplos few-shot, e não
+            aparece nos logs
+        check_memory (bool): Consultar a memória de tradução no banco (False
+            se o chamador já a consultou em lote)
+    """
+    with confidential_scope(confidential):
+        try:
+            if language_check and LANGUAGE_PASSTHROUGH:
+                analysis = analyze_segment(text, target_language)
+                language_metrics.record(text, analysis)
+                if analysis.passthrough:
+                    logger.info(f"Segmento mantido sem tradução ({analysis.action})")
+                    return text
+
+            source_language = resolve_source_language(text, source_language, source_hint) or AUTO
+            formality, style = resolve_options(profile, formality, style)
+            logger.info(f"Iniciando tradução de {source_language} para {target_language} (Formalidade: {formality}, Estilo: {style}, Unidade: {granularity})")
+
+            if granularity == 'sentence':
+                return await _translate_by_sentence(text, source_language, target_language, formality, style, db,
+                                                    profile, model_usage, confidential, check_memory)
+            return await _translate_segment(text, source_language, target_language, formality, style, db,
+                                            profile, model_usage, confidential, check_memory)
+
+        except Exception as e:
+            logger.error(f"Erro durante a tradução: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
+
+async def _translate_by_sentence(text: str, source_language: str, target_language: str,
+                                 formality: str, style: str, db: Optional[Session],
+                                 profile: Optional[ProfileSpec] = None,
+                                 model_usage: Optional[Counter] = None,
+                                 confidential: bool = False, check_memory: bool = True) -> str:
+    """
+    Traduz frase a frase: cada frase passa pelo cache e pela memória de
+    tradução, e só as que faltam vão para a API, em paralelo.
     """
+    offsets = segment_sentences(text, source_language)
+    if len(offsets) <= 1:
+        return await _translate_segment(text, source_language, target_language, formality, style, db,
+                                        profile, model_usage, confidential, check_memory)
+
+    semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+
+    async def translate_sentence(start: int, end: int) -> str:
+        async with semaphore:
+            return await _translate_segment(
+                text[start:end], source_language, target_language, formality, style, db, profile, model_usage,
+                confidential, check_memory
+            )
+
+    translated = await asyncio.gather(*(translate_sentence(start, end) for start, end in offsets))
+
+    # Remontar preservando os espaços originais entre as frases
+    parts = []
+    previous_end = offsets[0][0]
+    for (start, end), sentence in zip(offsets, translated):
+        parts.append(text[previous_end:start])
+        parts.append(sentence)
+        previous_end = end
+    return ''.join(parts).strip()
+
+async def _translate_segment(text: str, source_language: str, target_language: str,
+                             formality: str, style: str, db: Optional[Session],
+                             profile: Optional[ProfileSpec] = None,
+                             model_usage: Optional[Counter] = None,
+                             confidential: bool = False, check_memory: bool = True) -> str:
+    """
+    Traduz um segmento consultando antes o cache e a memória de tradução.
+    Segmentos confidenciais não leem nem gravam nesses caches compartilhados.
+    """
+    key = cache_key(text, source_language, target_language, formality, style,
+                    profile.fingerprint if profile else None)
+    cached = None if confidential else translation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if db is not None and check_memory and not confidential:
+        remembered = lookup_translation_memory(
+            db, text, source_language, target_language, formality, style, profile.profile_id if profile else None
+        )
+        if remembered is not None:
+            translation_cache.set(key, remembered)
+            return remembered
+
+    if confidential:
+        translated_text, tier = await _translate_uncached(
+            None, text, source_language, target_language, formality, style, db, profile
+        )
+    else:
+        # Segmento igual já em tradução (outro capítulo, documento ou requisição):
+        # esperar o mesmo resultado em vez de chamar a API de novo
+        shared = _in_flight.get(key)
+        if shared is None:
+            shared = asyncio.ensure_future(_translate_shared(
+                key, text, source_language, target_language, formality, style, db is not None, profile
+            ))
+            _in_flight[key] = shared
+            shared.add_done_callback(lambda done: _in_flight.pop(key) if _in_flight.get(key) is done else None)
+            translated_text, tier, _, _ = await asyncio.shield(shared)
+        else:
+            dedup_metrics.record_coalesced()
+            translated_text, tier, tokens, owner = await asyncio.shield(shared)
+            # Quem aproveita a chamada de outro cliente paga a sua parte da cota
+            if owner != current_tenant().key:
+                fair_scheduler.charge(tokens)
+    if model_usage is not None:
+        model_usage[TIER_MODELS[tier]] += len(text)
+    return translated_text
+
+async def _translate_shared(key: tuple, text: str, source_language: str, target_language: str,
+                            formality: str, style: str, use_db: bool,
+                            profile: Optional[ProfileSpec]) -> Tuple[str, str, int, str]:
+    """
+    Tarefa compartilhada por quem pede o mesmo segmento: usa sessão própria
+    (a de quem a criou pode fechar antes) e devolve também os tokens
+    cobrados e o cliente que pagou, para cobrar os demais.
+    """
+    db = SessionLocal() if use_db else None
     try:
-        logger.info(f"Iniciando tradução de {source_language} para {target_language} (Formalidade: {formality}, Estilo: {style})")
-        
-        # Criar o prompt para a tradução com instruções específicas de formalidade e estilo
-        system_prompt = f"""You are a professional translator. Translate the following text from {source_language} to {target_language}.
-Follow these specific guidelines:
-- Formality: Use a {formality} tone (e.g. {
-    'formal language, avoiding colloquialisms' if formality == 'formal'
-    else 'balanced and natural language' if formality == 'neutral'
-    else 'casual and conversational language'
-})
-- Style: Follow a {style} style (e.g. {
-    'clear and straightforward language' if style == 'general'
-    else 'precise technical terminology and clear structure' if style == 'technical'
-    else 'elegant and expressive language' if style == 'literary'
-    else 'scholarly and methodical approach' if style == 'academic'
-    else 'clear and straightforward language'
-})
-Maintain the original meaning while adapting the translation according to these requirements."""
-
-        user_prompt = f"Text to translate:\n{text}"
-        
+        with metered() as meter:
+            translated_text, tier = await _translate_uncached(
+                key, text, source_language, target_language, formality, style, db, profile
+            )
+        return translated_text, tier, meter[0], current_tenant().key
+    finally:
+        if db is not None:
+            db.close()
+
+async def _translate_uncached(key: Optional[tuple], text: str, source_language: str, target_language: str,
+                              formality: str, style: str, db: Optional[Session],
+                              profile: Optional[ProfileSpec]) -> Tuple[str, str]:
+    """Chamada ao modelo (com exemplos, roteamento e revisão); sem chave, o resultado não vai ao cache."""
+    confidential = key is None
+    glossary = profile_glossary(profile, source_language, target_language, style)
+    # Post-edições aceitas do perfil parecidas com o segmento, como few-shot
+    examples = ()
+    if db is not None and profile is not None and not confidential:
+        examples = tuple(example_store.retrieve(db, profile.profile_id, source_language, target_language, text))
+    decision = route_segment(text, style, glossary)
+    routing_metrics.record_route(decision)
+    translated_text, tier = await _call_routed(
+        decision.tier, text, source_language, target_language, formality, style, profile, examples
+    )
+    if QUALITY_REVIEW:
+        translated_text, tier = await _quality_pass(
+            text, translated_text, tier, source_language, target_language, formality, style, profile, glossary
+        )
+    if key is not None:
+        translation_cache.set(key, translated_text)
+    return translated_text, tier
+
+async def _call_routed(tier: str, text: str, source_language: str, target_language: str,
+                       formality: str, style: str, profile: Optional[ProfileSpec] = None,
+                       examples: Tuple[Tuple[str, str], ...] = ()) -> Tuple[str, str]:
+    """
+    Chama o modelo do nível; se falhar, tenta uma vez num nível acima com
+    outro modelo (fallback_tier) ou, sem nenhum, repassa o erro. Retorna o
+    texto e o nível usado.
+    """
+    started = time.perf_counter()
+    try:
+        translated_text = await _call_openai(
+            text, source_language, target_language, formality, style, profile,
+            model=TIER_MODELS[tier], examples=examples
+        )
+    except Exception:
+        routing_metrics.record_call(tier, text, time.perf_counter() - started, ok=False)
+        fallback = fallback_tier(tier)
+        if fallback is None:
+            raise
+        logger.warning(f"Modelo do nível {tier} falhou; tentando o nível {fallback}")
+        routing_metrics.record_fallback(tier)
+        return await _call_routed(fallback, text, source_language, target_language, formality, style,
+                                  profile, examples)
+    routing_metrics.record_call(tier, text, time.perf_counter() - started, ok=True)
+    return translated_text, tier
+
+async def _quality_pass(text: str, draft: str, tier: str, source_language: str, target_language: str,
+                        formality: str, style: str, profile: Optional[ProfileSpec] = None,
+                        glossary: Tuple[Tuple[str, str], ...] = ()) -> Tuple[str, str]:
+    """
+    Avalia a tradução com verificações locais e só manda para o modelo
+    premium os segmentos sinalizados, junto com os problemas encontrados.
+    Fica a versão com a melhor nota. Se o premium é o mesmo modelo que fez o
+    rascunho, não há revisão: só se mede a qualidade.
+    """
+    report = estimate_quality(text, draft, source_language, target_language, glossary)
+    quality_metrics.record(report)
+    if not report.revision_needed or same_model(PREMIUM, tier):
+        return draft, tier
+
+    logger.info(f"Tradução sinalizada (nota {report.score}: {', '.join(report.codes)}); revisando")
+    routing_metrics.record_escalation(tier)
+    started = time.perf_counter()
+    try:
+        revised = await _call_openai(
+            text, source_language, target_language, formality, style, profile,
+            model=TIER_MODELS[PREMIUM], draft=draft, issues=review_instructions(report)
+        )
+    except Exception as e:
+        routing_metrics.record_call(PREMIUM, text, time.perf_counter() - started, ok=False)
+        logger.warning(f"Revisão falhou, mantendo a primeira tradução: {str(e)}")
+        return draft, tier
+    routing_metrics.record_call(PREMIUM, text, time.perf_counter() - started, ok=True)
+    after = estimate_quality(text, revised, source_language, target_language, glossary)
+    quality_metrics.record_review(text, report, after)
+    if after.score >= report.score:
+        return revised, PREMIUM
+    return draft, tier
+
+def dominant_model(model_usage: Counter) -> Optional[str]:
+    """Modelo que traduziu a maior parte do texto (None se tudo veio do cache)."""
+    return model_usage.most_common(1)[0][0] if model_usage else None
+
+async def _call_openai(text: str, source_language: str, target_language: str, formality: str, style: str,
+                       profile: Optional[ProfileSpec] = None, model: Optional[str] = None,
+                       draft: Optional[str] = None, issues: Optional[str] = None,
+                       examples: Tuple[Tuple[str, str], ...] = ()) -> str:
+    """Chamada efetiva à API da OpenAI para um segmento (ou para revisar `draft`)."""
+    try:
+        # Prompt de sistema compilado uma vez por perfil/par/formalidade/estilo
+        prompt = compile_prompt(source_language, target_language, formality, style, profile)
+        if draft is None:
+            messages = prompt.messages(text, examples)
+        else:
+            messages = prompt.review_messages(text, draft, issues or '')
+
         # Criar uma função parcial para a chamada da API
         api_call = partial(
-            client.chat.completions.create,
-            model="gpt-4o",  # ou "gpt-3.5-turbo" para um modelo mais rápido e econômico
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            get_client().chat.completions.create,
+            model=model or TIER_MODELS[STANDARD],
+            messages=messages,
             temperature=0.13,  # Menor temperatura para traduções mais precisas
             max_tokens=2000,  # Ajustar conforme necessário
         )
         
-        # Executar a chamada da API em um thread separado
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, api_call)
+        # Custo estimado (prompt + exemplos/rascunho + saída) para a cota e a fila justa do cliente
+        cost = prompt.prefix_tokens + 2 * estimate_tokens(text) + sum(
+            estimate_tokens(message["content"]) for message in messages[1:-1]
+        ) + (estimate_tokens(draft) if draft else 0)
+
+        # Executar a chamada da API em um thread separado (to_thread leva junto
+        # o contexto, e com ele a marcação de texto confidencial para os logs)
+        async with fair_scheduler.slot(cost):
+            response = await asyncio.to_thread(api_call)
+        usage = getattr(response, "usage", None)
+        prompt_metrics.record(prompt, usage)
+        if getattr(usage, "total_tokens", None):
+            fair_scheduler.settle(cost, usage.total_tokens)
         
         # Extrair a tradução da resposta
         translated_text = response.choices[0].message.content.strip()
@@ -70,6 +339,5 @@ Maintain the original meaning while adapting the translation according to these
         return translated_text
         
     except Exception as e:
-        logger.error(f"Erro durante a tradução: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(f"Erro na chamada à API da OpenAI: {str(e)}")
         raise
@@ -0,0 +1,229 @@
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, aliased
+
+from document_processor import paragraph_hash
+from models import Chapter, ParagraphHash
+from services.chapter_service import get_paragraph_translations, set_paragraph_translations
+from services.event_service import publish_chapter_progress
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Traduzir uma vez os parágrafos repetidos e copiar o resultado para as demais ocorrências
+PARAGRAPH_DEDUP = os.getenv("PARAGRAPH_DEDUP", "true").lower() in ("1", "true", "yes")
+# Hashes por consulta ao procurar repetições no acervo (limite de parâmetros do banco)
+DEDUP_QUERY_BATCH = 500
+
+
+class Occurrences:
+    """
+    Parágrafos agrupados pelo hash do conteúdo normalizado: o primeiro de
+    cada grupo é o representante, traduzido uma vez; o resultado vale para
+    todas as ocorrências.
+    """
+
+    def __init__(self, paragraphs: List[str], indices: Iterable[int], enabled: bool = PARAGRAPH_DEDUP):
+        self.groups: Dict[int, List[int]] = {}
+        self.hashes: Dict[int, str] = {}
+        representatives: Dict[str, int] = {}
+        for index in indices:
+            content_hash = paragraph_hash(paragraphs[index])
+            representative = representatives.setdefault(content_hash, index) if enabled else index
+            self.groups.setdefault(representative, []).append(index)
+            self.hashes.setdefault(representative, content_hash)
+
+    @property
+    def representatives(self) -> List[int]:
+        return list(self.groups)
+
+    @property
+    def collapsed(self) -> int:
+        """Parágrafos que não viram tarefa própria."""
+        return sum(len(group) - 1 for group in self.groups.values())
+
+    def group_of(self, index: int) -> List[int]:
+        return self.groups.get(index, [index])
+
+    def expand(self, updates: Dict[int, str], within: Optional[Set[int]] = None) -> Dict[int, str]:
+        """Resultados dos representantes copiados para as ocorrências (só as de `within`, se informado)."""
+        return {
+            index: text
+            for representative, text in updates.items()
+            for index in self.group_of(representative)
+            if within is None or index in within
+        }
+
+    def by_hash(self, updates: Dict[int, str]) -> Dict[str, str]:
+        return {self.hashes[representative]: text for representative, text in updates.items()}
+
+
+def ensure_paragraph_index(db: Session, chapter: Chapter, paragraphs: List[str]) -> None:
+    """Capítulos gravados antes do índice são indexados no primeiro job de tradução."""
+    if chapter.document.is_confidential or not paragraphs:
+        return
+    if db.query(ParagraphHash.id).filter(ParagraphHash.chapter_id == chapter.id).first() is not None:
+        return
+    db.add_all(
+        ParagraphHash(document_id=chapter.document_id, chapter_id=chapter.id, position=position,
+                      content_hash=paragraph_hash(paragraph))
+        for position, paragraph in enumerate(paragraphs)
+    )
+    db.commit()
+
+
+def shared_hashes(db: Session, chapter: Chapter) -> Set[str]:
+    """Hashes de parágrafos deste capítulo que se repetem em outros capítulos do documento."""
+    mine, other = aliased(ParagraphHash), aliased(ParagraphHash)
+    rows = (
+        db.query(other.content_hash)
+        .join(mine, and_(mine.document_id == other.document_id, mine.content_hash == other.content_hash))
+        .filter(mine.chapter_id == chapter.id, other.chapter_id != chapter.id)
+        .distinct()
+    )
+    return {row[0] for row in rows}
+
+
+def lock_translations(db: Session, chapter: Chapter) -> None:
+    """
+    Relê as traduções do capítulo com lock de linha antes de gravar um lote:
+    preserva o que outro job copiou para cá enquanto este traduzia.
+    """
+    db.refresh(chapter, ["translated_content"], with_for_update=True)
+
+
+def fan_out(db: Session, chapter: Chapter, language: str, translations: Dict[str, str],
+            job_id: Optional[int] = None) -> int:
+    """
+    Copia traduções (hash -> texto) para os parágrafos iguais, ainda sem
+    tradução no idioma, dos outros capítulos do documento. Cada capítulo é
+    relido com lock de linha e gravado na sua própria transação.
+    """
+    if not translations:
+        return 0
+    rows = (
+        db.query(ParagraphHash.chapter_id, ParagraphHash.position, ParagraphHash.content_hash)
+        .filter(
+            ParagraphHash.document_id == chapter.document_id,
+            ParagraphHash.content_hash.in_(list(translations)),
+            ParagraphHash.chapter_id != chapter.id,
+        )
+        .all()
+    )
+    targets: Dict[int, Dict[int, str]] = {}
+    for chapter_id, position, content_hash in rows:
+        targets.setdefault(chapter_id, {})[position] = translations[content_hash]
+
+    written = 0
+    # Ordem fixa de lock entre jobs concorrentes
+    for chapter_id, updates in sorted(targets.items()):
+        other = (
+            db.query(Chapter).filter(Chapter.id == chapter_id)
+            .with_for_update().populate_existing().one_or_none()
+        )
+        if other is None:
+            continue
+        current = get_paragraph_translations(other, language)
+        missing = {
+            index: text for index, text in updates.items() if index < len(current) and current[index] is None
+        }
+        if missing:
+            set_paragraph_translations(other, language, missing)
+            publish_chapter_progress(db, other, language, missing, job_id)
+            written += len(missing)
+        db.commit()
+    if written:
+        dedup_metrics.record_fan_out(written)
+        logger.info(f"Capítulo {chapter.id}: {written} parágrafo(s) repetido(s) copiados para outros capítulos")
+    return written
+
+
+def dedup_stats(db: Session, hashes: List[str], document_id: Optional[int] = None, corpus: bool = True) -> Dict:
+    """
+    Repetição de um upload: parágrafos iguais dentro do documento e
+    conteúdos que já aparecem em outros documentos do acervo.
+    `translation_units` é o que sobra como trabalho novo e `dedup_ratio` a
+    fração dos parágrafos que não precisa de tarefa própria.
+    """
+    unique = list(dict.fromkeys(hashes))
+    in_corpus: Set[str] = set()
+    if corpus:
+        for start in range(0, len(unique), DEDUP_QUERY_BATCH):
+            query = db.query(ParagraphHash.content_hash).filter(
+                ParagraphHash.content_hash.in_(unique[start:start + DEDUP_QUERY_BATCH])
+            )
+            if document_id is not None:
+                query = query.filter(ParagraphHash.document_id != document_id)
+            in_corpus.update(row[0] for row in query.distinct())
+    units = len(unique) - len(in_corpus)
+    total = len(hashes)
+    stats = {
+        "paragraphs": total,
+        "unique_paragraphs": len(unique),
+        "repeated_in_document": total - len(unique),
+        "found_in_corpus": len(in_corpus) if corpus else None,
+        "translation_units": units,
+        "dedup_ratio": round(1 - units / total, 4) if total else 0.0,
+    }
+    dedup_metrics.record_upload(stats)
+    return stats
+
+
+def processed_hashes(processed_data: Dict) -> List[str]:
+    """Hashes de todos os parágrafos do resultado do DocumentProcessor, em ordem."""
+    return [
+        paragraph_hash(paragraph)
+        for chapter in processed_data.get("chapters", [])
+        for paragraph in chapter.get("paragraphs", [])
+    ]
+
+
+class DedupMetrics:
+    """Uploads analisados e tarefas de tradução evitadas pela deduplicação."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.paragraphs = 0
+        self.translation_units = 0
+        self.collapsed = 0
+        self.fanned_out = 0
+        self.coalesced_calls = 0
+
+    def record_upload(self, stats: Dict) -> None:
+        with self._lock:
+            self.uploads += 1
+            self.paragraphs += stats["paragraphs"]
+            self.translation_units += stats["translation_units"]
+
+    def record_collapsed(self, paragraphs: int) -> None:
+        with self._lock:
+            self.collapsed += paragraphs
+
+    def record_fan_out(self, paragraphs: int) -> None:
+        with self._lock:
+            self.fanned_out += paragraphs
+
+    def record_coalesced(self) -> None:
+        with self._lock:
+            self.coalesced_calls += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": PARAGRAPH_DEDUP,
+                "uploads": self.uploads,
+                "paragraphs": self.paragraphs,
+                "translation_units": self.translation_units,
+                "dedup_ratio": round(1 - self.translation_units / self.paragraphs, 4) if self.paragraphs else 0.0,
+                "collapsed_in_chapter": self.collapsed,
+                "fanned_out_to_chapters": self.fanned_out,
+                "coalesced_api_calls": self.coalesced_calls,
+            }
+
+
+dedup_metrics = DedupMetrics()
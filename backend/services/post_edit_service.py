@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from edit_distance import edit_stats
+from models import Translation, TranslationRevision
+from services.confidential import PLAINTEXT, PlainCipher, translation_cipher
+from services.example_retrieval import example_store
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Agrupamentos aceitos nos agregados de esforço
+GROUP_COLUMNS = {
+    "profile": Translation.translator_profile_id,
+    "model": Translation.model_used,
+    "target_language": Translation.target_language,
+}
+
+
+def submit_revision(db: Session, translation: Translation, revised_text: str,
+                    revision_type: str = "manual", revision_comments: Optional[str] = None,
+                    time_spent: Optional[int] = None, accepted_changes: bool = True) -> TranslationRevision:
+    """
+    Grava a post-edição de uma tradução. A distância é sempre medida contra
+    a saída da máquina (translated_text), então a última revisão mede o
+    esforço total, não só o da última rodada. Revisões de traduções
+    confidenciais são gravadas cifradas.
+    """
+    cipher = translation_cipher(translation)
+    stats = edit_stats(cipher.decrypt(translation.translated_text), revised_text)
+    revision = TranslationRevision(
+        translation_id=translation.id,
+        revised_text=cipher.encrypt(revised_text),
+        revision_type=revision_type,
+        revision_comments=revision_comments,
+        time_spent=time_spent,
+        accepted_changes=accepted_changes,
+        edit_distance=stats.char_distance,
+        word_edit_distance=stats.word_distance,
+        revised_chars=stats.chars,
+        revised_words=stats.words,
+    )
+    db.add(revision)
+    translation.has_been_edited = stats.char_distance > 0
+    translation.edit_distance = stats.char_distance
+    db.commit()
+    db.refresh(revision)
+    example_store.add_revision(revision, translation)
+    logger.info(
+        f"Revisão da tradução {translation.id}: {stats.char_distance} caracteres, "
+        f"{stats.word_distance} palavras editadas"
+    )
+    return revision
+
+
+def serialize_revision(revision: TranslationRevision, cipher: PlainCipher = PLAINTEXT) -> Dict:
+    data = {column.name: getattr(revision, column.name) for column in TranslationRevision.__table__.columns}
+    data["revised_text"] = cipher.decrypt(revision.revised_text)
+    return data
+
+
+def revision_stats(db: Session, group_by: str = "profile", since: Optional[datetime] = None,
+                   document_id: Optional[int] = None) -> List[Dict]:
+    """
+    Esforço de post-edição por perfil, modelo ou idioma: distâncias da
+    última revisão de cada tradução somadas e normalizadas pelo tamanho
+    do texto revisado, mais o tempo gasto por 100 palavras.
+    """
+    key = GROUP_COLUMNS[group_by]
+    latest = (
+        db.query(func.max(TranslationRevision.id))
+        .group_by(TranslationRevision.translation_id)
+        .scalar_subquery()
+    )
+    # O tempo soma todas as rodadas de revisão de cada tradução
+    timed = (
+        db.query(
+            TranslationRevision.translation_id.label("translation_id"),
+            func.sum(TranslationRevision.time_spent).label("seconds"),
+        )
+        .filter(TranslationRevision.time_spent.isnot(None))
+        .group_by(TranslationRevision.translation_id)
+        .subquery()
+    )
+    query = (
+        db.query(
+            key,
+            func.count(TranslationRevision.id),
+            func.sum(case((TranslationRevision.edit_distance > 0, 1), else_=0)),
+            func.sum(TranslationRevision.edit_distance),
+            func.sum(TranslationRevision.word_edit_distance),
+            func.sum(TranslationRevision.revised_chars),
+            func.sum(TranslationRevision.revised_words),
+            func.sum(timed.c.seconds),
+            # Palavras só das traduções com tempo informado, para o ritmo
+            func.sum(case((timed.c.seconds.isnot(None), TranslationRevision.revised_words), else_=0)),
+        )
+        .join(Translation, Translation.id == TranslationRevision.translation_id)
+        .outerjoin(timed, timed.c.translation_id == TranslationRevision.translation_id)
+        .filter(TranslationRevision.id.in_(latest))
+    )
+    totals = db.query(key, func.count(Translation.id))
+    if since is not None:
+        query = query.filter(TranslationRevision.created_at >= since)
+        totals = totals.filter(Translation.created_at >= since)
+    if document_id is not None:
+        query = query.filter(Translation.document_id == document_id)
+        totals = totals.filter(Translation.document_id == document_id)
+    delivered = dict(totals.group_by(key).all())
+
+    groups = []
+    for value, reviewed, edited, chars_edited, words_edited, chars, words, seconds, timed_words \
+            in query.group_by(key):
+        groups.append({
+            group_by: value,
+            "translations": delivered.get(value, reviewed),
+            "reviewed": reviewed,
+            "edited": edited,
+            "edited_share": round(edited / reviewed, 4) if reviewed else 0.0,
+            "char_distance": chars_edited or 0,
+            "word_distance": words_edited or 0,
+            "char_rate": round((chars_edited or 0) / chars, 4) if chars else 0.0,
+            "word_rate": round((words_edited or 0) / words, 4) if words else 0.0,
+            "time_spent": seconds or 0,
+            "seconds_per_100_words": round(100 * seconds / timed_words, 1) if seconds and timed_words else None,
+        })
+    return groups
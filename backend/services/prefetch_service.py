@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from models import Chapter, ChapterPrefetch, Document, Job
+from services.chapter_service import get_paragraph_translations
+from services.confidential import document_cipher
+from services.job_queue import PRIORITY_LOW, PRIORITY_NORMAL, enqueue_job, fair_orders, translation_cost, utcnow
+from services.tenant_scheduler import Tenant
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Máximo de capítulos à frente que um pedido pode antecipar
+PREFETCH_MAX_CHAPTERS = int(os.getenv("PREFETCH_MAX_CHAPTERS", "3"))
+# Caracteres ainda não lidos que podem estar pré-traduzidos por documento
+PREFETCH_CHAR_BUDGET = int(os.getenv("PREFETCH_CHAR_BUDGET", "60000"))
+# Antecipações não usadas depois deste tempo (s) deixam de ocupar o orçamento
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", "1800"))
+
+# Campos do payload que precisam coincidir para a tradução antecipada servir ao pedido
+OPTION_FIELDS = ("source_language", "formality_level", "style", "granularity", "translator_profile_id")
+
+
+def options_key(payload: Dict) -> str:
+    options = {field: payload.get(field) for field in OPTION_FIELDS}
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _pending_characters(chapter: Chapter, target_language: str) -> int:
+    """Tamanho dos parágrafos do capítulo ainda sem tradução no idioma."""
+    translations = get_paragraph_translations(chapter, target_language)
+    paragraphs = document_cipher(chapter.document).decrypt_list(chapter.content or [])
+    return sum(len(text) for text, translated in zip(paragraphs, translations) if translated is None)
+
+
+def _expire(db: Session, document_id: int) -> None:
+    """Antecipações antigas que o leitor nunca abriu liberam o orçamento."""
+    cutoff = utcnow() - timedelta(seconds=PREFETCH_TTL)
+    db.execute(
+        update(ChapterPrefetch)
+        .where(
+            ChapterPrefetch.document_id == document_id,
+            ChapterPrefetch.status == "active",
+            ChapterPrefetch.created_at < cutoff,
+        )
+        .values(status="expired")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _cancel_job(db: Session, job_id: Optional[int]) -> None:
+    """Cancela o job de uma antecipação. Se já estiver rodando, o worker para no próximo lote."""
+    if job_id is None:
+        return
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_(("queued", "running")))
+        .values(status="cancelled", finished_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def consume_prefetch(db: Session, chapter: Chapter, target_language: str, key: str,
+                     reusable: bool, record_miss: bool) -> Optional[Job]:
+    """
+    Registra que o leitor pediu a tradução de um capítulo e classifica a
+    antecipação: 'hit' (já traduzido), 'late' (job ainda na fila ou
+    rodando) ou 'miss' (nada antecipado). No caso 'late' com as mesmas
+    opções, o job antecipado é promovido à prioridade normal e devolvido
+    para ser usado no lugar de um novo, evitando traduzir duas vezes.
+    """
+    prefetch = (
+        db.query(ChapterPrefetch)
+        .filter(
+            ChapterPrefetch.chapter_id == chapter.id,
+            ChapterPrefetch.target_language == target_language,
+            ChapterPrefetch.status == "active",
+        )
+        .order_by(ChapterPrefetch.id.desc())
+        .first()
+    )
+    now = utcnow()
+    if prefetch is None:
+        if record_miss:
+            db.add(ChapterPrefetch(
+                document_id=chapter.document_id, chapter_id=chapter.id, target_language=target_language,
+                options_key=key, characters=0, status="consumed", outcome="miss", consumed_at=now,
+            ))
+        return None
+
+    job = db.get(Job, prefetch.job_id) if prefetch.job_id else None
+    prefetch.status = "consumed"
+    prefetch.consumed_at = now
+    if prefetch.options_key != key or job is None or job.status in ("dead", "cancelled"):
+        prefetch.outcome = "miss"
+        if job is not None:
+            _cancel_job(db, job.id)
+        return None
+    if job.status == "completed":
+        prefetch.outcome = "hit"
+        return None
+
+    prefetch.outcome = "late"
+    if not reusable:
+        return None
+    if job.status == "queued" and job.priority > PRIORITY_NORMAL:
+        job.priority = PRIORITY_NORMAL
+        logger.info(f"Job antecipado {job.id} promovido: o leitor chegou ao capítulo {chapter.id}")
+    return job
+
+
+def schedule_prefetch(db: Session, document: Document, after_order: int, count: int,
+                      payload: Dict, tenant: Optional[Tenant] = None) -> List[Dict]:
+    """
+    Enfileira em prioridade baixa a tradução dos próximos `count`
+    capítulos depois de `after_order`, respeitando o orçamento de
+    caracteres do documento. Jobs visíveis (prioridade normal) sempre
+    são pegos antes pelos workers.
+    """
+    count = max(0, min(count, PREFETCH_MAX_CHAPTERS))
+    if not count:
+        return []
+    target_language = payload["target_language"]
+    key = options_key(payload)
+    _expire(db, document.id)
+
+    in_flight = dict(
+        db.query(ChapterPrefetch.chapter_id, ChapterPrefetch.options_key)
+        .filter(
+            ChapterPrefetch.document_id == document.id,
+            ChapterPrefetch.target_language == target_language,
+            ChapterPrefetch.status == "active",
+        )
+        .all()
+    )
+    spent = (
+        db.query(func.coalesce(func.sum(ChapterPrefetch.characters), 0))
+        .filter(ChapterPrefetch.document_id == document.id, ChapterPrefetch.status == "active")
+        .scalar()
+    )
+
+    chapters = (
+        db.query(Chapter)
+        .filter(Chapter.document_id == document.id, Chapter.order > after_order)
+        .order_by(Chapter.order)
+        .limit(count)
+        .all()
+    )
+    scheduled = []
+    for chapter in chapters:
+        if in_flight.get(chapter.id) == key:
+            continue
+        characters = _pending_characters(chapter, target_language)
+        if not characters:
+            continue
+        if spent + characters > PREFETCH_CHAR_BUDGET:
+            logger.info(f"Orçamento de prefetch do documento {document.id} esgotado ({spent} caracteres)")
+            break
+        job = enqueue_job(
+            db,
+            "translate_chapter",
+            dict(payload, chapter_id=chapter.id, start_paragraph=None, end_paragraph=None,
+                 force=False, prefetch=True),
+            document_id=document.id,
+            priority=PRIORITY_LOW,
+            commit=False,
+            tenant=tenant,
+            fair_order=fair_orders(db, tenant, [translation_cost(characters)])[0]
+        )
+        db.flush()
+        db.add(ChapterPrefetch(
+            document_id=document.id, chapter_id=chapter.id, job_id=job.id, target_language=target_language,
+            options_key=key, characters=characters, status="active",
+        ))
+        spent += characters
+        scheduled.append({"chapter_id": chapter.id, "chapter_order": chapter.order, "job_id": job.id})
+    return scheduled
+
+
+def cancel_prefetch(db: Session, document_id: int, target_language: Optional[str] = None) -> int:
+    """Cancela as antecipações ainda não usadas (o leitor saiu do documento)."""
+    query = db.query(ChapterPrefetch).filter(
+        ChapterPrefetch.document_id == document_id, ChapterPrefetch.status == "active"
+    )
+    if target_language:
+        query = query.filter(ChapterPrefetch.target_language == target_language)
+    prefetches = query.all()
+    for prefetch in prefetches:
+        prefetch.status = "cancelled"
+        _cancel_job(db, prefetch.job_id)
+    db.commit()
+    if prefetches:
+        logger.info(f"{len(prefetches)} antecipação(ões) do documento {document_id} canceladas")
+    return len(prefetches)
+
+
+def prefetch_stats(db: Session, document_id: Optional[int] = None) -> Dict:
+    """
+    Taxa de acerto: fração dos capítulos pedidos em modo prefetch que já
+    estavam traduzidos. 'late' conta à parte (a espera foi só reduzida).
+    """
+    query = db.query(ChapterPrefetch.status, ChapterPrefetch.outcome,
+                     func.count(ChapterPrefetch.id), func.coalesce(func.sum(ChapterPrefetch.characters), 0))
+    if document_id is not None:
+        query = query.filter(ChapterPrefetch.document_id == document_id)
+    outcomes: Dict[str, int] = {"hit": 0, "late": 0, "miss": 0}
+    statuses: Dict[str, int] = {}
+    characters: Dict[str, int] = {}
+    for status, outcome, count, chars in query.group_by(ChapterPrefetch.status, ChapterPrefetch.outcome):
+        statuses[status] = statuses.get(status, 0) + count
+        characters[status] = characters.get(status, 0) + chars
+        if outcome:
+            outcomes[outcome] += count
+
+    requests = sum(outcomes.values())
+    return {
+        "chapter_requests": requests,
+        **outcomes,
+        "hit_rate": round(outcomes["hit"] / requests, 4) if requests else 0.0,
+        "useful_rate": round((outcomes["hit"] + outcomes["late"]) / requests, 4) if requests else 0.0,
+        "active": statuses.get("active", 0),
+        "active_characters": characters.get("active", 0),
+        "wasted": statuses.get("cancelled", 0) + statuses.get("expired", 0),
+        "budget_characters": PREFETCH_CHAR_BUDGET,
+    }
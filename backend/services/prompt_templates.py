@@ -0,0 +1,293 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import TranslatorProfile
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Janela em que o provedor mantém um prefixo em cache (estimativa de economia)
+PROMPT_CACHE_WINDOW = int(os.getenv("PROMPT_CACHE_WINDOW", "300"))
+
+FORMALITY_GUIDELINES = {
+    'formal': 'formal language, avoiding colloquialisms',
+    'neutral': 'balanced and natural language',
+    'informal': 'casual and conversational language',
+}
+
+STYLE_GUIDELINES = {
+    'general': 'clear and straightforward language',
+    'technical': 'precise technical terminology and clear structure',
+    'literary': 'elegant and expressive language',
+    'academic': 'scholarly and methodical approach',
+}
+
+# Parte fixa, idêntica byte a byte em todas as chamadas: vem primeiro para
+# que o cache de prompt do provedor reaproveite o maior prefixo possível
+STATIC_PREFIX = """You are a professional translator.
+Follow these rules for every text you receive:
+- Maintain the original meaning while adapting the translation according to the settings below
+- Markup: keep inline tags such as <g1>...</g1> exactly as they are, around the corresponding translated words
+"""
+
+USER_TEMPLATE = "Text to translate:\n{text}"
+# Segunda passada: mesmo prompt de sistema (prefixo em cache), rascunho e problemas no fim
+REVIEW_TEMPLATE = (
+    "Text to translate:\n{text}\n\n"
+    "A previous translation of this text has these problems:\n{issues}\n\n"
+    "Previous translation:\n{draft}\n\n"
+    "Return only the corrected translation."
+)
+
+# Chaves aceitas em TranslatorProfile.preferred_style
+PROFILE_KEYS = {'formality', 'style', 'instructions', 'glossary', 'templates'}
+TEMPLATE_KEYS = {'instructions', 'glossary'}
+# "en-pt", "en-pt:literary" ou "*:technical"
+TEMPLATE_KEY = re.compile(r'^(?:\w+(?:-\w+)+(?::\w+)?|\*:\w+)$')
+MAX_INSTRUCTIONS = 2000
+
+
+class PromptTemplateError(ValueError):
+    """Configuração de template inválida no perfil do tradutor."""
+
+
+class TemplateSpec(NamedTuple):
+    instructions: str
+    glossary: Tuple[Tuple[str, str], ...]
+
+
+class ProfileSpec(NamedTuple):
+    """Perfil validado e imutável (hashable), usado como chave dos templates compilados."""
+    profile_id: int
+    version: str
+    formality: Optional[str]
+    style: Optional[str]
+    base: TemplateSpec
+    templates: Tuple[Tuple[str, TemplateSpec], ...]
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.profile_id}@{self.version}"
+
+
+class CompiledPrompt(NamedTuple):
+    system: str
+    prefix_hash: str
+    prefix_tokens: int
+
+    def messages(self, text: str, examples: Tuple[Tuple[str, str], ...] = ()) -> list:
+        """Exemplos (origem, tradução revisada) entram como turnos depois do prefixo fixo."""
+        messages = [{"role": "system", "content": self.system}]
+        for source, target in examples:
+            messages.append({"role": "user", "content": USER_TEMPLATE.format(text=source)})
+            messages.append({"role": "assistant", "content": target})
+        messages.append({"role": "user", "content": USER_TEMPLATE.format(text=text)})
+        return messages
+
+    def review_messages(self, text: str, draft: str, issues: str) -> list:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": REVIEW_TEMPLATE.format(text=text, draft=draft, issues=issues)},
+        ]
+
+
+def _validate_template(data: Any, where: str) -> TemplateSpec:
+    if not isinstance(data, dict):
+        raise PromptTemplateError(f"{where}: esperado um objeto")
+    unknown = set(data) - TEMPLATE_KEYS - (PROFILE_KEYS if where == 'preferred_style' else set())
+    if unknown:
+        raise PromptTemplateError(f"{where}: chaves desconhecidas {sorted(unknown)}")
+
+    instructions = data.get('instructions') or ''
+    if not isinstance(instructions, str):
+        raise PromptTemplateError(f"{where}.instructions: esperado texto")
+    if len(instructions) > MAX_INSTRUCTIONS:
+        raise PromptTemplateError(f"{where}.instructions: máximo de {MAX_INSTRUCTIONS} caracteres")
+
+    glossary = data.get('glossary') or {}
+    if not isinstance(glossary, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) and k.strip() and v.strip() for k, v in glossary.items()
+    ):
+        raise PromptTemplateError(f"{where}.glossary: esperado objeto termo -> tradução")
+    return TemplateSpec(instructions.strip(), tuple(sorted((k.strip(), v.strip()) for k, v in glossary.items())))
+
+
+def validate_preferred_style(preferred_style: Optional[Dict], profile_id: int = 0,
+                             version: str = '') -> ProfileSpec:
+    """Valida o JSON de estilo do perfil; levanta PromptTemplateError se inválido."""
+    data = preferred_style or {}
+    base = _validate_template(data, 'preferred_style')
+
+    formality, style = data.get('formality'), data.get('style')
+    if formality is not None and formality not in FORMALITY_GUIDELINES:
+        raise PromptTemplateError(f"formality deve ser um de {sorted(FORMALITY_GUIDELINES)}")
+    if style is not None and (not isinstance(style, str) or not style):
+        raise PromptTemplateError("style deve ser texto")
+
+    templates = data.get('templates') or {}
+    if not isinstance(templates, dict):
+        raise PromptTemplateError("templates: esperado objeto")
+    compiled = []
+    for key, template in templates.items():
+        if not TEMPLATE_KEY.match(key):
+            raise PromptTemplateError(
+                f"templates.{key}: use 'origem-destino', 'origem-destino:estilo' ou '*:estilo'"
+            )
+        compiled.append((key, _validate_template(template, f"templates.{key}")))
+    return ProfileSpec(profile_id, version, formality, style, base, tuple(sorted(compiled)))
+
+
+def load_profile_spec(db: Session, profile_id: Optional[int]) -> Optional[ProfileSpec]:
+    """Carrega e valida o perfil; a versão (updated_at) invalida os templates compilados."""
+    if profile_id is None:
+        return None
+    profile = db.get(TranslatorProfile, profile_id)
+    if profile is None:
+        raise PromptTemplateError(f"Perfil de tradutor {profile_id} não encontrado")
+    version = (profile.updated_at or profile.created_at)
+    return validate_preferred_style(profile.preferred_style, profile.id, version.isoformat() if version else '')
+
+
+def resolve_options(profile: Optional[ProfileSpec], formality: Optional[str],
+                    style: Optional[str]) -> Tuple[str, str]:
+    """Formalidade e estilo efetivos: pedido > padrão do perfil > padrão global."""
+    return (
+        formality or (profile.formality if profile else None) or 'neutral',
+        style or (profile.style if profile else None) or 'general',
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Conta tokens com o tiktoken se instalado; senão estima ~4 caracteres por token."""
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("o200k_base")
+
+
+def _profile_layers(profile: ProfileSpec, source_language: str, target_language: str,
+                    style: str) -> List[TemplateSpec]:
+    """Camadas do perfil que valem para o par/estilo, do mais genérico ao mais específico."""
+    pair = f"{source_language}-{target_language}"
+    layers = [profile.base]
+    by_key = dict(profile.templates)
+    for key in (f"*:{style}", pair, f"{pair}:{style}"):
+        if key in by_key:
+            layers.append(by_key[key])
+    return layers
+
+
+@lru_cache(maxsize=512)
+def profile_glossary(profile: Optional[ProfileSpec], source_language: str, target_language: str,
+                     style: str) -> Tuple[Tuple[str, str], ...]:
+    """Glossário efetivo do perfil para o par/estilo; o mais específico prevalece."""
+    glossary: Dict[str, str] = {}
+    if profile is not None:
+        for layer in _profile_layers(profile, source_language, target_language, style):
+            glossary.update(layer.glossary)
+    return tuple(sorted(glossary.items()))
+
+
+@lru_cache(maxsize=512)
+def compile_prompt(source_language: str, target_language: str, formality: str, style: str,
+                   profile: Optional[ProfileSpec] = None) -> CompiledPrompt:
+    """
+    Monta o prompt de sistema de uma combinação perfil/par/estilo uma única
+    vez. O resultado é o mesmo objeto a cada chamada, então o prefixo
+    enviado à API é idêntico byte a byte.
+    """
+    lines = [
+        STATIC_PREFIX,
+        "Settings:",
+        # Origem "auto": a detecção local não foi conclusiva (texto curto)
+        f"- Translate from {source_language} to {target_language}" if source_language != 'auto'
+        else f"- Identify the source language and translate to {target_language}",
+        f"- Formality: Use a {formality} tone (e.g. {FORMALITY_GUIDELINES.get(formality, FORMALITY_GUIDELINES['informal'])})",
+        f"- Style: Follow a {style} style (e.g. {STYLE_GUIDELINES.get(style, STYLE_GUIDELINES['general'])})",
+    ]
+
+    if profile is not None:
+        layers = _profile_layers(profile, source_language, target_language, style)
+        instructions = [layer.instructions for layer in layers if layer.instructions]
+        glossary = profile_glossary(profile, source_language, target_language, style)
+
+        if instructions:
+            lines.append("\nTranslator instructions:")
+            lines.extend(instructions)
+        if glossary:
+            lines.append("\nGlossary (always use these translations):")
+            lines.extend(f"- {term} => {translation}" for term, translation in glossary)
+
+    system = "\n".join(lines)
+    return CompiledPrompt(
+        system=system,
+        prefix_hash=hashlib.sha1(system.encode('utf-8')).hexdigest(),
+        prefix_tokens=estimate_tokens(system),
+    )
+
+
+class PromptMetrics:
+    """
+    Uso de tokens de prompt. `cached_tokens` vem do provedor quando a
+    resposta informa; `estimated_prefix_tokens_reused` soma o prefixo de
+    chamadas que repetiram um prompt de sistema dentro da janela de cache.
+    (O cache automático da OpenAI só vale para prefixos a partir de
+    ~1024 tokens, ou seja, perfis com instruções e glossário longos.)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen: Dict[str, float] = {}
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.estimated_prefix_tokens_reused = 0
+
+    def record(self, prompt: CompiledPrompt, usage: Any = None) -> None:
+        now = time.monotonic()
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) or 0
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached
+            last = self._last_seen.get(prompt.prefix_hash)
+            if last is not None and now - last <= PROMPT_CACHE_WINDOW:
+                self.estimated_prefix_tokens_reused += prompt.prefix_tokens
+            self._last_seen[prompt.prefix_hash] = now
+
+    def stats(self) -> dict:
+        info = compile_prompt.cache_info()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "estimated_prefix_tokens_reused": self.estimated_prefix_tokens_reused,
+                "prompt_tokens_saved": self.cached_tokens or self.estimated_prefix_tokens_reused,
+                "distinct_prefixes": len(self._last_seen),
+                "compiled_templates": info.currsize,
+                "compile_hits": info.hits,
+                "compile_misses": info.misses,
+            }
+
+
+prompt_metrics = PromptMetrics()
@@ -0,0 +1,241 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.language_detector import MIN_DETECTION_LETTERS, base_language, detect_language
+
+# Rodar a estimativa de qualidade e a segunda passada nos segmentos sinalizados
+QUALITY_REVIEW = os.getenv("QUALITY_REVIEW", "true").lower() in ("1", "true", "yes")
+# Abaixo desta nota o segmento é sinalizado para revisão
+QUALITY_THRESHOLD = float(os.getenv("QUALITY_THRESHOLD", "0.75"))
+# Confiança mínima para acusar que a tradução saiu no idioma errado
+WRONG_LANGUAGE_CONFIDENCE = 0.95
+# Segmentos mais curtos que isso não têm a razão de tamanho avaliada
+MIN_RATIO_CHARS = 30
+# Janela de palavras copiadas da origem que conta como trecho não traduzido
+UNTRANSLATED_NGRAM = 5
+UNTRANSLATED_SHARE = 0.3
+
+# Caracteres por unidade de conteúdo, relativo aos idiomas latinos
+SCRIPT_DENSITY = {'zh': 0.3, 'ja': 0.4, 'ko': 0.5}
+# Faixa aceitável da razão tamanho da tradução / tamanho esperado
+RATIO_BOUNDS = (0.5, 2.0)
+RATIO_EXTREME = 3.0
+
+_NUMBER = re.compile(r'\d+(?:[.,  ]\d{3})*(?:[.,]\d+)?')
+_URL = re.compile(r'https?://[^\s<>"]+[^\s<>".,;:!?)]|www\.[^\s<>"]+[^\s<>".,;:!?)]|[\w.+-]+@[\w-]+\.[\w.-]*\w')
+_PLACEHOLDER = re.compile(
+    r'</?g\d+>|\{\{\s*\w+\s*\}\}|\$\{\w+\}|\{\w*\}|%(?:\d+\$)?[sdif]'
+    r'|</?[a-zA-Z][\w-]*(?:\s+[\w:-]+(?:=(?:"[^"]*"|\'[^\']*\'|[^\s<>"\']+))?)*\s*/?>'
+)
+_WORD = re.compile(r'[^\W\d_]+')
+# Comentários do modelo no lugar (ou em volta) da tradução
+_META = re.compile(
+    r"^\s*(?:here(?:'s| is) the translation|translation\s*:|translated text\s*:|"
+    r"i'?m sorry|i cannot|i can't|as an ai|sure[,!]? here|tradução\s*:|aqui está a tradução|desculpe)",
+    re.IGNORECASE,
+)
+
+# Problemas que, sozinhos, já exigem revisão, e o desconto de cada um na nota
+CRITICAL = {'empty', 'meta_text', 'placeholders', 'wrong_language', 'untranslated'}
+PENALTIES = {
+    'meta_text': 0.4,
+    'placeholders': 0.4,
+    'wrong_language': 0.5,
+    'untranslated': 0.4,
+    'urls': 0.25,
+    'numbers': 0.1,       # por número ausente
+    'length_ratio': 0.2,
+    'glossary': 0.1,      # por termo não respeitado
+}
+MAX_REPEATED_PENALTY = 0.3
+
+
+class QualityIssue(NamedTuple):
+    code: str
+    detail: str
+
+
+class QualityReport(NamedTuple):
+    score: float
+    issues: Tuple[QualityIssue, ...]
+
+    @property
+    def revision_needed(self) -> bool:
+        return self.score < QUALITY_THRESHOLD or any(issue.code in CRITICAL for issue in self.issues)
+
+    @property
+    def codes(self) -> List[str]:
+        return [issue.code for issue in self.issues]
+
+    def as_dict(self) -> Dict:
+        return {
+            "quality_score": self.score,
+            "revision_needed": self.revision_needed,
+            "quality_issues": [issue._asdict() for issue in self.issues],
+        }
+
+    def translation_fields(self) -> Dict:
+        """Colunas de Translation preenchidas pela estimativa."""
+        return {
+            "quality_score": self.score,
+            "revision_needed": self.revision_needed,
+            "improvement_suggestions": [issue._asdict() for issue in self.issues] or None,
+        }
+
+
+def _digits(text: str) -> Counter:
+    """Números fora de URLs e marcações, só dígitos: 1,000.5 e 1.000,5 são o mesmo número."""
+    text = _PLACEHOLDER.sub(' ', _URL.sub(' ', text))
+    return Counter(re.sub(r'\D', '', number) for number in _NUMBER.findall(text))
+
+
+def _missing(source: Counter, translation: Counter) -> List[str]:
+    return sorted((source - translation).elements())
+
+
+def _length_ratio(source: str, translation: str, source_language: Optional[str],
+                  target_language: str) -> Optional[float]:
+    """Tamanho da tradução relativo ao esperado para o par (1.0 = o esperado)."""
+    if len(source.strip()) < MIN_RATIO_CHARS:
+        return None
+    expected = (SCRIPT_DENSITY.get(base_language(target_language), 1.0)
+                / SCRIPT_DENSITY.get(base_language(source_language), 1.0))
+    return len(translation.strip()) / len(source.strip()) / expected
+
+
+def _check_untranslated(source: str, translation: str) -> Optional[QualityIssue]:
+    """Sequências longas de palavras copiadas da origem (nomes próprios raramente passam de 4)."""
+    source_words = [word.lower() for word in _WORD.findall(source)]
+    words = [word.lower() for word in _WORD.findall(translation)]
+    n = UNTRANSLATED_NGRAM
+    if len(words) < n:
+        return None
+    source_grams = {tuple(source_words[i:i + n]) for i in range(len(source_words) - n + 1)}
+    copied = [False] * len(words)
+    for i in range(len(words) - n + 1):
+        if tuple(words[i:i + n]) in source_grams:
+            copied[i:i + n] = [True] * n
+    share = sum(copied) / len(words)
+    if share < UNTRANSLATED_SHARE:
+        return None
+    return QualityIssue('untranslated', f"{share:.0%} das palavras copiadas da origem")
+
+
+def _check_glossary(source: str, translation: str,
+                    glossary: Iterable[Tuple[str, str]]) -> List[QualityIssue]:
+    issues = []
+    source_lower, translation_lower = source.lower(), translation.lower()
+    for term, expected in glossary:
+        if re.search(rf'(?<!\w){re.escape(term.lower())}(?!\w)', source_lower) and \
+                expected.lower() not in translation_lower:
+            issues.append(QualityIssue('glossary', f"'{term}' deveria ser '{expected}'"))
+    return issues
+
+
+def estimate_quality(source: str, translation: str, source_language: Optional[str],
+                     target_language: str, glossary: Iterable[Tuple[str, str]] = ()) -> QualityReport:
+    """
+    Nota de 0 a 1 para uma tradução, só com verificações locais e baratas:
+    razão de tamanho, trechos não traduzidos ou no idioma errado, números,
+    URLs e marcações preservados e termos do glossário respeitados.
+    """
+    if not translation.strip():
+        return QualityReport(0.0, (QualityIssue('empty', "tradução vazia"),))
+
+    issues: List[QualityIssue] = []
+    if _META.search(translation) and not _META.search(source):
+        issues.append(QualityIssue('meta_text', "comentário do modelo na resposta"))
+
+    missing = _missing(Counter(_PLACEHOLDER.findall(source)), Counter(_PLACEHOLDER.findall(translation)))
+    extra = _missing(Counter(_PLACEHOLDER.findall(translation)), Counter(_PLACEHOLDER.findall(source)))
+    if missing or extra:
+        issues.append(QualityIssue('placeholders', f"ausentes {missing[:5]}, a mais {extra[:5]}"))
+
+    missing = _missing(Counter(_URL.findall(source)), Counter(_URL.findall(translation)))
+    if missing:
+        issues.append(QualityIssue('urls', f"ausentes {missing[:3]}"))
+
+    missing_numbers = _missing(_digits(source), _digits(translation))
+    if missing_numbers:
+        issues.append(QualityIssue('numbers', f"ausentes {missing_numbers[:5]}"))
+
+    same_language = base_language(source_language) == base_language(target_language)
+    if not same_language:
+        guess = detect_language(translation)
+        if guess.language is not None and guess.language != base_language(target_language) \
+                and guess.confidence >= WRONG_LANGUAGE_CONFIDENCE and guess.letters >= MIN_DETECTION_LETTERS:
+            issues.append(QualityIssue('wrong_language', f"texto detectado como {guess.language}"))
+        else:
+            untranslated = _check_untranslated(source, translation)
+            if untranslated:
+                issues.append(untranslated)
+
+    penalty = sum(PENALTIES[issue.code] for issue in issues if issue.code != 'numbers')
+    penalty += min(MAX_REPEATED_PENALTY, PENALTIES['numbers'] * len(missing_numbers))
+
+    ratio = _length_ratio(source, translation, source_language, target_language)
+    low, high = RATIO_BOUNDS
+    if ratio is not None and not low <= ratio <= high:
+        issues.append(QualityIssue('length_ratio', f"{ratio:.2f}x o tamanho esperado"))
+        extreme = ratio > RATIO_EXTREME or ratio < 1 / RATIO_EXTREME
+        penalty += PENALTIES['length_ratio'] * (1.75 if extreme else 1)
+
+    glossary_issues = _check_glossary(source, translation, glossary)
+    issues.extend(glossary_issues)
+    penalty += min(MAX_REPEATED_PENALTY, PENALTIES['glossary'] * len(glossary_issues))
+    return QualityReport(round(max(0.0, 1.0 - penalty), 3), tuple(issues))
+
+
+def review_instructions(report: QualityReport) -> str:
+    """Problemas encontrados, no formato enviado ao modelo da segunda passada."""
+    return "\n".join(f"- {issue.code}: {issue.detail}" for issue in report.issues)
+
+
+class QualityMetrics:
+    """Segmentos avaliados, sinalizados e revisados pela segunda passada."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.flagged = 0
+        self.reviewed = 0
+        self.improved = 0
+        self.review_characters = 0
+        self.issues: Counter = Counter()
+        self.score_sum = 0.0
+
+    def record(self, report: QualityReport) -> None:
+        with self._lock:
+            self.evaluated += 1
+            self.score_sum += report.score
+            self.issues.update(report.codes)
+            if report.revision_needed:
+                self.flagged += 1
+
+    def record_review(self, text: str, before: QualityReport, after: QualityReport) -> None:
+        with self._lock:
+            self.reviewed += 1
+            self.review_characters += len(text)
+            if after.score > before.score:
+                self.improved += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": QUALITY_REVIEW,
+                "threshold": QUALITY_THRESHOLD,
+                "evaluated": self.evaluated,
+                "flagged": self.flagged,
+                "flag_rate": round(self.flagged / self.evaluated, 4) if self.evaluated else 0.0,
+                "average_score": round(self.score_sum / self.evaluated, 4) if self.evaluated else 0.0,
+                "reviewed": self.reviewed,
+                "improved": self.improved,
+                "review_characters": self.review_characters,
+                "issues": dict(self.issues),
+            }
+
+
+quality_metrics = QualityMetrics()
@@ -0,0 +1,116 @@
+import logging
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from document_processor import paragraph_hash
+from models import Chapter
+from services.chapter_service import update_chapter_progress
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Posição de um parágrafo: (índice do capítulo, índice do parágrafo)
+Position = Tuple[int, int]
+
+
+def _flatten(chapters: List[Chapter]) -> Tuple[List[str], List[Position]]:
+    """Achata os capítulos em uma sequência única de hashes de parágrafos."""
+    hashes, positions = [], []
+    for chapter_index, chapter in enumerate(chapters):
+        for paragraph_index, paragraph in enumerate(chapter.content or []):
+            hashes.append(paragraph_hash(paragraph))
+            positions.append((chapter_index, paragraph_index))
+    return hashes, positions
+
+
+def _translation_at(chapter: Chapter, language: str, paragraph_index: int) -> Optional[str]:
+    translations = (chapter.translated_content or {}).get(language) or []
+    if paragraph_index < len(translations):
+        return translations[paragraph_index]
+    return None
+
+
+def align_paragraphs(old_hashes: List[str], new_hashes: List[str]) -> Dict[int, int]:
+    """
+    Alinha duas sequências de hashes e retorna o mapa índice novo -> índice antigo.
+
+    Primeiro aplica alinhamento de sequência (trechos iguais na mesma ordem);
+    depois, parágrafos que apenas mudaram de lugar são casados pelo hash.
+    """
+    mapping = {}
+    matcher = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            for offset in range(new_end - new_start):
+                mapping[new_start + offset] = old_start + offset
+
+    # Parágrafos movidos: casar pelo hash entre os que sobraram
+    used_old = set(mapping.values())
+    remaining_old: Dict[str, List[int]] = {}
+    for old_index, value in enumerate(old_hashes):
+        if old_index not in used_old:
+            remaining_old.setdefault(value, []).append(old_index)
+    for new_index, value in enumerate(new_hashes):
+        if new_index not in mapping and remaining_old.get(value):
+            mapping[new_index] = remaining_old[value].pop(0)
+
+    return mapping
+
+
+def carry_over_translations(previous_chapters: List[Chapter], new_chapters: List[Chapter]) -> Dict:
+    """
+    Copia para a nova revisão as traduções dos parágrafos inalterados
+    e marca como pendentes apenas os parágrafos novos ou alterados.
+    """
+    previous_chapters = sorted(previous_chapters, key=lambda c: c.order)
+    old_hashes, old_positions = _flatten(previous_chapters)
+    new_hashes, new_positions = _flatten(new_chapters)
+
+    mapping = align_paragraphs(old_hashes, new_hashes)
+
+    languages = sorted({
+        language
+        for chapter in previous_chapters
+        for language in (chapter.translated_content or {})
+    })
+    for chapter in new_chapters:
+        chapter.translated_content = {
+            language: [None] * len(chapter.content) for language in languages
+        }
+
+    reused = 0
+    pending: Dict[int, List[int]] = {}
+    for new_index, (chapter_index, paragraph_index) in enumerate(new_positions):
+        chapter = new_chapters[chapter_index]
+        old_index = mapping.get(new_index)
+        if old_index is None:
+            pending.setdefault(chapter.order, []).append(paragraph_index)
+            continue
+        old_chapter_index, old_paragraph_index = old_positions[old_index]
+        for language in languages:
+            translation = _translation_at(previous_chapters[old_chapter_index], language, old_paragraph_index)
+            if translation is not None:
+                chapter.translated_content[language][paragraph_index] = translation
+                reused += 1
+
+    for chapter in new_chapters:
+        update_chapter_progress(chapter)
+
+    summary = {
+        'previous_paragraphs': len(old_hashes),
+        'new_paragraphs': len(new_hashes),
+        'unchanged_paragraphs': len(mapping),
+        'changed_or_new_paragraphs': len(new_hashes) - len(mapping),
+        'removed_paragraphs': len(old_hashes) - len(mapping),
+        'reused_translations': reused,
+        'languages': languages,
+        'pending_paragraphs': [
+            {'chapter_order': order, 'paragraphs': indices}
+            for order, indices in sorted(pending.items())
+        ],
+    }
+    logger.info(
+        f"Revisão alinhada: {summary['unchanged_paragraphs']}/{summary['new_paragraphs']} "
+        f"parágrafos reaproveitados, {reused} traduções copiadas"
+    )
+    return summary
@@ -0,0 +1,130 @@
+import logging
+import os
+import time
+from typing import BinaryIO, Dict, Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Document
+from storage import LocalBlobStorage, StoredBlob, get_storage
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Blobs sem referência só são apagados depois desta carência, para não
+# competir com um upload do mesmo conteúdo que ainda não gravou o Document
+BLOB_GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "600"))
+# Blobs verificados por consulta ao liberar em lote
+RELEASE_BATCH_SIZE = 500
+
+
+def store_upload(fileobj: BinaryIO) -> StoredBlob:
+    """Grava o arquivo enviado no armazenamento endereçado por conteúdo."""
+    blob = get_storage().put(fileobj)
+    if not blob.created:
+        logger.info(f"Upload deduplicado: blob {blob.key} já existia")
+    return blob
+
+
+def document_file_path(document: Document) -> str:
+    """Caminho local do arquivo de um documento (baixa do S3 se preciso)."""
+    if document.content_hash:
+        return get_storage().local_path(document.content_hash)
+    # Documentos anteriores ao armazenamento por conteúdo
+    return document.file_path
+
+
+def blob_references(db: Session, key: str) -> int:
+    """Quantos documentos apontam para o blob."""
+    return db.query(func.count(Document.id)).filter(Document.content_hash == key).scalar()
+
+
+def release_blob(db: Session, key: str, grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> bool:
+    """
+    Apaga o blob se nenhum documento o referencia mais e ele não foi
+    reutilizado dentro da carência. Deve ser chamado após o commit da
+    remoção do documento. Retorna True se o blob foi apagado.
+    """
+    if blob_references(db, key):
+        return False
+    return _delete_unreferenced(key, grace_seconds)
+
+
+def release_blobs(db: Session, keys: Iterable[str], grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> int:
+    """
+    release_blob para muitos blobs (remoção em lote): as referências são
+    contadas numa consulta por lote em vez de uma por blob. Retorna quantos
+    blobs foram apagados.
+    """
+    keys = list(set(keys))
+    deleted = 0
+    for start in range(0, len(keys), RELEASE_BATCH_SIZE):
+        batch = keys[start:start + RELEASE_BATCH_SIZE]
+        referenced = {
+            key for (key,) in
+            db.query(Document.content_hash).filter(Document.content_hash.in_(batch)).distinct()
+        }
+        deleted += sum(_delete_unreferenced(key, grace_seconds) for key in batch if key not in referenced)
+    return deleted
+
+
+def _delete_unreferenced(key: str, grace_seconds: int) -> bool:
+    storage = get_storage()
+    modified = storage.last_modified(key)
+    if modified is None:
+        return False
+    if time.time() - modified < grace_seconds:
+        logger.info(f"Blob {key} sem referências, mas dentro da carência; fica para o GC")
+        return False
+    storage.delete(key)
+    logger.info(f"Blob {key} removido")
+    return True
+
+
+def release_legacy_file(db: Session, file_path: str) -> bool:
+    """Remove o arquivo de um documento antigo se nenhum outro o usa."""
+    shared = db.query(func.count(Document.id)).filter(Document.file_path == file_path).scalar()
+    if shared or not os.path.exists(file_path):
+        return False
+    os.remove(file_path)
+    logger.info(f"Arquivo físico removido: {file_path}")
+    return True
+
+
+def collect_garbage(db: Session, grace_seconds: int = BLOB_GC_GRACE_SECONDS,
+                    dry_run: bool = False) -> Dict:
+    """
+    Varre o armazenamento e apaga blobs que nenhum documento referencia
+    há mais tempo que a carência.
+    """
+    referenced = {
+        key for (key,) in db.query(Document.content_hash).filter(Document.content_hash.isnot(None)).distinct()
+    }
+    storage = get_storage()
+    cutoff = time.time() - grace_seconds
+
+    scanned = deleted = 0
+    for key in list(storage.iter_keys()):
+        scanned += 1
+        if key in referenced:
+            continue
+        modified = storage.last_modified(key)
+        if modified is None or modified > cutoff:
+            continue
+        if not dry_run:
+            storage.delete(key)
+        deleted += 1
+
+    temp_removed = 0
+    if isinstance(storage, LocalBlobStorage) and not dry_run:
+        temp_removed = storage.clean_temp(cutoff)
+
+    logger.info(f"GC de blobs: {scanned} verificados, {deleted} sem referência removidos")
+    return {
+        "scanned": scanned,
+        "referenced": len(referenced),
+        "deleted": deleted,
+        "temp_files_removed": temp_removed,
+        "dry_run": dry_run,
+    }
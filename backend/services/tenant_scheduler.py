@@ -0,0 +1,257 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+from services.tenant_usage import UsageLedger, usage_ledger
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Cota padrão de cada cliente (tokens estimados de entrada + saída por minuto)
+TENANT_TOKENS_PER_MINUTE = int(os.getenv("TENANT_TOKENS_PER_MINUTE", "200000"))
+# Peso padrão no escalonamento justo (um cliente de peso 2 recebe o dobro da vazão)
+TENANT_DEFAULT_WEIGHT = int(os.getenv("TENANT_DEFAULT_WEIGHT", "1"))
+# Chamadas simultâneas ao serviço de tradução neste processo, divididas entre os clientes
+# (a fila justa é de cada processo; a cota de tokens é somada no banco entre todos)
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "8"))
+
+ANONYMOUS = "anonymous"
+# Jobs sem chave têm cota e fila próprias: um livro inteiro na fila não esgota a
+# cota das requisições interativas anônimas (o frontend não envia chave)
+ANONYMOUS_JOBS = "anonymous:jobs"
+LATENCY_WINDOW = 1000
+
+
+class Tenant(NamedTuple):
+    key: str  # profile:<id>, anonymous ou anonymous:jobs
+    profile_id: Optional[int] = None
+    weight: int = TENANT_DEFAULT_WEIGHT
+    tokens_per_minute: int = TENANT_TOKENS_PER_MINUTE
+    interactive: bool = True  # requisição da API (recusa acima da cota) ou job (espera a cota)
+
+
+ANONYMOUS_TENANT = Tenant(ANONYMOUS)
+ANONYMOUS_JOBS_TENANT = Tenant(ANONYMOUS_JOBS, interactive=False)
+
+_tenant = contextvars.ContextVar("tenant", default=ANONYMOUS_TENANT)
+
+
+@contextmanager
+def tenant_scope(tenant: Tenant):
+    """Atribui ao cliente as chamadas ao serviço de tradução feitas neste contexto."""
+    token = _tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant() -> Tenant:
+    return _tenant.get()
+
+
+_meter = contextvars.ContextVar("meter", default=None)
+
+
+@contextmanager
+def metered():
+    """
+    Soma em `meter[0]` os tokens cobrados neste contexto: o custo de uma
+    chamada compartilhada, repassado a quem a aproveita.
+    """
+    meter = [0]
+    token = _meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _meter.reset(token)
+
+
+def _add_to_meter(tokens: int) -> None:
+    meter = _meter.get()
+    if meter is not None:
+        meter[0] += tokens
+
+
+class QuotaExceeded(Exception):
+    """Cota de tokens por minuto esgotada; `retry_after` em segundos."""
+
+    def __init__(self, tenant: Tenant, retry_after: float):
+        super().__init__(f"Cota de {tenant.tokens_per_minute} tokens/min esgotada para {tenant.key}")
+        self.tenant = tenant
+        self.retry_after = retry_after
+
+
+class TenantUsage:
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0
+        self.paced_seconds = 0.0
+        self.active = 0
+        self.waits: deque = deque(maxlen=LATENCY_WINDOW)
+
+
+class FairScheduler:
+    """
+    Fila justa ponderada (start-time fair queueing) na frente do serviço de
+    tradução: cada chamada recebe a tag de início max(tempo virtual, término
+    da anterior do cliente) e, com as vagas ocupadas, sai a de menor tag.
+    Um cliente com um livro inteiro na fila acumula tags altas; a chamada
+    de um cliente leve entra com a tag do tempo virtual e passa na frente,
+    enquanto a capacidade ociosa continua indo para o job pesado.
+    A cota por minuto vem do consumo registrado no banco (`ledger`), comum
+    à API e a todos os workers; vagas, fila e métricas são deste processo.
+    """
+
+    def __init__(self, concurrency: int = SCHEDULER_CONCURRENCY, ledger: UsageLedger = usage_ledger):
+        self.concurrency = concurrency
+        self.active = 0
+        self.virtual_time = 0.0
+        self._finish: Dict[str, float] = {}
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self.ledger = ledger
+        self._usage: Dict[str, TenantUsage] = {}
+        self._lock = threading.Lock()
+
+    def _tenant_usage(self, tenant: Tenant) -> TenantUsage:
+        usage = self._usage.get(tenant.key)
+        if usage is None:
+            usage = self._usage[tenant.key] = TenantUsage()
+        return usage
+
+    def check_quota(self, tenant: Tenant) -> None:
+        """Recusa (QuotaExceeded) uma requisição interativa de cliente acima da cota."""
+        wait = self.ledger.wait_time(tenant.key, tenant.tokens_per_minute)
+        if wait:
+            with self._lock:
+                self._tenant_usage(tenant).throttled += 1
+        if wait:
+            raise QuotaExceeded(tenant, wait)
+
+    async def _pace(self, tenant: Tenant) -> None:
+        """Jobs não são recusados: esperam a cota do cliente se repor."""
+        while True:
+            # A leitura pode ir ao banco: fora do event loop
+            wait = await asyncio.to_thread(self.ledger.wait_time, tenant.key, tenant.tokens_per_minute)
+            if not wait:
+                return
+            with self._lock:
+                self._tenant_usage(tenant).paced_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def _acquire(self, tenant: Tenant, cost: float) -> None:
+        with self._lock:
+            start = max(self.virtual_time, self._finish.get(tenant.key, 0.0))
+            self._finish[tenant.key] = start + cost / max(1, tenant.weight)
+            if self.active < self.concurrency and not self._queue:
+                self.active += 1
+                self.virtual_time = start
+                return
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (start, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                # A vaga chegou junto com o cancelamento: devolvê-la
+                if future.done() and not future.cancelled():
+                    self._release_locked()
+            raise
+
+    def _release_locked(self) -> None:
+        while self._queue:
+            start, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            # A vaga passa direto para a próxima chamada (active não muda)
+            self.virtual_time = start
+            future.get_loop().call_soon_threadsafe(self._grant, future)
+            return
+        self.active -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            with self._lock:
+                self._release_locked()
+        else:
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, cost: int, tenant: Optional[Tenant] = None):
+        """
+        Vaga para uma chamada ao serviço de tradução com custo estimado em
+        tokens, para o cliente do contexto atual.
+        """
+        tenant = tenant or current_tenant()
+        if not tenant.interactive:
+            await self._pace(tenant)
+        started = time.perf_counter()
+        await self._acquire(tenant, cost)
+        self.ledger.record(tenant.key, cost, requests=1)
+        _add_to_meter(cost)
+        with self._lock:
+            usage = self._tenant_usage(tenant)
+            usage.requests += 1
+            usage.tokens += cost
+            usage.active += 1
+            usage.waits.append(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            with self._lock:
+                usage.active -= 1
+                self._release_locked()
+
+    def settle(self, cost: int, actual: int, tenant: Optional[Tenant] = None) -> None:
+        """Troca a estimativa pelo consumo informado pela API, quando houver."""
+        tenant = tenant or current_tenant()
+        if actual == cost:
+            return
+        self.ledger.record(tenant.key, actual - cost)
+        _add_to_meter(actual - cost)
+        with self._lock:
+            self._tenant_usage(tenant).tokens += actual - cost
+
+    def charge(self, tokens: int, tenant: Optional[Tenant] = None) -> None:
+        """Cobra da cota do cliente tokens gastos numa chamada feita por outro (tradução compartilhada)."""
+        tenant = tenant or current_tenant()
+        if not tokens:
+            return
+        self.ledger.record(tenant.key, tokens)
+        with self._lock:
+            self._tenant_usage(tenant).tokens += tokens
+
+    def stats(self) -> dict:
+        """Vagas, fila e consumo vistos por este processo (o total por cliente está em `ledger`)."""
+        with self._lock:
+            tenants = {}
+            for key, usage in self._usage.items():
+                waits = sorted(usage.waits)
+                tenants[key] = {
+                    "requests": usage.requests,
+                    "tokens": usage.tokens,
+                    "active": usage.active,
+                    "throttled": usage.throttled,
+                    "paced_seconds": round(usage.paced_seconds, 2),
+                    "wait_avg_ms": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                    "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                }
+            return {
+                "concurrency": self.concurrency,
+                "active": self.active,
+                "queued": sum(1 for _, _, future in self._queue if not future.done()),
+                "tenants": tenants,
+            }
+
+
+fair_scheduler = FairScheduler()
@@ -0,0 +1,213 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import TenantUsage
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Validade (s) do consumo lido do banco; nesse intervalo só o consumo deste processo é somado
+TENANT_USAGE_REFRESH_SECONDS = float(os.getenv("TENANT_USAGE_REFRESH_SECONDS", "1"))
+# Intervalo (s) entre as gravações do consumo acumulado em memória no banco
+TENANT_USAGE_FLUSH_SECONDS = float(os.getenv("TENANT_USAGE_FLUSH_SECONDS", "1"))
+# Dias de consumo por minuto guardados no banco
+TENANT_USAGE_RETENTION_DAYS = int(os.getenv("TENANT_USAGE_RETENTION_DAYS", "7"))
+
+WINDOW_SECONDS = 60
+
+
+def window_start(now: datetime) -> datetime:
+    return now.replace(second=0, microsecond=0)
+
+
+def _add_usage(db: Session, tenant_key: str, window: datetime, tokens: int, requests: int) -> None:
+    """Soma o consumo na linha do cliente e minuto, criando-a se preciso (upsert)."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(TenantUsage).values(
+            tenant=tenant_key, window_start=window, tokens=tokens, requests=requests
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[TenantUsage.tenant, TenantUsage.window_start],
+            set_={
+                "tokens": TenantUsage.tokens + statement.excluded.tokens,
+                "requests": TenantUsage.requests + statement.excluded.requests,
+            },
+        ))
+        return
+    updated = (
+        db.query(TenantUsage)
+        .filter(TenantUsage.tenant == tenant_key, TenantUsage.window_start == window)
+        .update({
+            TenantUsage.tokens: TenantUsage.tokens + tokens,
+            TenantUsage.requests: TenantUsage.requests + requests,
+        }, synchronize_session=False)
+    )
+    if not updated:
+        db.add(TenantUsage(tenant=tenant_key, window_start=window, tokens=tokens, requests=requests))
+
+
+class UsageLedger:
+    """
+    Consumo de tokens por cliente e minuto no banco, somado por todos os
+    processos: a cota vale para o cliente, não para cada worker. O uso do
+    último minuto é um contador de janela deslizante: o minuto anterior
+    entra na proporção do que ainda cai dentro dos últimos 60 s.
+    `record` só acumula em memória (nada de banco no caminho da chamada):
+    uma thread grava o acumulado a cada TENANT_USAGE_FLUSH_SECONDS, e a
+    leitura soma o que este processo ainda não gravou.
+    """
+
+    def __init__(self, session_factory=SessionLocal, flush_seconds: float = TENANT_USAGE_FLUSH_SECONDS):
+        self._session_factory = session_factory
+        self._flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # tenant -> (validade, minuto, tokens do minuto anterior, tokens do minuto atual)
+        self._windows: Dict[str, Tuple[float, datetime, int, int]] = {}
+        # (tenant, minuto) -> [tokens, requisições] ainda não gravados (em gravação, no caso de _flushing)
+        self._pending: Dict[Tuple[str, datetime], List[int]] = {}
+        self._flushing: Dict[Tuple[str, datetime], List[int]] = {}
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._pruned: Optional[datetime] = None
+
+    def record(self, tenant_key: str, tokens: int, requests: int = 0) -> None:
+        """Registra consumo (negativo para corrigir uma estimativa) no minuto atual."""
+        window = window_start(datetime.now(timezone.utc))
+        with self._lock:
+            pending = self._pending.setdefault((tenant_key, window), [0, 0])
+            pending[0] += tokens
+            pending[1] += requests
+            cached = self._windows.get(tenant_key)
+            if cached is not None and cached[1] == window:
+                self._windows[tenant_key] = (cached[0], window, cached[2], cached[3] + tokens)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="tenant-usage-flush", daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self._flush_seconds)
+            self.flush()
+
+    def flush(self) -> None:
+        """Grava no banco o consumo acumulado em memória (chamada pela thread e na saída)."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._flushing, self._pending = self._pending, {}
+            window = window_start(datetime.now(timezone.utc))
+            db = self._session_factory()
+            try:
+                for (tenant_key, pending_window), (tokens, requests) in self._flushing.items():
+                    _add_usage(db, tenant_key, pending_window, tokens, requests)
+                if self._pruned != window:
+                    # Uma limpeza por minuto e processo basta
+                    self._pruned = window
+                    cutoff = window - timedelta(days=TENANT_USAGE_RETENTION_DAYS)
+                    db.query(TenantUsage).filter(TenantUsage.window_start < cutoff).delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                # Fica para a próxima gravação; consumo não registrado não derruba a tradução
+                db.rollback()
+                logger.error(f"Erro ao registrar consumo dos clientes: {str(e)}")
+                with self._lock:
+                    for key, (tokens, requests) in self._flushing.items():
+                        pending = self._pending.setdefault(key, [0, 0])
+                        pending[0] += tokens
+                        pending[1] += requests
+            finally:
+                db.close()
+                with self._lock:
+                    self._flushing = {}
+
+    def _unflushed(self, tenant_key: str, window: datetime) -> int:
+        """Tokens do cliente no minuto que este processo ainda não gravou (chamar com _lock)."""
+        return sum(
+            pending.get((tenant_key, window), (0, 0))[0] for pending in (self._pending, self._flushing)
+        )
+
+    def _read(self, tenant_key: str, window: datetime) -> Tuple[int, int]:
+        """Tokens do minuto anterior e do atual, do banco ou da leitura recente."""
+        with self._lock:
+            cached = self._windows.get(tenant_key)
+            if cached is not None and cached[1] == window and cached[0] > time.monotonic():
+                return cached[2], cached[3]
+        previous_window = window - timedelta(seconds=WINDOW_SECONDS)
+        db = self._session_factory()
+        try:
+            previous, current = db.query(
+                func.coalesce(func.sum(case((TenantUsage.window_start == previous_window, TenantUsage.tokens),
+                                            else_=0)), 0),
+                func.coalesce(func.sum(case((TenantUsage.window_start == window, TenantUsage.tokens), else_=0)), 0),
+            ).filter(
+                TenantUsage.tenant == tenant_key,
+                TenantUsage.window_start.in_([previous_window, window]),
+            ).one()
+        finally:
+            db.close()
+        with self._lock:
+            previous = int(previous) + self._unflushed(tenant_key, previous_window)
+            current = int(current) + self._unflushed(tenant_key, window)
+            self._windows[tenant_key] = (
+                time.monotonic() + TENANT_USAGE_REFRESH_SECONDS, window, previous, current
+            )
+        return previous, current
+
+    def used(self, tenant_key: str) -> float:
+        """Tokens consumidos pelo cliente nos últimos 60 s (aproximação da janela deslizante)."""
+        now = datetime.now(timezone.utc)
+        window = window_start(now)
+        previous, current = self._read(tenant_key, window)
+        elapsed = (now - window).total_seconds()
+        return previous * (1 - elapsed / WINDOW_SECONDS) + current
+
+    def wait_time(self, tenant_key: str, tokens_per_minute: int) -> float:
+        """Segundos até o consumo do último minuto voltar para baixo da cota (0 se já está)."""
+        now = datetime.now(timezone.utc)
+        window = window_start(now)
+        previous, current = self._read(tenant_key, window)
+        elapsed = (now - window).total_seconds()
+        excess = previous * (1 - elapsed / WINDOW_SECONDS) + current - tokens_per_minute
+        if excess < 0:
+            return 0.0
+        remaining = WINDOW_SECONDS - elapsed
+        if previous > 0 and excess * WINDOW_SECONDS / previous < remaining:
+            return excess * WINDOW_SECONDS / previous + 0.01
+        # Na virada do minuto o atual passa a anterior e sai da janela do mesmo jeito
+        after = WINDOW_SECONDS * (1 - tokens_per_minute / current) if current else 0.0
+        return remaining + max(0.0, after) + 0.01
+
+    def usage(self, db: Session, since: datetime) -> Dict[str, dict]:
+        """Consumo de cada cliente desde `since` e no último minuto, somado de todos os processos."""
+        self.flush()
+        rows = (
+            db.query(TenantUsage.tenant, func.sum(TenantUsage.tokens), func.sum(TenantUsage.requests))
+            .filter(TenantUsage.window_start >= window_start(since))
+            .group_by(TenantUsage.tenant)
+            .all()
+        )
+        return {
+            tenant_key: {
+                "tokens": int(tokens or 0),
+                "requests": int(requests or 0),
+                "tokens_last_minute": round(self.used(tenant_key)),
+            }
+            for tenant_key, tokens, requests in rows
+        }
+
+
+usage_ledger = UsageLedger()
@@ -0,0 +1,137 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from document_processor import normalize_paragraph
+from models import Translation
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Número máximo de segmentos mantidos no cache em memória
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "20000"))
+# Textos por consulta na busca em lote da memória de tradução (limite de parâmetros do banco)
+MEMORY_BATCH_SIZE = 200
+
+
+class LRUCache:
+    """Cache LRU simples e thread-safe com contadores de acerto."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+translation_cache = LRUCache(TRANSLATION_CACHE_SIZE)
+
+
+def cache_key(text: str, source_language: str, target_language: str,
+              formality: Optional[str], style: Optional[str], profile: Optional[str] = None) -> tuple:
+    """Chave do cache: segmento normalizado + parâmetros que mudam a tradução."""
+    return (normalize_paragraph(text), source_language, target_language, formality, style, profile)
+
+
+def _reusable(query, formality: Optional[str], style: Optional[str], translator_profile_id: Optional[int]):
+    """
+    Filtros comuns da memória de tradução: mesmos parâmetros da chave do
+    cache (formalidade, estilo e perfil; None casa com IS NULL, então sem
+    perfil só vale a memória sem perfil) e nada marcado para revisão pela
+    estimativa de qualidade, a menos que um tradutor já tenha editado.
+    """
+    return query.filter(
+        Translation.formality_level == formality,
+        Translation.style == style,
+        Translation.translator_profile_id == translator_profile_id,
+        # Traduções confidenciais ficam cifradas e não são compartilhadas
+        Translation.is_confidential.isnot(True),
+        or_(Translation.revision_needed.isnot(True), Translation.has_been_edited.is_(True)),
+    )
+
+
+def lookup_translation_memory(db: Session, text: str, source_language: str, target_language: str,
+                              formality: Optional[str], style: Optional[str],
+                              translator_profile_id: Optional[int] = None) -> Optional[str]:
+    """
+    Busca na memória de tradução (tabela translations) um segmento idêntico,
+    traduzido com os mesmos parâmetros. Com perfil, só vale a memória do
+    próprio perfil (glossário e instruções diferem).
+    """
+    query = db.query(Translation.translated_text).filter(
+        Translation.original_text == text,
+        Translation.source_language == source_language,
+        Translation.target_language == target_language,
+    )
+    translation = (
+        _reusable(query, formality, style, translator_profile_id)
+        .order_by(Translation.has_been_edited.desc(), Translation.created_at.desc())
+        .first()
+    )
+    return translation[0] if translation else None
+
+
+def lookup_translation_memory_batch(db: Session, texts: Iterable[str], source_languages: Iterable[str],
+                                    target_languages: Iterable[str], formality: Optional[str],
+                                    style: Optional[str], translator_profile_id: Optional[int] = None) -> Dict[Tuple[str, str, str], str]:
+    """
+    lookup_translation_memory para muitos segmentos e pares de idiomas de
+    uma vez: uma consulta por lote de textos em vez de uma por segmento e
+    destino. Retorna {(texto, origem, destino): tradução} com a mesma
+    preferência (editadas primeiro, depois as mais recentes).
+    """
+    texts = list(dict.fromkeys(texts))
+    source_languages = list(set(source_languages))
+    target_languages = list(set(target_languages))
+    found: Dict[Tuple[str, str, str], str] = {}
+    for start in range(0, len(texts), MEMORY_BATCH_SIZE):
+        query = db.query(
+            Translation.original_text, Translation.source_language,
+            Translation.target_language, Translation.translated_text
+        ).filter(
+            Translation.original_text.in_(texts[start:start + MEMORY_BATCH_SIZE]),
+            Translation.source_language.in_(source_languages),
+            Translation.target_language.in_(target_languages),
+        )
+        rows = _reusable(query, formality, style, translator_profile_id).order_by(Translation.has_been_edited.desc(), Translation.created_at.desc()).all()
+        for original, source_language, target_language, translated in rows:
+            found.setdefault((original, source_language, target_language), translated)
+    return found
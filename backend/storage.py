@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import tempfile
+from functools import lru_cache
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Backend de armazenamento dos arquivos enviados: 'local' ou 's3'
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+STORAGE_DIR = os.getenv(
+    "STORAGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredBlob(NamedTuple):
+    key: str       # sha256 do conteúdo
+    size: int
+    created: bool  # False quando o conteúdo já existia (upload deduplicado)
+
+
+def _hash_to_temp(fileobj: BinaryIO, directory: Optional[str] = None):
+    """Copia o stream para um arquivo temporário calculando o sha256."""
+    digest = hashlib.sha256()
+    size = 0
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(handle, "wb") as temp:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                temp.write(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return digest.hexdigest(), size, temp_path
+
+
+class BlobStorage:
+    """
+    Armazenamento endereçado por conteúdo: a chave de cada arquivo é o
+    sha256 dos seus bytes, então uploads idênticos ocupam um só blob.
+    """
+
+    def put(self, fileobj: BinaryIO) -> StoredBlob:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str:
+        """Caminho local legível pelos processadores (PyPDF2, python-docx, mmap)."""
+        raise NotImplementedError
+
+    def uri(self, key: str) -> str:
+        """Identificador gravado em Document.file_path."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def last_modified(self, key: str) -> Optional[float]:
+        """Última escrita ou reuso do blob (epoch), usado como carência do GC."""
+        raise NotImplementedError
+
+    def iter_keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class LocalBlobStorage(BlobStorage):
+    """Blobs em disco, particionados por prefixo: ab/cd/abcd...ef"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.temp_dir = os.path.join(root, ".tmp")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, fileobj: BinaryIO) -> StoredBlob:
+        key, size, temp_path = _hash_to_temp(fileobj, self.temp_dir)
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            # Reuso renova a carência: o GC não apaga um blob que acabou de ser referenciado
+            os.utime(path)
+            return StoredBlob(key, size, False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return StoredBlob(key, size, True)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def local_path(self, key: str) -> str:
+        return self._path(key)
+
+    def uri(self, key: str) -> str:
+        return self._path(key)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def last_modified(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def iter_keys(self) -> Iterator[str]:
+        for first in os.listdir(self.root):
+            if len(first) != 2:
+                continue
+            for second in os.listdir(os.path.join(self.root, first)):
+                for name in os.listdir(os.path.join(self.root, first, second)):
+                    yield name
+
+    def clean_temp(self, older_than: float) -> int:
+        """Remove uploads interrompidos que ficaram na pasta temporária."""
+        removed = 0
+        for name in os.listdir(self.temp_dir):
+            path = os.path.join(self.temp_dir, name)
+            if os.path.getmtime(path) < older_than:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class S3BlobStorage(BlobStorage):
+    """
+    Blobs num bucket S3 ou compatível (MinIO, LocalStack) via boto3.
+    Os processadores precisam de arquivo local, então cada blob lido é
+    baixado uma vez para um cache em disco (o conteúdo nunca muda).
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 cache_dir: Optional[str] = None):
+        # Importado sob demanda: boto3 só é necessário com STORAGE_BACKEND=s3
+        import boto3
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.cache = LocalBlobStorage(cache_dir or os.path.join(tempfile.gettempdir(), "blob_cache"))
+
+    def _object_key(self, key: str) -> str:
+        sharded = f"{key[:2]}/{key[2:4]}/{key}"
+        return f"{self.prefix}/{sharded}" if self.prefix else sharded
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put(self, fileobj: BinaryIO) -> StoredBlob:
+        key, size, temp_path = _hash_to_temp(fileobj)
+        try:
+            object_key = self._object_key(key)
+            if self._head(key) is not None:
+                # Copiar sobre si mesmo atualiza o LastModified (carência do GC)
+                self.client.copy_object(
+                    Bucket=self.bucket, Key=object_key, MetadataDirective="REPLACE",
+                    CopySource={"Bucket": self.bucket, "Key": object_key}
+                )
+                return StoredBlob(key, size, False)
+            self.client.upload_file(temp_path, self.bucket, object_key)
+            return StoredBlob(key, size, True)
+        finally:
+            os.remove(temp_path)
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def local_path(self, key: str) -> str:
+        if not self.cache.exists(key):
+            path = self.cache.local_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.cache.temp_dir, suffix=".part")
+            os.close(handle)
+            self.client.download_file(self.bucket, self._object_key(key), temp_path)
+            os.replace(temp_path, path)
+        return self.cache.local_path(key)
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._object_key(key)}"
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        self.cache.delete(key)
+
+    def last_modified(self, key: str) -> Optional[float]:
+        head = self._head(key)
+        return head["LastModified"].timestamp() if head else None
+
+    def iter_keys(self) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"].rsplit("/", 1)[-1]
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> BlobStorage:
+    """Backend configurado por STORAGE_BACKEND (criado uma vez por processo)."""
+    if STORAGE_BACKEND == "s3":
+        return S3BlobStorage(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", "uploads"),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+            cache_dir=os.getenv("S3_CACHE_DIR"),
+        )
+    return LocalBlobStorage(STORAGE_DIR)
@@ -0,0 +1,141 @@
+import codecs
+import io
+import logging
+import mmap
+import os
+import re
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tamanho da amostra usada para detectar a codificação
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Linha em branco (com espaços opcionais) separa parágrafos; aceita \n e \r\n.
+# Começar pelo literal \n permite ao regex saltar direto entre quebras de linha
+PARAGRAPH_BREAK = re.compile(rb'\n[ \t\f\v\r]*\n(?:[ \t\f\v\r]*\n)*')
+
+# Páginas já lidas são devolvidas ao sistema a cada tantos bytes
+RELEASE_INTERVAL = 32 * 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Bytes sem caractere definido no cp1252: se aparecerem, o arquivo é latin-1
+_CP1252_UNDEFINED = re.compile(rb'[\x81\x8d\x8f\x90\x9d]')
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detecta a codificação a partir de uma amostra do início do arquivo:
+    BOM, depois UTF-8 e, se não decodificar, cp1252/latin-1 (comuns em
+    fontes brasileiras antigas).
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # final=False tolera um caractere multibyte cortado no fim da amostra
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    return 'latin-1' if _CP1252_UNDEFINED.search(sample) else 'cp1252'
+
+
+def _decode(raw: bytes, encoding: str) -> str:
+    try:
+        return raw.decode(encoding)
+    except UnicodeDecodeError:
+        # A amostra parecia UTF-8, mas o trecho não é: arquivos mistos existem
+        logger.debug(f"Trecho inválido em {encoding}; decodificando como cp1252")
+        return raw.decode('cp1252', errors='replace')
+
+
+def _iter_lines(lines: Iterable[str]) -> Iterator[str]:
+    # UTF-16 não é compatível com a busca por bytes; lê linha a linha
+    buffer = []
+    for line in lines:
+        if line.strip():
+            buffer.append(line)
+        elif buffer:
+            paragraph = ''.join(buffer).strip()
+            buffer = []
+            if paragraph:
+                yield paragraph
+    paragraph = ''.join(buffer).strip()
+    if paragraph:
+        yield paragraph
+
+
+def _iter_utf16(file_path: str, encoding: str) -> Iterator[str]:
+    with open(file_path, 'r', encoding=encoding, newline=None) as file:
+        yield from _iter_lines(file)
+
+
+def _release_pages(mapped: mmap.mmap, offset: int) -> int:
+    # Sem isso as páginas lidas contam no RSS até o fim da leitura
+    end = offset - offset % mmap.PAGESIZE
+    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+        mapped.madvise(mmap.MADV_DONTNEED, 0, end)
+    return end
+
+
+def iter_paragraphs(file_path: str, encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    Gera os parágrafos de um arquivo de texto sem carregá-lo inteiro:
+    o arquivo é mapeado em memória e só cada parágrafo é copiado e
+    decodificado ao ser produzido.
+    """
+    if os.path.getsize(file_path) == 0:
+        return
+
+    with open(file_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if encoding is None:
+                encoding = detect_encoding(mapped[:ENCODING_SAMPLE_SIZE])
+            if encoding == 'utf-16':
+                yield from _iter_utf16(file_path, encoding)
+                return
+
+            yield from _split_paragraphs(mapped, encoding, mapped=mapped)
+
+
+def _split_paragraphs(buffer, encoding: str, mapped: Optional[mmap.mmap] = None) -> Iterator[str]:
+    """Divide um buffer de bytes nas linhas em branco, decodificando um parágrafo por vez."""
+    start = released = 0
+    if encoding == 'utf-8-sig':
+        start, encoding = len(codecs.BOM_UTF8), 'utf-8'
+
+    for match in PARAGRAPH_BREAK.finditer(buffer, start):
+        paragraph = _decode(buffer[start:match.start()], encoding).strip()
+        if paragraph:
+            yield paragraph
+        start = match.end()
+        if mapped is not None and start - released >= RELEASE_INTERVAL:
+            released = _release_pages(mapped, start)
+
+    paragraph = _decode(buffer[start:], encoding).strip()
+    if paragraph:
+        yield paragraph
+
+
+def iter_buffer_paragraphs(data: bytes, encoding: Optional[str] = None) -> Iterator[str]:
+    """Parágrafos de um conteúdo já em memória (uploads confidenciais não passam pelo disco)."""
+    if not data:
+        return
+    if encoding is None:
+        encoding = detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+    if encoding == 'utf-16':
+        yield from _iter_lines(io.StringIO(data.decode(encoding), newline=None))
+        return
+    yield from _split_paragraphs(data, encoding)
+
+
+def sniff_encoding(file_path: str) -> str:
+    """Codificação detectada para um arquivo, lendo apenas a amostra inicial."""
+    with open(file_path, 'rb') as file:
+        return detect_encoding(file.read(ENCODING_SAMPLE_SIZE))
@@ -0,0 +1,173 @@
+"""
+Worker de processamento em segundo plano.
+
+Consome jobs de parsing e tradução da fila persistente (tabela `jobs`),
+fora do processo web. Vários workers podem rodar em paralelo, no mesmo
+host ou em hosts diferentes, apontando para o mesmo DATABASE_URL.
+
+Uso:
+    python worker.py [--concurrency 2] [--types parse_document,translate_chapter] [--burst]
+
+SIGINT/SIGTERM: para de pegar jobs novos e termina os que estão em
+andamento. Um segundo sinal interrompe e devolve os jobs à fila.
+
+Os jobs são reservados por prioridade e, dentro dela, pela fila justa
+entre clientes (jobs.fair_order); as chamadas de cada job esperam a cota
+de tokens do cliente em vez de falhar.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import traceback
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import SessionLocal
+from services.api_keys import tenant_for_job
+from services.confidential import install_log_filter
+from services.event_service import prune_events, publish_job_status
+from services.job_handlers import HANDLERS
+from services.job_queue import (
+    JOB_VISIBILITY_TIMEOUT, claim_job, complete_job, extend_lock, fail_job, release_job
+)
+from services.tenant_scheduler import tenant_scope
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+install_log_filter()
+logger = logging.getLogger("worker")
+
+# Intervalo (s) entre consultas quando a fila está vazia
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+
+
+async def _heartbeat(job_id: int, worker_id: str, work: asyncio.Future) -> None:
+    """
+    Renova a reserva do job na metade do timeout de visibilidade. Se ela foi
+    perdida (job cancelado, ou reservado por outro worker após o timeout),
+    interrompe o handler em vez de deixar dois workers no mesmo job.
+    """
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 2)
+        db = SessionLocal()
+        try:
+            if not extend_lock(db, job_id, worker_id):
+                logger.warning(f"[{worker_id}] Reserva do job {job_id} perdida: interrompendo o handler")
+                work.cancel()
+                return
+        except Exception as e:
+            logger.error(f"Erro no heartbeat do job {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+
+async def run_job(db, job, worker_id: str) -> None:
+    handler = HANDLERS.get(job.job_type)
+    if handler is None:
+        job.attempts = job.max_attempts
+        fail_job(db, job, worker_id, f"Tipo de job desconhecido: {job.job_type}")
+        return
+
+    logger.info(f"[{worker_id}] Executando job {job.id} ({job.job_type}), tentativa {job.attempts}")
+    _publish_status(db, job)
+    # Chamadas do job contam na cota e na fila justa do cliente que o enfileirou
+    with tenant_scope(tenant_for_job(db, job.tenant)):
+        work = asyncio.ensure_future(handler(db, job))
+    heartbeat = asyncio.create_task(_heartbeat(job.id, worker_id, work))
+    try:
+        result = await work
+        if complete_job(db, job, worker_id, result):
+            _publish_status(db, job)
+            if job.document_id is not None:
+                prune_events(db, job.document_id)
+    except asyncio.CancelledError:
+        db.rollback()
+        if heartbeat.done() and not heartbeat.cancelled():
+            # Interrompido pelo heartbeat: o job já não é deste worker
+            logger.warning(f"[{worker_id}] Job {job.id} abandonado após perder a reserva")
+            return
+        if release_job(db, job, worker_id):
+            _publish_status(db, job)
+            logger.warning(f"[{worker_id}] Job {job.id} interrompido e devolvido à fila")
+        raise
+    except Exception as e:
+        logger.error(f"[{worker_id}] Erro no job {job.id}: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        db.rollback()
+        if fail_job(db, job, worker_id, str(e)):
+            _publish_status(db, job)
+    finally:
+        heartbeat.cancel()
+
+
+def _publish_status(db, job) -> None:
+    """Evento de mudança de status para quem acompanha o documento por WebSocket."""
+    try:
+        publish_job_status(db, job)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao publicar evento do job {job.id}: {str(e)}")
+
+
+async def run_slot(slot: int, stop_event: asyncio.Event, job_types, burst: bool) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{slot}"
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            job = claim_job(db, worker_id, job_types)
+            if job is None:
+                if burst:
+                    return
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(db, job, worker_id)
+        finally:
+            db.close()
+
+
+async def main(concurrency: int, job_types, burst: bool) -> None:
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    tasks = [
+        asyncio.create_task(run_slot(slot, stop_event, job_types, burst))
+        for slot in range(concurrency)
+    ]
+
+    def request_shutdown():
+        if stop_event.is_set():
+            logger.warning("Segundo sinal recebido: interrompendo jobs em andamento")
+            for task in tasks:
+                task.cancel()
+            return
+        logger.info("Sinal recebido: finalizando jobs em andamento antes de sair")
+        stop_event.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, request_shutdown)
+        except NotImplementedError:  # Windows
+            signal.signal(sig, lambda *_: request_shutdown())
+
+    logger.info(f"Worker iniciado com {concurrency} slot(s), tipos: {job_types or 'todos'}")
+    await asyncio.gather(*tasks, return_exceptions=True)
+    logger.info("Worker finalizado")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker da fila de jobs")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "2")))
+    parser.add_argument("--types", default="", help="Tipos de job separados por vírgula")
+    parser.add_argument("--burst", action="store_true", help="Sair quando a fila estiver vazia")
+    args = parser.parse_args()
+
+    job_types = [t for t in args.types.split(",") if t] or None
+    asyncio.run(main(args.concurrency, job_types, args.burst))